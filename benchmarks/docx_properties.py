@@ -0,0 +1,95 @@
+"""Benchmark reading the core properties of .docx files
+
+Compares mdinfo.ooxml_utils.read_core_properties with python-docx's Document().core_properties.
+The test files in tests/test_files are small so a large document with many paragraphs
+and embedded images is generated as well. Run from the root of the repository:
+
+    python benchmarks/docx_properties.py [--paragraphs N] [--images N] [--runs N] [FILE ...]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import docx
+
+from mdinfo.ooxml_utils import read_core_properties
+
+DEFAULT_FILES = [
+    "tests/test_files/test1_data.docx",
+    "tests/test_files/test2_no_data.docx",
+]
+
+
+def python_docx_properties(filepath: str):
+    return docx.Document(filepath).core_properties
+
+
+def make_large_docx(filepath: str, paragraphs: int, images: int):
+    """Write a .docx with paragraphs paragraphs and images distinct random images"""
+    document = docx.Document()
+    document.core_properties.title = "Large Document"
+    for i in range(paragraphs):
+        document.add_paragraph(f"Paragraph {i} " + "lorem ipsum dolor sit amet " * 10)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for i in range(images):
+            # a BMP with random pixels; distinct so python-docx stores each one
+            image = os.path.join(tmpdir, f"image{i}.bmp")
+            width, height = 1024, 1024
+            pixels = os.urandom(width * height * 3)
+            header = (
+                b"BM"
+                + (54 + len(pixels)).to_bytes(4, "little")
+                + bytes(4)
+                + (54).to_bytes(4, "little")
+                + (40).to_bytes(4, "little")
+                + width.to_bytes(4, "little")
+                + height.to_bytes(4, "little")
+                + (1).to_bytes(2, "little")
+                + (24).to_bytes(2, "little")
+                + bytes(24)
+            )
+            with open(image, "wb") as fd:
+                fd.write(header + pixels)
+            document.add_picture(image)
+        document.save(filepath)
+
+
+def best_time(func, filepath: str, runs: int) -> float:
+    """Return fastest time in seconds of runs calls to func(filepath)"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(filepath)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES)
+    parser.add_argument("--paragraphs", type=int, default=20_000)
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        large_docx = os.path.join(tmpdir, "large.docx")
+        make_large_docx(large_docx, args.paragraphs, args.images)
+        for filepath in [*args.files, large_docx]:
+            if read_core_properties(filepath) is None:
+                print(f"{filepath}: not supported by read_core_properties")
+                continue
+            slow = best_time(python_docx_properties, filepath, args.runs)
+            fast = best_time(read_core_properties, filepath, args.runs)
+            size = os.path.getsize(filepath) / 1_000_000
+            print(
+                f"{os.path.basename(filepath)} ({size:.1f} MB): "
+                f"python-docx {slow * 1000:.2f} ms, read_core_properties {fast * 1000:.2f} ms "
+                f"({slow / fast:.0f}x faster)"
+            )
+
+
+if __name__ == "__main__":
+    main()
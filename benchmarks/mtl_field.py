@@ -0,0 +1,72 @@
+"""Benchmark rendering Metadata Template Language (MTL) templates which are a single field
+
+Templates such as {size} or {pdf:title} are compiled to a direct lookup of the field.
+This times the compiled template for them against rendering the same field with the
+general compiled template code used for all other templates. Run from the root of the repository:
+
+    python benchmarks/mtl_field.py [--runs N] [--repeat N] [TEMPLATE ...]
+
+The time reported is the best of --repeat timings of --runs renders.
+"""
+
+import argparse
+import timeit
+
+from mdinfo.mtlgrammar import parse
+from mdinfo.mtlparser import MTLParser, MTLParserModel, _compile_template
+
+FIELD_VALUES = {
+    "size": ["12345"],
+    "filepath.name": ["report.pdf"],
+    "pdf:title": ["Annual Report"],
+    "audio:genre": ["Rock", "Pop", "Jazz"],
+}
+
+DEFAULT_TEMPLATES = ["{size}", "{filepath.name}", "{pdf:title}", "{audio:genre}"]
+
+
+def get_field_values(field, subfield, field_arg, default):
+    key = f"{field}:{subfield}" if subfield else field
+    return FIELD_VALUES.get(key)
+
+
+def time_render(render, runs: int, repeat: int) -> float:
+    """Return best time in µs to call render()"""
+    return min(timeit.repeat(render, number=runs, repeat=repeat)) / runs * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("templates", nargs="*", default=DEFAULT_TEMPLATES)
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Render single field templates (best of {args.repeat} x {args.runs} runs)")
+    print(f"  {'general':>10} {'fast path':>10}")
+    # only time rendering, not creating the MTLParser
+    mtl_parser = MTLParser(get_field_values)
+    for template in args.templates:
+        (template_string,) = parse(template).template_strings
+        render_template = _compile_template(template_string.template, "", "")
+        render = MTLParserModel().compile(template).render
+
+        def general():
+            return render_template(mtl_parser, [""])
+
+        def fast_path():
+            return render(mtl_parser)
+
+        # the two must agree before comparing them
+        assert general() == fast_path(), template
+
+        general_time = time_render(general, args.runs, args.repeat)
+        fast_path_time = time_render(fast_path, args.runs, args.repeat)
+        print(
+            f"  {general_time:8.1f} µs {fast_path_time:8.1f} µs  "
+            f"({general_time / fast_path_time:.1f}x)  {template}"
+        )
+
+
+if __name__ == "__main__":
+    main()
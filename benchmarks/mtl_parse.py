@@ -0,0 +1,100 @@
+"""Benchmark parsing Metadata Template Language (MTL) templates
+
+Compares mdinfo.mtlgrammar.parse with the textX metamodel built from mdinfo/mtlparser.tx:
+parse throughput (with no template cache) and the time to import and set up each parser
+in a new python process. Run from the root of the repository:
+
+    python benchmarks/mtl_parse.py [--runs N] [--imports N] [TEMPLATE ...]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+from textx import metamodel_from_file
+
+from mdinfo.mtlgrammar import parse
+from mdinfo.mtlparser import MTL_GRAMMAR_MODEL
+
+DEFAULT_TEMPLATES = [
+    "{size}",
+    "{filepath.name}",
+    "{pdf:title,{docx:title,{audio:title}}}",
+    "{created.strftime,%Y-%m-%d} {filepath.stem|lower}",
+    "{filepath.suffix|lower contains .pdf|.docx?document,other}",
+    "{audio:artist[/,-]} - {audio:title|titlecase}",
+    "{var:year,{created.year}}{%year}/{+audio:artist|autosplit&{audio:albumartist}}",
+    "{format:int:02d,{audio:track}} {strip,{audio:title}}",
+]
+
+SETUP_SCRIPTS = {
+    "textX": "from textx import metamodel_from_file\n"
+    f"metamodel_from_file({MTL_GRAMMAR_MODEL!r}, skipws=False).model_from_str('{{size}}')",
+    "mtlgrammar": "from mdinfo.mtlgrammar import parse\nparse('{size}')",
+}
+
+# mdinfo is imported before starting the timer so only the parser is timed
+TIMER_SCRIPT = """
+import time
+import mdinfo
+start = time.perf_counter()
+exec({script!r})
+print(time.perf_counter() - start)
+"""
+
+
+def time_parse(parse_func, templates: list, runs: int) -> float:
+    """Return templates parsed per second"""
+    start = time.perf_counter()
+    for _ in range(runs):
+        for template in templates:
+            parse_func(template)
+    return runs * len(templates) / (time.perf_counter() - start)
+
+
+def time_setup(script: str, runs: int) -> list:
+    """Return list of times (in seconds) to run script in a new python process"""
+    times = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", TIMER_SCRIPT.format(script=script)],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        times.append(float(result.stdout))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("templates", nargs="*", default=DEFAULT_TEMPLATES)
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--imports", type=int, default=10)
+    args = parser.parse_args()
+
+    metamodel = metamodel_from_file(MTL_GRAMMAR_MODEL, skipws=False)
+    for template in args.templates:
+        # the parsers must agree before comparing them
+        metamodel.model_from_str(template)
+        parse(template)
+
+    print(f"Parse {len(args.templates)} templates ({args.runs} runs)")
+    textx_rate = time_parse(metamodel.model_from_str, args.templates, args.runs)
+    mtlgrammar_rate = time_parse(parse, args.templates, args.runs)
+    print(f"  textX:      {textx_rate:10.0f} templates/s")
+    print(
+        f"  mtlgrammar: {mtlgrammar_rate:10.0f} templates/s "
+        f"({mtlgrammar_rate / textx_rate:.1f}x)"
+    )
+
+    print(f"Import and set up parser ({args.imports} runs, median)")
+    for name, script in SETUP_SCRIPTS.items():
+        times = time_setup(script, args.imports)
+        print(f"  {name + ':':11} {statistics.median(times) * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
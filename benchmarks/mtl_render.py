@@ -0,0 +1,76 @@
+"""Benchmark rendering Metadata Template Language (MTL) templates
+
+Times MTLParser.render for a set of templates like those used with --print and --csv.
+Field values come from a dict so only the work done by the template engine is timed,
+not the plugins which look up the values. Run from the root of the repository:
+
+    python benchmarks/mtl_render.py [--runs N] [--repeat N] [TEMPLATE ...]
+
+The time reported for each template is the best of --repeat timings of --runs renders.
+"""
+
+import argparse
+import timeit
+
+from mdinfo.mtlparser import MTLParser
+
+FIELD_VALUES = {
+    "size": ["12345"],
+    "filepath.name": ["report.pdf"],
+    "filepath.stem": ["Report"],
+    "filepath.suffix": [".pdf"],
+    "created.year": ["2023"],
+    "created.strftime": ["2023-05-17"],
+    "pdf:title": [None],
+    "docx:title": [None],
+    "audio:title": ["Warm Lights"],
+    "audio:artist": ["Artist/Name"],
+    "audio:albumartist": ["Album Artist"],
+    "audio:track": ["3"],
+    "audio:genre": ["Rock; Pop, Jazz"],
+}
+
+DEFAULT_TEMPLATES = [
+    "{size}",
+    "{filepath.name}",
+    "{pdf:title,{docx:title,{audio:title}}}",
+    "{created.strftime,%Y-%m-%d} {filepath.stem|lower}",
+    "{filepath.suffix|lower contains .pdf|.docx?document,other}",
+    "{audio:artist[/,-]} - {audio:title|titlecase}",
+    "{var:year,{created.year}}{%year}/{+audio:genre|autosplit&{audio:albumartist}}",
+    "{format:int:02d,{audio:track}} {strip,{audio:title}}",
+    "{audio:track > 2?late,early}",
+]
+
+
+def get_field_values(field, subfield, field_arg, default):
+    key = f"{field}:{subfield}" if subfield else field
+    return FIELD_VALUES.get(key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("templates", nargs="*", default=DEFAULT_TEMPLATES)
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"Render templates (best of {args.repeat} x {args.runs} runs)")
+    total = 0.0
+    for template in args.templates:
+        # parse once before timing so only rendering is timed
+        MTLParser(get_field_values).render(template)
+        elapsed = min(
+            timeit.repeat(
+                lambda: MTLParser(get_field_values).render(template),
+                number=args.runs,
+                repeat=args.repeat,
+            )
+        )
+        total += elapsed
+        print(f"  {elapsed / args.runs * 1e6:8.1f} µs  {template}")
+    print(f"  {total / args.runs * 1e6:8.1f} µs  total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Benchmark reading the /Info dictionary of PDF files
+
+Compares mdinfo.pdf_utils.read_pdf_info with reading doc.info from a pdfminer PDFDocument.
+The test files in tests/test_files are small so a large PDF with many objects
+(similar to a long document) is generated as well. Run from the root of the repository:
+
+    python benchmarks/pdf_info.py [--objects N] [--runs N] [FILE ...]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+
+from mdinfo.pdf_utils import read_pdf_info
+
+DEFAULT_FILES = [
+    "tests/test_files/test_pdf.pdf",
+    "tests/test_files/test_pdf_blank_metadata.pdf",
+]
+
+
+def pdfminer_info(filepath: str) -> dict:
+    with open(filepath, "rb") as fp:
+        doc = PDFDocument(PDFParser(fp))
+        return doc.info[0] if doc.info else {}
+
+
+def make_large_pdf(filepath: str, objects: int):
+    """Write a PDF with objects filler objects and an /Info dictionary"""
+    offsets = []
+    with open(filepath, "wb") as fd:
+        fd.write(b"%PDF-1.4\n")
+        bodies = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [] /Count 0 >>",
+            b"<< /Title (Large Document) /Author (mdinfo) /CreationDate (D:20220101000000Z) >>",
+        ]
+        for objid in range(1, objects + 1):
+            body = bodies[objid - 1] if objid <= len(bodies) else b"(%d)" % objid
+            offsets.append(fd.tell())
+            fd.write(b"%d 0 obj\n%s\nendobj\n" % (objid, body))
+        xref = fd.tell()
+        fd.write(b"xref\n0 %d\n0000000000 65535 f \n" % (objects + 1))
+        fd.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+        fd.write(
+            b"trailer\n<< /Size %d /Root 1 0 R /Info 3 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (objects + 1, xref)
+        )
+
+
+def best_time(func, filepath: str, runs: int) -> float:
+    """Return fastest time in seconds of runs calls to func(filepath)"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(filepath)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*", default=DEFAULT_FILES)
+    parser.add_argument("--objects", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        large_pdf = os.path.join(tmpdir, f"large_{args.objects}_objects.pdf")
+        make_large_pdf(large_pdf, args.objects)
+        for filepath in [*args.files, large_pdf]:
+            if read_pdf_info(filepath) is None:
+                print(f"{filepath}: not supported by read_pdf_info, uses pdfminer")
+                continue
+            slow = best_time(pdfminer_info, filepath, args.runs)
+            fast = best_time(read_pdf_info, filepath, args.runs)
+            size = os.path.getsize(filepath) / 1_000_000
+            print(
+                f"{os.path.basename(filepath)} ({size:.1f} MB): "
+                f"pdfminer {slow * 1000:.2f} ms, read_pdf_info {fast * 1000:.2f} ms "
+                f"({slow / fast:.0f}x faster)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark mdinfo start up time
+
+Times `mdinfo --print '{size}' FILE` run in a new python process and reports which
+of the libraries used by the built-in plugins were imported to render the template.
+Run from the root of the repository:
+
+    python benchmarks/startup.py [--runs N] [--template TEMPLATE] [FILE]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("docx", "lxml", "pdfminer", "tinytag", "textx", "rich.markdown")
+
+DEFAULT_FILE = "tests/test_files/pears.jpg"
+
+IMPORTED_MODULES_SCRIPT = """
+import sys
+from mdinfo.filetemplate import FileTemplate
+FileTemplate(sys.argv[1]).render(sys.argv[2])
+print(" ".join(m for m in {modules!r} if m in sys.modules))
+"""
+
+
+def time_cli(filepath: str, template: str, runs: int) -> list:
+    """Return list of wall clock times (in seconds) for running the mdinfo CLI"""
+    cmd = [sys.executable, "-m", "mdinfo", "--print", template, filepath]
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def imported_modules(filepath: str, template: str) -> str:
+    """Return the heavy modules imported when rendering template for filepath"""
+    script = IMPORTED_MODULES_SCRIPT.format(modules=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", script, filepath, template],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("file", nargs="?", default=DEFAULT_FILE)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--template", default="{size}")
+    args = parser.parse_args()
+
+    # warm up the file system and bytecode caches
+    time_cli(args.file, args.template, 1)
+    times = time_cli(args.file, args.template, args.runs)
+    print(f"mdinfo --print '{args.template}' {args.file} ({args.runs} runs)")
+    print(
+        f"  min {min(times) * 1000:.1f} ms, "
+        f"median {statistics.median(times) * 1000:.1f} ms, "
+        f"mean {statistics.mean(times) * 1000:.1f} ms"
+    )
+    print(
+        f"  heavy modules imported: {imported_modules(args.file, args.template) or 'none'}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,11 +8,22 @@ import mdinfo
 mdinfo uses the [pluggy](https://pluggy.readthedocs.io/en/latest/) plugin system to allow you to extend the template system.
 
 To create a template plugin, you need create a python package with a module that contains a hook implementation for the 
-`get_template_help` and `get_template_value` hooks.
+`get_template_help`, `get_template_fields`, and `get_template_value` hooks.
 
 `get_template_help` returns the help text used by the `mdinfo --help` command.
 
+`get_template_fields` returns the names of the template fields your plugin provides (without the braces).
+mdinfo uses these to call your plugin only for its own fields. A field may only be provided by one plugin.
+
 `get_template_value` returns the value for the template field.
+
+If your plugin needs to open or parse the file to get the value, add a `context` argument to your
+`get_template_value` hook implementation. `context` is a `mdinfo.filecontext.FileContext` shared by all fields
+and templates rendered for the file; use `context.get_or_set(key, factory)` to store the parsed data
+so the file is only read once. `context` is optional and may be omitted as in this example.
+
+Plugins that declare their fields may also implement the optional `get_template_values` hook to resolve
+all of their fields used by the templates for a file in a single call; see `mdinfo.hookspecs`.
 """
 # specify which template fields your plugin will provide
 FIELDS = {"{foo}": "Returns BAR", "{bar}": "Returns FOO"}
@@ -42,6 +53,12 @@ def get_template_help() -> Iterable:
     return ["**FooBar Fields**", fields, text]
 
 
+@mdinfo.hookimpl
+def get_template_fields() -> Iterable[str]:
+    """Specify the template fields your plugin provides, e.g. "foo" for {foo}"""
+    return [field[1:-1] for field in FIELDS]
+
+
 @mdinfo.hookimpl
 def get_template_value(
     filepath: str,
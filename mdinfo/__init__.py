@@ -5,5 +5,19 @@ from pluggy import HookimplMarker
 
 hookimpl = HookimplMarker("mdinfo")
 
+# the library API is imported on first use as it loads the plugins which import this module
+_LAZY_EXPORTS = {
+    "FileMetadata": "mdinfo.mdinfo",
+    "iter_metadata": "mdinfo.mdinfo",
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        import importlib
+
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 rich.traceback.install(show_locals=True, suppress=[click, cloup])
@@ -0,0 +1,150 @@
+"""Detect embedded cover art in audio files by reading only the tag headers"""
+
+from __future__ import annotations
+
+import os
+import struct
+from typing import BinaryIO, Optional
+
+__all__ = ["has_embedded_image"]
+
+# ID3v2 frames holding attached pictures (v2.2 and v2.3+)
+ID3_IMAGE_FRAMES = (b"PIC", b"APIC")
+
+# FLAC metadata block type for a picture
+FLAC_PICTURE = 6
+
+# path to the iTunes metadata list in an MP4 file; meta is a full box with 4 bytes of version/flags
+MP4_ILST_PATH = (b"moov", b"udta", b"meta", b"ilst")
+
+
+class _Unsupported(Exception):
+    """Raised when the file uses a structure not handled by the scanner"""
+
+    pass
+
+
+def has_embedded_image(filepath: str) -> Optional[bool]:
+    """Return True if the audio file at filepath has embedded cover art, else False
+
+    Only frame and block headers are read: image data is skipped over, never read.
+    Supports ID3v2 (MP3), FLAC and MP4/M4A files; returns None for other formats
+    or files that cannot be scanned, in which case use tinytag instead.
+    """
+    try:
+        with open(filepath, "rb") as fd:
+            header = fd.read(12)
+            if header[:3] == b"ID3":
+                found = _scan_id3(fd)
+                if found:
+                    return True
+                # FLAC files may be preceded by an ID3 tag
+                header = fd.read(4)
+                if header == b"fLaC":
+                    return _scan_flac(fd)
+                return found
+            if header[:4] == b"fLaC":
+                fd.seek(4)
+                return _scan_flac(fd)
+            if header[4:8] == b"ftyp":
+                fd.seek(0)
+                return _scan_mp4(fd, os.fstat(fd.fileno()).st_size)
+    except (_Unsupported, OSError, struct.error):
+        pass
+    return None
+
+
+def _read(fd: BinaryIO, size: int) -> bytes:
+    """Read exactly size bytes from fd"""
+    data = fd.read(size)
+    if len(data) != size:
+        raise _Unsupported("unexpected end of file")
+    return data
+
+
+def _synchsafe(data: bytes) -> int:
+    """Decode ID3v2 synchsafe integer (7 bits per byte)"""
+    value = 0
+    for byte in data:
+        value = (value << 7) | (byte & 0x7F)
+    return value
+
+
+def _scan_id3(fd: BinaryIO) -> bool:
+    """Scan ID3v2 tag at start of file for a picture frame; leaves fd at the end of the tag"""
+    fd.seek(0)
+    header = _read(fd, 10)
+    version, flags = header[3], header[5]
+    tag_end = 10 + _synchsafe(header[6:10]) + (10 if flags & 0x10 else 0)
+    if version not in (2, 3, 4) or (version < 4 and flags & 0x80):
+        # whole-tag unsynchronisation may alter frame headers
+        raise _Unsupported(f"ID3v2.{version} flags {flags:#x}")
+
+    if version == 2:
+        id_size, header_size = 3, 6
+    else:
+        id_size, header_size = 4, 10
+    position = 10
+    if flags & 0x40 and version > 2:
+        # skip extended header; its size includes itself in v2.4 but not in v2.3
+        size = _read(fd, 4)
+        position += (
+            _synchsafe(size) if version == 4 else 4 + struct.unpack(">I", size)[0]
+        )
+
+    found = False
+    while position + header_size <= tag_end:
+        fd.seek(position)
+        frame_header = _read(fd, header_size)
+        frame_id = frame_header[:id_size]
+        if not frame_id.strip(b"\x00"):
+            # padding
+            break
+        if frame_id in ID3_IMAGE_FRAMES:
+            found = True
+            break
+        if version == 2:
+            frame_size = int.from_bytes(frame_header[3:6], "big")
+        elif version == 3:
+            frame_size = struct.unpack(">I", frame_header[4:8])[0]
+        else:
+            frame_size = _synchsafe(frame_header[4:8])
+        position += header_size + frame_size
+    fd.seek(tag_end)
+    return found
+
+
+def _scan_flac(fd: BinaryIO) -> bool:
+    """Scan FLAC metadata blocks for a picture block; fd must be positioned after 'fLaC'"""
+    while True:
+        block_header = _read(fd, 4)
+        if block_header[0] & 0x7F == FLAC_PICTURE:
+            return True
+        if block_header[0] & 0x80:
+            # last metadata block
+            return False
+        fd.seek(int.from_bytes(block_header[1:4], "big"), os.SEEK_CUR)
+
+
+def _scan_mp4(fd: BinaryIO, end: int, path: tuple = MP4_ILST_PATH) -> bool:
+    """Scan MP4 atoms between the current position and end for the cover art atom"""
+    position = fd.tell()
+    while position + 8 <= end:
+        fd.seek(position)
+        size, atom_type = struct.unpack(">I4s", _read(fd, 8))
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", _read(fd, 8))[0]
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size:
+            raise _Unsupported(f"invalid atom size {size}")
+        if path and atom_type == path[0]:
+            if atom_type == b"meta":
+                fd.seek(4, os.SEEK_CUR)
+            return _scan_mp4(fd, position + size, path[1:])
+        if not path and atom_type == b"covr":
+            return True
+        position += size
+    return False
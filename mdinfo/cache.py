@@ -0,0 +1,224 @@
+"""Persistent on-disk cache of template field values"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import multiprocessing.util
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional
+
+from .stats import increment
+
+__all__ = ["CACHEABLE_FIELDS", "MetadataCache", "open_cache"]
+
+CACHEABLE_FIELDS = frozenset({"audio", "docx", "ooxml", "pdf"})
+"""Fields whose values depend only on the contents of the file and thus may be cached"""
+
+# number of values stored before they are written to the database
+COMMIT_INTERVAL = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS field_values (
+    device INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored REAL NOT NULL,
+    PRIMARY KEY (device, inode, size, mtime_ns, key)
+);
+CREATE INDEX IF NOT EXISTS field_values_stored ON field_values (stored);
+"""
+
+
+class MetadataCache:
+    """SQLite backed cache of rendered template field values
+
+    Values are keyed by the file's device, inode, size and modification time (in ns)
+    as well as the field, subfield, field argument and default passed to the plugin
+    so a value is only reused if the file has not changed since the value was stored.
+
+    A single MetadataCache may be shared by multiple threads; use open_cache() to get
+    the cache for the current process.
+    """
+
+    def __init__(self, path: str):
+        """Open (creating if needed) the cache database at path"""
+        self.path = path
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        # values waiting to be written to the database, keyed by the row's primary key;
+        # writes are batched so concurrent processes only briefly hold the write lock
+        self._pending: dict[tuple, tuple[str, float]] = {}
+        self._conn = sqlite3.connect(
+            path, timeout=60, check_same_thread=False, isolation_level=None
+        )
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def get(
+        self,
+        stat: os.stat_result,
+        field: str,
+        subfield: Optional[str],
+        field_arg: Optional[str],
+        default: Optional[List[str]],
+    ) -> Optional[List[Optional[str]]]:
+        """Return cached values for field or None if not in cache
+
+        default is None for values which do not depend on the default value.
+        """
+        key = self._key(stat, field, subfield, field_arg, default)
+        with self._lock:
+            if key in self._pending:
+                row = self._pending[key]
+            else:
+                row = self._conn.execute(
+                    "SELECT value FROM field_values "
+                    "WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ? AND key = ?",
+                    key,
+                ).fetchone()
+        if row is None:
+            increment("cache_misses")
+            return None
+        increment("cache_hits")
+        return json.loads(row[0])
+
+    def set(
+        self,
+        stat: os.stat_result,
+        field: str,
+        subfield: Optional[str],
+        field_arg: Optional[str],
+        default: Optional[List[str]],
+        values: List[Optional[str]],
+    ) -> None:
+        """Store values for field in the cache; see get() for default"""
+        key = self._key(stat, field, subfield, field_arg, default)
+        with self._lock:
+            self._pending[key] = (json.dumps(values), time.time())
+            if len(self._pending) >= COMMIT_INTERVAL:
+                self._flush()
+        increment("cache_stores")
+
+    def prune(
+        self, max_age: Optional[float] = None, max_entries: Optional[int] = None
+    ) -> int:
+        """Evict entries from the cache; returns number of entries evicted
+
+        Args:
+            max_age: if provided, remove entries stored more than max_age seconds ago
+            max_entries: if provided, remove the oldest entries so that at most max_entries remain
+        """
+        evicted = 0
+        with self._lock:
+            self._flush()
+            with self._transaction():
+                if max_age is not None:
+                    cursor = self._conn.execute(
+                        "DELETE FROM field_values WHERE stored < ?",
+                        (time.time() - max_age,),
+                    )
+                    evicted += cursor.rowcount
+                if max_entries is not None:
+                    cursor = self._conn.execute(
+                        "DELETE FROM field_values WHERE rowid IN "
+                        "(SELECT rowid FROM field_values ORDER BY stored DESC LIMIT -1 OFFSET ?)",
+                        (max_entries,),
+                    )
+                    evicted += cursor.rowcount
+        if evicted:
+            increment("cache_evictions", evicted)
+        return evicted
+
+    def count(self) -> int:
+        """Return number of entries in the cache"""
+        with self._lock:
+            self._flush()
+            return self._conn.execute("SELECT COUNT(*) FROM field_values").fetchone()[0]
+
+    def commit(self) -> None:
+        """Write any pending values to the database"""
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        """Write pending values and close the database"""
+        if os.getpid() != self._pid:
+            # connection was inherited by a forked process; only the owner may use it
+            return
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush()
+            self._conn.close()
+            self._conn = None
+
+    def _flush(self) -> None:
+        """Write pending values to the database; caller must hold self._lock"""
+        if not self._pending:
+            return
+        with self._transaction():
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO field_values VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(*key, *row) for key, row in self._pending.items()],
+            )
+        self._pending.clear()
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Context manager for a write transaction"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        else:
+            self._conn.execute("COMMIT")
+
+    @staticmethod
+    def _key(
+        stat: os.stat_result,
+        field: str,
+        subfield: Optional[str],
+        field_arg: Optional[str],
+        default: Any,
+    ) -> tuple[int, int, int, int, str]:
+        """Return primary key of the row for field lookup"""
+        return (
+            stat.st_dev,
+            stat.st_ino,
+            stat.st_size,
+            stat.st_mtime_ns,
+            json.dumps(
+                [field, subfield, field_arg, None if default is None else list(default)]
+            ),
+        )
+
+
+_caches: dict[tuple[int, str], MetadataCache] = {}
+_caches_lock = threading.Lock()
+
+
+def open_cache(path: str) -> MetadataCache:
+    """Return the MetadataCache for path, opening it the first time it is used in this process
+
+    The cache is closed (and pending changes committed) when the process exits;
+    this includes worker processes started by mdinfo.parallel.
+    """
+    path = os.path.abspath(path)
+    key = (os.getpid(), path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = MetadataCache(path)
+            # Finalize (rather than atexit) so the cache is also closed in pool worker processes
+            multiprocessing.util.Finalize(cache, cache.close, exitpriority=10)
+        return cache
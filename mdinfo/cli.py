@@ -3,9 +3,11 @@
 from __future__ import annotations
 
 import io
+import itertools
+import os
 import re
 import sys
-from typing import List, Optional
+from typing import Iterator, List, Optional
 
 import click
 from cloup import (
@@ -24,18 +26,29 @@ from cloup import (
 from cloup.constraints import If, RequireExactly, accept_none, mutually_exclusive
 from rich.console import Console
 from rich.highlighter import NullHighlighter
-from rich.markdown import Markdown
 
+from mdinfo.mtlparser import SyntaxError as TemplateSyntaxError
 from mdinfo.mtlparser import UnknownFieldError
 
 from ._version import __version__
+from .cache import MetadataCache, open_cache
 from .constants import APP_NAME
-from .filetemplate import get_template_help
+from .filetemplate import (
+    FieldConflictError,
+    TemplatePlan,
+    get_template_help,
+    plan_templates,
+)
 from .mdinfo import (
     print_templates_for_files,
     print_templates_to_csv_for_files,
     print_templates_to_json_for_files,
+    strip_field_name,
 )
+from .parallel import get_job_count
+from .path_utils import iter_files, read_paths
+from .stats import RUN_STATS
+from .stats import reset as reset_stats
 from .utils import bold
 
 # Set up rich console
@@ -151,7 +164,8 @@ formatter_settings = HelpFormatter.settings(
         "json_option",
         is_flag=True,
         help="Print metadata as JSON. The JSON field name will be the same as the template name. "
-        "You may specify a different field name by using the syntax: 'field_name:{template}' or 'field_name={template}'. ",
+        "You may specify a different field name by using the syntax: 'field_name:{template}' or 'field_name={template}'. "
+        "Output is newline delimited JSON (one object per line) unless -a/--array is used.",
     ),
     option(
         "--csv",
@@ -206,7 +220,7 @@ formatter_settings = HelpFormatter.settings(
         "--array",
         "-a",
         is_flag=True,
-        help="When used with --json, outputs a JSON array of objects instead single objects.",
+        help="When used with --json, outputs a JSON array of objects instead of one object per line.",
     ),
     option(
         "--path",
@@ -215,15 +229,126 @@ formatter_settings = HelpFormatter.settings(
         help="Print full file path instead of filename. See also -f/--no-filename.",
     ),
 )
+@option_group(
+    "File Selection Options",
+    option(
+        "--files-from",
+        metavar="FILE",
+        type=click.File("rb"),
+        help="Read the paths of the files to process from FILE, one per line, in addition to any FILES. "
+        "Use '-' to read from standard input. Paths are read and processed as they arrive "
+        "so there is no limit on the number of files; see also -z/--null-input.",
+    ),
+    option(
+        "--null-input",
+        "-z",
+        is_flag=True,
+        help="With --files-from, paths are separated by null characters instead of newlines, "
+        "e.g. the output of `find -print0`.",
+    ),
+    option(
+        "--recursive",
+        "-r",
+        is_flag=True,
+        help="Recursively process the files in any directories given in FILES. "
+        "Without --recursive, a directory is processed as a single file.",
+    ),
+    option(
+        "--include",
+        metavar="GLOB",
+        multiple=True,
+        help="Only process files whose name matches the glob pattern GLOB, e.g. '*.pdf'. "
+        "If GLOB contains a path separator, it is matched against the full path. "
+        "May be repeated to include files matching any of the patterns.",
+    ),
+    option(
+        "--exclude",
+        metavar="GLOB",
+        multiple=True,
+        help="Do not process files or descend into directories whose name matches the glob pattern GLOB. "
+        "If GLOB contains a path separator, it is matched against the full path. "
+        "May be repeated to exclude files matching any of the patterns.",
+    ),
+    option(
+        "--max-depth",
+        metavar="N",
+        type=click.IntRange(min=1),
+        help="With --recursive, descend at most N levels of directories below each directory in FILES; "
+        "--max-depth 1 processes only the files directly in the directory.",
+    ),
+)
+@option_group(
+    "Cache Options",
+    option(
+        "--cache",
+        "cache_path",
+        metavar="PATH",
+        type=click.Path(dir_okay=False, writable=True),
+        help="Store field values for audio, docx, ooxml, and pdf fields in the cache database at PATH "
+        "(created if it does not exist) and reuse them for files that have not changed "
+        "(same device, inode, size, and modification time) the next time mdinfo is run with the same cache.",
+    ),
+    option(
+        "--cache-max-age",
+        metavar="DAYS",
+        type=click.FloatRange(min=0),
+        help="With --cache, remove cached values stored more than DAYS days ago.",
+    ),
+    option(
+        "--cache-max-entries",
+        metavar="N",
+        type=click.IntRange(min=0),
+        help="With --cache, keep at most N cached values, removing the oldest values first.",
+    ),
+    option(
+        "--cache-stats",
+        is_flag=True,
+        help="With --cache, print cache statistics (hits, misses, hit rate) "
+        "and user/group name lookups to stderr when done.",
+    ),
+)
+@option_group(
+    "Performance Options",
+    option(
+        "--jobs",
+        "-J",
+        metavar="N",
+        type=click.IntRange(min=0),
+        default=1,
+        help="Number of files to process in parallel. "
+        "Use 0 to run one job per CPU. Default is 1 (process files sequentially).",
+    ),
+    option(
+        "--threads",
+        is_flag=True,
+        help="With --jobs, use threads instead of processes to process files in parallel. "
+        "Threads have lower overhead and may be faster for plugins that are mostly waiting on I/O.",
+    ),
+    option(
+        "--unordered",
+        is_flag=True,
+        help="With --jobs, print the results for each file as soon as it is processed "
+        "instead of in the order the files were given.",
+    ),
+)
 @constraint(If("null_separator", then=accept_none), ["csv_option", "json_option"])
 @constraint(If("delimiter", then=RequireExactly(1)), ["csv_option"])
 @constraint(If("no_header", then=RequireExactly(1)), ["csv_option"])
 @constraint(If("array", then=RequireExactly(1)), ["json_option"])
 @constraint(If("path", then=accept_none), ["no_filename"])
-@version_option(version=__version__)
-@argument(
-    "files", nargs=-1, required=True, type=click.Path(exists=True, resolve_path=True)
+@constraint(If("max_depth", then=RequireExactly(1)), ["recursive"])
+@constraint(If("cache_max_age", then=RequireExactly(1)), ["cache_path"])
+@constraint(If("cache_max_entries", then=RequireExactly(1)), ["cache_path"])
+@constraint(If("cache_stats", then=RequireExactly(1)), ["cache_path"])
+@constraint(If("null_input", then=RequireExactly(1)), ["files_from"])
+@option(
+    "--explain",
+    is_flag=True,
+    help="Print the fields used by the templates and the plugins that will be called "
+    "to look them up, then exit without processing any files.",
 )
+@version_option(version=__version__)
+@argument("files", nargs=-1, type=click.Path(exists=True, resolve_path=True))
 def cli(
     print_option: list[str],
     json_option: list[list[str]],
@@ -235,26 +360,153 @@ def cli(
     delimiter: str,
     array: bool,
     path: bool,
+    files_from: io.BufferedReader | None,
+    null_input: bool,
+    recursive: bool,
+    include: tuple[str, ...],
+    exclude: tuple[str, ...],
+    max_depth: int | None,
+    cache_path: str | None,
+    cache_max_age: float | None,
+    cache_max_entries: int | None,
+    cache_stats: bool,
+    jobs: int,
+    threads: bool,
+    unordered: bool,
+    explain: bool,
     files: list[str],
 ):
     """Print metadata info for files"""
+    if explain:
+        templates = print_option
+        if csv_option or json_option:
+            templates = [strip_field_name(template) for template in templates]
+        try:
+            print_template_plan(plan_templates(templates))
+        except TemplateSyntaxError as e:
+            print_error(f"Invalid template: {e}")
+            sys.exit(1)
+        return
+    if not files and files_from is None:
+        raise click.UsageError("Missing argument 'FILES...' or option '--files-from'.")
+    reset_stats()
+    if files_from is not None:
+        files = itertools.chain(
+            files, iter_files_from(files_from, b"\0" if null_input else b"\n")
+        )
+    files = iter_files(
+        files,
+        recursive=recursive,
+        include=include,
+        exclude=exclude,
+        max_depth=max_depth,
+        onerror=lambda e: print_error(f"Error reading directory: {e}"),
+    )
+    parallel_kwargs = {
+        "jobs": get_job_count(jobs),
+        "threads": threads,
+        "ordered": not unordered,
+        "cache_path": cache_path,
+    }
     try:
         if csv_option:
             print_templates_to_csv_for_files(
-                files, print_option, no_filename, path, no_header, delimiter, undefined
+                files,
+                print_option,
+                no_filename,
+                path,
+                no_header,
+                delimiter,
+                undefined,
+                **parallel_kwargs,
             )
         elif json_option:
             print_templates_to_json_for_files(
-                files, print_option, no_filename, path, array, undefined
+                files,
+                print_option,
+                no_filename,
+                path,
+                array,
+                undefined,
+                **parallel_kwargs,
             )
         else:
             print_templates_for_files(
-                files, print_option, no_filename, path, null_separator, undefined
+                files,
+                print_option,
+                no_filename,
+                path,
+                null_separator,
+                undefined,
+                **parallel_kwargs,
             )
-    except UnknownFieldError as e:
+    except (UnknownFieldError, FieldConflictError) as e:
         print_error(e)
         sys.exit(1)
 
+    if cache_path:
+        cache = open_cache(cache_path)
+        cache.prune(
+            max_age=cache_max_age * 86400 if cache_max_age is not None else None,
+            max_entries=cache_max_entries,
+        )
+        if cache_stats:
+            print_cache_stats(cache)
+
+
+def print_template_plan(plan: TemplatePlan):
+    """Print the fields and plugins used by the templates in plan"""
+    rows = [("Field", "Plugin")]
+    for field in plan.fields:
+        if field.builtin:
+            plugin = "(template engine)"
+        elif field.plugin is None:
+            plugin = "(not declared by any plugin)"
+        else:
+            plugin = field.plugin + (" (batch)" if field.batch else "")
+        rows.append((field.field, plugin))
+    width = max(len(row[0]) for row in rows)
+    for field, plugin in rows:
+        click.echo(f"{field:<{width}}  {plugin}")
+    click.echo()
+    click.echo(f"Plugins called: {', '.join(plan.plugins) or 'none'}")
+    click.echo(f"Plugins not called: {', '.join(plan.unused_plugins) or 'none'}")
+    if plan.unknown_fields:
+        click.echo(
+            f"Fields not declared by any plugin are looked up by calling each plugin "
+            f"that does not declare its fields: {', '.join(plan.unknown_fields)}"
+        )
+
+
+def iter_files_from(fd: io.BufferedReader, separator: bytes) -> Iterator[str]:
+    """Yield absolute paths read from fd, printing an error for paths that don't exist"""
+    for filepath in read_paths(fd, separator):
+        if not os.path.exists(filepath):
+            print_error(f"File not found: {filepath}")
+            continue
+        yield os.path.abspath(filepath)
+
+
+def print_cache_stats(cache: MetadataCache):
+    """Print cache and user/group name lookup statistics for the current run to stderr"""
+    hits = RUN_STATS["cache_hits"]
+    misses = RUN_STATS["cache_misses"]
+    lookups = hits + misses
+    hit_rate = 100 * hits / lookups if lookups else 0.0
+    _global_console_stderr.print(
+        f"Cache {cache.path}: {hits} hits, {misses} misses ({hit_rate:.1f}% hit rate), "
+        f"{RUN_STATS['cache_stores']} stored, {RUN_STATS['cache_evictions']} evicted, "
+        f"{cache.count()} entries",
+        highlight=False,
+        soft_wrap=True,
+    )
+    _global_console_stderr.print(
+        f"Name lookups: {RUN_STATS['user_lookups']} user, "
+        f"{RUN_STATS['group_lookups']} group",
+        highlight=False,
+        soft_wrap=True,
+    )
+
 
 def rich_text(text, width=78):
     """Return rich formatted text"""
@@ -314,6 +566,9 @@ def strip_html_comments(text):
 
 def format_markdown_str(string, width=78):
     """Return formatted markdown str for terminal"""
+    # only needed for --help so don't pay the import cost on every run
+    from rich.markdown import Markdown
+
     sio = io.StringIO()
     console = Console(file=sio, force_terminal=True, width=width)
     console.print(Markdown(string))
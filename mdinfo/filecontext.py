@@ -0,0 +1,78 @@
+"""Per-file context shared by template plugins while rendering a file"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Callable, Optional
+
+from .stat_utils import stat_with_birthtime
+
+
+class FileContext:
+    """Per-file state shared by all plugins while rendering templates for a single file
+
+    A FileContext is created for each file processed and passed to the plugins' hooks.
+    Plugins may use it to stash objects that are expensive to create (for example, parsed
+    tags or document properties) so that a file is opened and parsed only once regardless
+    of how many template fields or templates reference it.
+
+    Plugins should namespace their keys with the plugin's field name, e.g. "pdf:info".
+    Stored objects with a close() method (for example, an open zip file) are closed
+    by close() when the file has been processed.
+    """
+
+    def __init__(self, filepath: str):
+        """Inits FileContext for filepath"""
+        self.filepath = filepath
+        self._data: dict[str, Any] = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return value stored for key or default if key not in context"""
+        return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value for key"""
+        self._data[key] = value
+
+    def get_or_set(self, key: str, factory: Callable[[], Any]) -> Any:
+        """Return value stored for key; if key not in context, store and return factory()
+
+        If factory raises an exception, nothing is stored and the exception is propagated.
+        """
+        try:
+            return self._data[key]
+        except KeyError:
+            value = self._data[key] = factory()
+            return value
+
+    def stat(self) -> os.stat_result:
+        """Return os.stat() result for the file; the file is only stat'd the first time"""
+        if "stat" not in self._data:
+            self._stat()
+        return self._data["stat"]
+
+    def birthtime(self) -> Optional[float]:
+        """Return birth (creation) time of the file or None if the platform or file system
+        doesn't record it; obtained by the same call as stat()"""
+        if "stat" not in self._data:
+            self._stat()
+        return self._data.get("birthtime")
+
+    def _stat(self) -> None:
+        self._data["stat"], self._data["birthtime"] = stat_with_birthtime(self.filepath)
+
+    def clear(self) -> None:
+        """Remove all values stored in the context"""
+        self._data.clear()
+
+    def close(self) -> None:
+        """Close stored values that have a close() method and remove all values"""
+        values = list(self._data.values())
+        self._data.clear()
+        for value in values:
+            close = getattr(value, "close", None)
+            if callable(close):
+                close()
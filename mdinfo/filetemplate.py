@@ -1,18 +1,29 @@
 """ Custom template system for mdinfo """
 
+import functools
 import importlib
 import locale
 import pathlib
+import threading
+from dataclasses import dataclass
 from textwrap import dedent
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
 
 import pluggy
-from textx import TextXSyntaxError, metamodel_from_file
 
 from . import hookspecs
 from ._version import __version__
+from .cache import CACHEABLE_FIELDS, MetadataCache
 from .constants import APP_NAME
-from .mtlparser import FORMAT_FIELDS, PUNCTUATION_FIELDS, MTLParser
+from .filecontext import FileContext
+from .hookspecs import FieldRequest
+from .mtlparser import (
+    FORMAT_FIELDS,
+    PUNCTUATION_FIELDS,
+    LazyValues,
+    MTLParser,
+    TemplateString,
+)
 from .path_utils import sanitize_dirname, sanitize_filename, sanitize_pathpart
 from .renderoptions import RenderOptions
 
@@ -29,8 +40,15 @@ class SyntaxError(Exception):
     pass
 
 
+class FieldConflictError(Exception):
+    """Raised when more than one plugin declares the same template field"""
+
+    pass
+
+
 DEFAULT_PLUGINS = (
     "mdinfo.plugins.templates.docx",
+    "mdinfo.plugins.templates.ooxml",
     "mdinfo.plugins.templates.pdf",
     "mdinfo.plugins.templates.audio",
     "mdinfo.plugins.templates.filepath",
@@ -39,20 +57,270 @@ DEFAULT_PLUGINS = (
 )
 
 
+class FieldDispatch:
+    """Routes template fields to the plugin that handles them
+
+    Plugins declare the fields they handle with the get_template_fields hook;
+    a lookup for one of these fields calls only that plugin's get_template_value hookimpl.
+    Fields of plugins that do not implement get_template_fields are looked up by calling
+    get_template_value on each of these plugins until one returns a value.
+    Declared fields of plugins that implement get_template_values may also be resolved in batches.
+    The table is a snapshot of the plugins registered when it is built; plugins registered
+    or unregistered later are not called.
+    """
+
+    def __init__(self, pm: pluggy.PluginManager):
+        """Build the dispatch table for the plugins registered with pm
+
+        Raises:
+            FieldConflictError: if a field is declared by more than one plugin
+        """
+        self.fields: Dict[str, pluggy.HookImpl] = {}
+        self.batch_fields: Dict[str, pluggy.HookImpl] = {}
+        value_impls = {
+            impl.plugin_name: impl
+            for impl in pm.hook.get_template_value.get_hookimpls()
+        }
+        values_impls = {
+            impl.plugin_name: impl
+            for impl in pm.hook.get_template_values.get_hookimpls()
+        }
+        declared = []
+        for impl in pm.hook.get_template_fields.get_hookimpls():
+            declared.append(impl.plugin)
+            value_impl = value_impls.get(impl.plugin_name)
+            if value_impl is None:
+                continue
+            for field in impl.function():
+                if field in self.fields:
+                    raise FieldConflictError(
+                        f"Template field '{field}' is declared by plugins "
+                        f"'{self.fields[field].plugin_name}' and '{impl.plugin_name}'"
+                    )
+                self.fields[field] = value_impl
+                if impl.plugin_name in values_impls:
+                    self.batch_fields[field] = values_impls[impl.plugin_name]
+        # pluggy calls hookimpls in the reverse of the order get_hookimpls() returns them
+        self.fallback_impls = [
+            impl
+            for impl in reversed(value_impls.values())
+            if impl.plugin not in declared
+        ]
+        self.fallback_plugins = [
+            name for name, impl in value_impls.items() if impl.plugin not in declared
+        ]
+
+    def get_template_value(self, **kwargs) -> Optional[List[Optional[str]]]:
+        """Call the get_template_value hook of the plugin that handles kwargs["field"]"""
+        impl = self.fields.get(kwargs["field"].split(".", 1)[0])
+        if impl is not None:
+            return impl.function(*[kwargs[arg] for arg in impl.argnames])
+        # get_template_value is a firstresult hook: return the first value found
+        for impl in self.fallback_impls:
+            values = impl.function(*[kwargs[arg] for arg in impl.argnames])
+            if values is not None:
+                return values
+        return None
+
+    def get_template_values(
+        self, filepath: str, fields: List[FieldRequest], context: FileContext
+    ) -> Dict[FieldRequest, List[Optional[str]]]:
+        """Resolve fields with one get_template_values call per plugin
+
+        Fields not handled by a plugin implementing get_template_values are ignored.
+        """
+        batches: Dict[pluggy.HookImpl, List[FieldRequest]] = {}
+        for request in fields:
+            impl = self.batch_fields.get(request.field.split(".", 1)[0])
+            if impl is not None:
+                batches.setdefault(impl, []).append(request)
+        values = {}
+        for impl, requests in batches.items():
+            kwargs = {"filepath": filepath, "fields": requests, "context": context}
+            values.update(impl.function(*[kwargs[arg] for arg in impl.argnames]) or {})
+        return values
+
+
+_field_dispatch: Optional[FieldDispatch] = None
+# re-entrant as load_entrypoint_plugins() holds the lock while registering plugins,
+# which discards the dispatch table
+_field_dispatch_lock = threading.RLock()
+
+
+def get_field_dispatch() -> FieldDispatch:
+    """Return the FieldDispatch for the registered plugins, building it on first use"""
+    global _field_dispatch
+    with _field_dispatch_lock:
+        if _field_dispatch is None:
+            _field_dispatch = FieldDispatch(PM)
+        return _field_dispatch
+
+
+def clear_field_dispatch():
+    """Discard the FieldDispatch so it is rebuilt for the plugins currently registered"""
+    global _field_dispatch
+    with _field_dispatch_lock:
+        _field_dispatch = None
+
+
+class PluginManager(pluggy.PluginManager):
+    """PluginManager that discards the field dispatch table when plugins are added or removed"""
+
+    def register(self, plugin, name=None):
+        plugin_name = super().register(plugin, name)
+        clear_field_dispatch()
+        return plugin_name
+
+    def unregister(self, plugin=None, name=None):
+        plugin = super().unregister(plugin, name)
+        clear_field_dispatch()
+        return plugin
+
+
 def get_plugin_manager():
-    pm = pluggy.PluginManager(APP_NAME)
+    pm = PluginManager(APP_NAME)
     pm.add_hookspecs(hookspecs)
-    pm.load_setuptools_entrypoints(APP_NAME)
     return pm
 
 
 PM = get_plugin_manager()
 
 # Load default plugins
+# The default plugins are cheap to import: each defers importing the library it uses
+# to parse files (e.g. pdfminer, python-docx, tinytag) until one of its fields is rendered
 for plugin in DEFAULT_PLUGINS:
     mod = importlib.import_module(plugin)
     PM.register(mod, plugin)
 
+# Third-party plugins registered via setuptools entry points are loaded on first use
+# as scanning the installed distributions for entry points is slow
+_entrypoints_loaded = False
+
+
+def load_entrypoint_plugins() -> bool:
+    """Load plugins registered via setuptools entry points if not already loaded
+
+    The default plugins are re-registered after the entry point plugins are loaded
+    so that, as if all plugins were loaded at start up, third-party plugins are called
+    after the default plugins. This is done holding the lock get_field_dispatch() takes
+    so another thread can't build the dispatch table while plugins are being registered.
+
+    Returns:
+        True if plugins were loaded by this call, False if already loaded
+    """
+    global _entrypoints_loaded
+    with _field_dispatch_lock:
+        if _entrypoints_loaded:
+            return False
+        _entrypoints_loaded = True
+        if not PM.load_setuptools_entrypoints(APP_NAME):
+            return True
+        # pluggy calls the most recently registered plugin first
+        for plugin in DEFAULT_PLUGINS:
+            mod = PM.unregister(name=plugin)
+            PM.register(mod, plugin)
+        return True
+
+
+def is_builtin_field(field: str) -> bool:
+    """Return True if field is handled by the template parser rather than a plugin"""
+    field = "{" + field + "}"
+    return field in PUNCTUATION_FIELDS or field in FORMAT_FIELDS
+
+
+def is_parser_field(field: str) -> bool:
+    """Return True if field is handled by the template parser, including variables"""
+    return field.startswith("%") or field == "var" or is_builtin_field(field)
+
+
+class PlannedField(NamedTuple):
+    """A field used by a template and how it will be looked up
+
+    Attributes:
+        field: field as used in the template, e.g. "pdf:title" or "created.year"
+        plugin: name of the plugin that declares the field; None if not declared by a plugin
+        builtin: True if the field is handled by the template parser (e.g. punctuation, {var})
+        batch: True if the plugin may resolve the field in a batch with get_template_values
+    """
+
+    field: str
+    plugin: Optional[str]
+    builtin: bool
+    batch: bool
+
+
+@dataclass
+class TemplatePlan:
+    """Fields and plugins needed to render a set of templates, found without reading any file
+
+    Attributes:
+        fields: each field used by the templates, in order of first use
+        plugins: names of the plugins that will be called to render the templates
+        unused_plugins: names of registered plugins that will not be called
+        requests: fields that can be prefetched with FileTemplate.prefetch()
+    """
+
+    fields: List[PlannedField]
+    plugins: List[str]
+    unused_plugins: List[str]
+    requests: Tuple[FieldRequest, ...]
+
+    @property
+    def unknown_fields(self) -> List[str]:
+        """Fields not declared by any plugin; these are looked up by calling each
+        plugin that does not declare its fields"""
+        return [f.field for f in self.fields if f.plugin is None and not f.builtin]
+
+
+def plan_templates(templates: Iterable[str]) -> TemplatePlan:
+    """Find the fields and plugins needed to render templates
+
+    Third-party plugins are loaded if a field is not declared by the default plugins.
+
+    Raises:
+        mdinfo.mtlparser.SyntaxError: if a template is not valid
+    """
+    templates = tuple(templates)
+    used = {}
+    for template in templates:
+        for field, subfield in _template_fields(_parse_template(template)):
+            used[f"{field}:{subfield}" if subfield is not None else field] = field
+    stems = {field.split(".", 1)[0] for field in used.values()}
+    dispatch = get_field_dispatch()
+    if (
+        any(stem not in dispatch.fields and not is_parser_field(stem) for stem in stems)
+        and load_entrypoint_plugins()
+    ):
+        dispatch = get_field_dispatch()
+
+    fields = []
+    plugins = {}
+    for name, field in used.items():
+        stem = field.split(".", 1)[0]
+        impl = dispatch.fields.get(stem)
+        builtin = is_parser_field(stem)
+        fields.append(
+            PlannedField(
+                name,
+                impl.plugin_name if impl else None,
+                builtin,
+                stem in dispatch.batch_fields,
+            )
+        )
+        if impl:
+            plugins[impl.plugin_name] = None
+        elif not builtin:
+            plugins.update(dict.fromkeys(dispatch.fallback_plugins))
+    return TemplatePlan(
+        fields=fields,
+        plugins=list(plugins),
+        unused_plugins=[
+            name for name, _ in PM.list_name_plugin() if name not in plugins
+        ],
+        requests=_template_requests(templates),
+    )
+
+
 # ensure locale set to user's locale
 locale.setlocale(locale.LC_ALL, "")
 
@@ -60,17 +328,39 @@ locale.setlocale(locale.LC_ALL, "")
 class FileTemplate:
     """FileTemplate class to render a template string from a file and it's associated metadata"""
 
-    def __init__(self, filepath: Union[str, pathlib.Path]):
-        """Inits FileTemplate class with filepath"""
+    def __init__(
+        self,
+        filepath: Union[str, pathlib.Path],
+        cache: Optional[MetadataCache] = None,
+    ):
+        """Inits FileTemplate class with filepath
+
+        Args:
+            filepath: path to the file to render templates for
+            cache: optional MetadataCache used to store and retrieve field values
+                for fields that depend only on the file contents
+        """
 
         if isinstance(filepath, str):
             filepath = pathlib.Path(filepath)
-        if not filepath.exists():
-            raise FileNotFoundError(f"File {filepath} does not exist")
 
         self.filepath = str(filepath)
         self.hook = PM.hook
 
+        # per-file context shared by plugins across all fields and templates rendered
+        # with this FileTemplate so each file is opened and parsed only once;
+        # the file is stat'd once here and the result shared by all plugins that need it
+        self.context = FileContext(self.filepath)
+        try:
+            self.context.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File {filepath} does not exist") from None
+        self.cache = cache
+
+        # fields collected by prefetch() not yet resolved and values resolved in batches
+        self._prefetch: List[FieldRequest] = []
+        self._prefetched: Dict[FieldRequest, List[Optional[str]]] = {}
+
         # initialize render options
         # this will be done in render() but for testing, some of the lookup functions are called directly
         options = RenderOptions()
@@ -86,6 +376,19 @@ class FileTemplate:
         self.quote = options.quote
         self.dest_path = options.dest_path
 
+    def __enter__(self) -> "FileTemplate":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close any resources, such as open files, which plugins stored in the file's context
+
+        The FileTemplate may still be used after it is closed; files are opened again if needed.
+        """
+        self.context.close()
+
     def get_field_value(
         self,
         field: str,
@@ -94,15 +397,88 @@ class FileTemplate:
         default: List[str],
     ) -> Optional[List[Optional[str]]]:
         """Get the value of a field"""
-        return self.hook.get_template_value(
+        if self.cache is not None and field.split(".", 1)[0] in CACHEABLE_FIELDS:
+            return self._get_cached_field_value(field, subfield, field_arg, default)
+        values = self._call_hook(field, subfield, field_arg, default)
+        if values is None and not is_builtin_field(field) and load_entrypoint_plugins():
+            # field not handled by the default plugins; try again with third-party plugins
+            values = self._call_hook(field, subfield, field_arg, default)
+        return values
+
+    def _call_hook(
+        self,
+        field: str,
+        subfield: Optional[str],
+        field_arg: Optional[str],
+        default: List[str],
+    ) -> Optional[List[Optional[str]]]:
+        """Call the get_template_value hook of the plugin that handles field"""
+        dispatch = get_field_dispatch()
+        if self._prefetch:
+            # resolve the batch on first lookup so nothing is read if values are in the cache
+            fields, self._prefetch = self._prefetch, []
+            self._prefetched.update(
+                dispatch.get_template_values(self.filepath, fields, self.context)
+            )
+        # only fields with a static default are prefetched; a default that contains
+        # other fields is not rendered unless the plugin uses it
+        if not isinstance(default, LazyValues):
+            request = FieldRequest(field, subfield, field_arg, tuple(default))
+            if request in self._prefetched:
+                return self._prefetched[request]
+        return dispatch.get_template_value(
             filepath=self.filepath,
             field=field,
             subfield=subfield,
             field_arg=field_arg,
             default=default,
+            context=self.context,
             options=self.options,
         )
 
+    def _get_cached_field_value(
+        self,
+        field: str,
+        subfield: Optional[str],
+        field_arg: Optional[str],
+        default: List[str],
+    ) -> Optional[List[Optional[str]]]:
+        """Get the value of a field from the cache, calling the plugin and storing the value if not cached"""
+        stat = self.context.stat()
+        if isinstance(default, LazyValues):
+            # don't render the default to look up the value; a value is only cached
+            # if the plugin didn't use the default so the value doesn't depend on it
+            values = self.cache.get(stat, field, subfield, field_arg, None)
+            if values is not None:
+                return values
+            values = self._call_hook(field, subfield, field_arg, default)
+            if values is not None and not default.rendered:
+                self.cache.set(stat, field, subfield, field_arg, None, values)
+            return values
+        values = self.cache.get(stat, field, subfield, field_arg, default)
+        if values is not None:
+            return values
+        values = self._call_hook(field, subfield, field_arg, default)
+        if values is not None:
+            self.cache.set(stat, field, subfield, field_arg, default, values)
+        return values
+
+    def prefetch(self, templates: Iterable[str]):
+        """Collect the fields used by templates so plugins can resolve them in a single call
+
+        Plugins that implement the get_template_values hook are called once, when the first
+        field is looked up, with all the fields they handle; fields whose default value
+        depends on other fields or variables are looked up when the template is rendered.
+
+        Args:
+            templates: template strings that will be rendered for the file
+        """
+        self._prefetch = [
+            request
+            for request in _template_requests(tuple(templates))
+            if request not in self._prefetched
+        ]
+
     def render(
         self,
         template: str,
@@ -122,6 +498,74 @@ class FileTemplate:
             raise TypeError(f"template must be type str, not {type(template)}")
 
         options = options or RenderOptions()
+        self._set_options(options)
+        parser = self._get_parser(options, self.get_field_value)
+        return self._render(parser, template, options)
+
+    def render_many(
+        self,
+        templates: Iterable[str],
+        options: Optional[RenderOptions] = None,
+    ) -> List[List[str]]:
+        """Render several templates for the file in a single pass
+
+        Fields used by the templates are prefetched and each field is looked up only once,
+        the values shared by every template that uses it; for example {filepath.stem} in
+        several templates is rendered from a single lookup. A field with a default value
+        that contains other template fields is looked up again if the plugin used the
+        default the last time it was looked up.
+
+        Args:
+            templates: template strings
+            options: a RenderOptions instance used for all the templates
+
+        Returns:
+            list with the list of rendered strings for each template
+        """
+        templates = list(templates)
+        for template in templates:
+            if type(template) is not str:
+                raise TypeError(f"template must be type str, not {type(template)}")
+
+        options = options or RenderOptions()
+        self._set_options(options)
+        self.prefetch(templates)
+
+        # values depend on options so are only shared by templates rendered together
+        values: Dict[FieldRequest, Optional[List[Optional[str]]]] = {}
+        # values of fields looked up with a default which the plugin didn't use
+        lazy_values: Dict[
+            Tuple[str, Optional[str], Optional[str]], Optional[List[Optional[str]]]
+        ] = {}
+
+        def get_field_value(
+            field: str,
+            subfield: Optional[str],
+            field_arg: Optional[str],
+            default: List[str],
+        ) -> Optional[List[Optional[str]]]:
+            if isinstance(default, LazyValues):
+                # the default is only rendered if the plugin uses it; if not, the value
+                # doesn't depend on the default and can be shared by other lazy lookups
+                key = (field, subfield, field_arg)
+                if key in lazy_values:
+                    return lazy_values[key]
+                value = self.get_field_value(field, subfield, field_arg, default)
+                if not default.rendered:
+                    lazy_values[key] = value
+                return value
+            request = FieldRequest(field, subfield, field_arg, tuple(default))
+            if request not in values:
+                values[request] = self.get_field_value(
+                    field, subfield, field_arg, default
+                )
+            return values[request]
+
+        parser = self._get_parser(options, get_field_value)
+        return [self._render(parser, template, options) for template in templates]
+
+    def _set_options(self, options: RenderOptions):
+        """Set the render options used by the lookup functions"""
         self.options = options
         self.tag = options.tag
         self.inplace_sep = options.inplace_sep
@@ -134,6 +578,8 @@ class FileTemplate:
         self.quote = options.quote
         self.dest_path = options.dest_path
 
+    def _get_parser(self, options: RenderOptions, get_field_values) -> MTLParser:
+        """Return MTLParser for options which looks up fields with get_field_values"""
         sanitize_value = (
             sanitize_dirname
             if options.dirname
@@ -143,20 +589,68 @@ class FileTemplate:
         )
         sanitize = sanitize_filename if options.filename else None
 
-        parser = MTLParser(
-            get_field_values=self.get_field_value,
+        return MTLParser(
+            get_field_values=get_field_values,
             sanitize=sanitize,
             sanitize_value=sanitize_value,
             expand_inplace=options.expand_inplace,
             inplace_sep=options.inplace_sep,
             none_str=options.none_str,
         )
+
+    def _render(
+        self, parser: MTLParser, template: str, options: RenderOptions
+    ) -> List[str]:
+        """Render template with parser"""
         rendered = parser.render(template)
         if options.strip:
             rendered = [r.strip() for r in rendered]
         return rendered
 
 
+def _parse_template(template: str) -> List[TemplateString]:
+    """Parse template into a list of TemplateString without rendering it"""
+    return MTLParser(get_field_values=lambda *args: None).parse_statement(template)
+
+
+@functools.lru_cache(maxsize=256)
+def _template_requests(templates: Tuple[str, ...]) -> Tuple[FieldRequest, ...]:
+    """Return the prefetchable FieldRequests for templates; computed once for each set of templates"""
+    requests = {}
+    for template in templates:
+        for request in _field_requests(_parse_template(template)):
+            requests[request] = None
+    return tuple(requests)
+
+
+def _template_fields(
+    template_strings: List[TemplateString],
+) -> Iterable[Tuple[str, Optional[str]]]:
+    """Yield (field, subfield) for each field in parsed template_strings, including nested fields"""
+    for ts in template_strings:
+        if not ts.field:
+            continue
+        yield ts.field, ts.subfield
+        for statement in [ts.combine, ts.bool, ts.default or [], *ts.conditional]:
+            yield from _template_fields(statement)
+
+
+def _field_requests(template_strings: List[TemplateString]) -> Iterable[FieldRequest]:
+    """Yield a FieldRequest for each plugin field in parsed template_strings that has a static default"""
+    for ts in template_strings:
+        if not ts.field:
+            continue
+        default = ts.default or []
+        for statement in [ts.combine, ts.bool, default, *ts.conditional]:
+            yield from _field_requests(statement)
+        if is_parser_field(ts.field):
+            continue
+        if any(d.field for d in default):
+            continue
+        default = ("".join(d.pre + d.post for d in default),) if default else ()
+        yield FieldRequest(ts.field, ts.subfield, ts.field_arg, default)
+
+
 def get_template_help() -> List[Any]:
     """Return help for template system as list of markdown strings or lists of lists"""
     # TODO: would be better to use importlib.abc.ResourceReader but I can't find a single example of how to do this
@@ -209,6 +703,7 @@ def get_template_help() -> List[Any]:
     md.append("\n" + dedent(format_help).strip())
 
     # process help from plugins
+    load_entrypoint_plugins()
     help_texts = PM.hook.get_template_help()
     for help_text in help_texts:
         # help_text is an iterable of str, dicts, or lists or lists
@@ -1,12 +1,35 @@
 """ pluggy hookimpl specification for mdinfo template system """
 
-from typing import Iterable, List, Optional
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 from pluggy import HookspecMarker
 
+from .filecontext import FileContext
+
 hookspec = HookspecMarker("mdinfo")
 
 
+class FieldRequest(NamedTuple):
+    """A template field to be resolved by the get_template_values hook"""
+
+    field: str
+    subfield: Optional[str]
+    field_arg: Optional[str]
+    default: Tuple[str, ...]
+
+
+@hookspec
+def get_template_fields() -> Iterable[str]:
+    """Return iterable of the names of the template fields handled by this plugin, e.g. ["audio"]
+
+    Names are given without braces, subfields or attributes: a plugin that handles
+    {created.year} declares "created". mdinfo uses the declared fields to call only
+    the plugin that handles a field; each field may be declared by only one plugin.
+    Plugins that don't implement this hook have get_template_value called for any
+    field not declared by another plugin.
+    """
+
+
 @hookspec(firstresult=True)
 def get_template_value(
     filepath: str,
@@ -14,9 +37,14 @@ def get_template_value(
     subfield: Optional[str],
     field_arg: Optional[str],
     default: List[str],
+    context: FileContext,
 ) -> Optional[List[Optional[str]]]:
     """Called by template.py to get template value for custom template
 
+    context is a FileContext shared by all fields and templates rendered for filepath;
+    plugins may use it to cache parsed data so the file is only read once.
+    Plugins that don't need it may omit the argument from their hookimpl.
+
     Return: None if field is not handled by this plugin otherwise list of str values"""
 
     # return value of None means that field is not handled by this plugin
@@ -24,6 +52,23 @@ def get_template_value(
     # return value of [value] means that field is handled by this plugin and value resolved to value
 
 
+@hookspec
+def get_template_values(
+    filepath: str,
+    fields: List[FieldRequest],
+    context: FileContext,
+) -> Optional[Dict[FieldRequest, List[Optional[str]]]]:
+    """Optional batch version of get_template_value called to resolve several fields at once
+
+    Before rendering templates for a file, mdinfo collects the fields referenced by the templates
+    and calls this hook once with all the fields declared by the plugin (see get_template_fields).
+    Only plugins that declare their fields may implement this hook.
+
+    Return: dict mapping each FieldRequest resolved to its list of values (same as get_template_value);
+    fields not in the dict (for example, because the request is invalid) are looked up with get_template_value
+    when the template is rendered."""
+
+
 @hookspec
 def get_template_help() -> Iterable:
     """Return iterable of one or more help elements. Each element may be a str, a dict, or a list of lists"""
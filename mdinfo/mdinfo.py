@@ -4,37 +4,170 @@ from __future__ import annotations
 
 import csv
 import datetime
+import functools
 import json
 import pathlib
 import re
 import sys
-from typing import Any
+import textwrap
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, Mapping, TextIO
 
+from .cache import open_cache
 from .constants import NONE_STR_SENTINEL
-from .filetemplate import FileTemplate
-from .mtlparser import MTLParser
+from .filetemplate import FieldConflictError, FileTemplate
+from .mtlparser import MTLParser, UnknownFieldError
+from .parallel import map_files
 from .renderoptions import RenderOptions
 
 __all__ = [
+    "FileMetadata",
+    "iter_metadata",
     "print_templates_for_files",
     "print_templates_to_csv_for_files",
     "print_templates_to_json_for_files",
 ]
 
 
+@dataclass
+class FileMetadata:
+    """Metadata for a single file returned by iter_metadata()
+
+    Attributes:
+        path: path of the file as given to iter_metadata()
+        values: dict of field name: list of rendered values; undefined values are None
+        errors: dict of field name: error message for fields that could not be rendered;
+            if the file could not be read, every field has an error
+    """
+
+    path: str
+    values: dict[str, list[str | None]] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+def iter_metadata(
+    paths: Iterable[str],
+    templates: Iterable[str] | Mapping[str, str],
+    cache_path: str | None = None,
+    jobs: int = 1,
+    threads: bool = False,
+    ordered: bool = True,
+) -> Iterator[FileMetadata]:
+    """Render templates for each file in paths, yielding a FileMetadata for each file
+
+    Files are processed lazily as results are consumed so paths may be a generator
+    producing an unbounded stream of paths.
+
+    Args:
+        paths: iterable of file paths
+        templates: dict of field name: template or iterable of templates named as with
+            `mdinfo --json`, e.g. "title:{pdf:title}" or "{pdf:title}" (named "pdf:title")
+        cache_path: if provided, field values are stored in and retrieved from
+            the MetadataCache database at cache_path
+        jobs, threads, ordered: see mdinfo.parallel.map_files
+
+    Raises:
+        UnknownFieldError: if a template uses a field that no plugin handles
+        FieldConflictError: if more than one plugin handles a field
+        mdinfo.mtlparser.SyntaxError: if a template is not valid (raised before any file is processed)
+
+    Example:
+        >>> for metadata in iter_metadata(paths, {"title": "{pdf:title}"}):
+        ...     print(metadata.path, metadata.values["title"])
+    """
+    if isinstance(templates, Mapping):
+        names, templates = list(templates.keys()), list(templates.values())
+    else:
+        templates = list(templates)
+        names = [get_field_name(template) for template in templates]
+        templates = [strip_field_name(template) for template in templates]
+    # parse the templates now so syntax errors are raised before any file is processed;
+    # parsed templates are cached and reused for every file
+    parser = MTLParser(get_field_values=lambda *x: x)
+    for template in templates:
+        parser.parse_statement(template)
+
+    get_metadata = functools.partial(
+        get_file_metadata, names=names, templates=templates, cache_path=cache_path
+    )
+    yield from map_files(get_metadata, paths, jobs, threads, ordered)
+
+
+def get_file_metadata(
+    filepath: str,
+    names: list[str],
+    templates: list[str],
+    cache_path: str | None = None,
+) -> FileMetadata:
+    """Render templates for filepath and return FileMetadata with values keyed by names
+
+    The templates are rendered together with FileTemplate.render_many so each field is
+    looked up only once. If that fails, each template is rendered on its own to find
+    which templates could not be rendered.
+    """
+    options = RenderOptions(none_str=NONE_STR_SENTINEL)
+    metadata = FileMetadata(filepath)
+    try:
+        file_template = get_file_template(filepath, cache_path)
+    except OSError as e:
+        metadata.errors = {name: str(e) for name in names}
+        return metadata
+    with file_template:
+        try:
+            rendered = file_template.render_many(templates, options=options)
+        except (UnknownFieldError, FieldConflictError):
+            raise
+        except Exception:
+            rendered = None
+        for i, (name, template) in enumerate(zip(names, templates)):
+            try:
+                values = (
+                    rendered[i]
+                    if rendered is not None
+                    else file_template.render(template, options=options)
+                )
+                metadata.values[name] = [
+                    str(t).replace(NONE_STR_SENTINEL, "") or None for t in values
+                ]
+            except (UnknownFieldError, FieldConflictError):
+                raise
+            except Exception as e:
+                metadata.errors[name] = str(e)
+    return metadata
+
+
 def print_templates_for_files(
-    filepaths: tuple[str],
+    filepaths: Iterable[str],
     templates: tuple[str],
     no_filename: bool,
     path: bool,
     null_separator: bool,
     undefined: str | None,
+    jobs: int = 1,
+    threads: bool = False,
+    ordered: bool = True,
+    cache_path: str | None = None,
 ) -> None:
-    """Print template string for each filepath"""
-    for filepath in filepaths:
-        print_templates(
-            filepath, templates, no_filename, path, null_separator, undefined
-        )
+    """Print template string for each filepath
+
+    If jobs > 1, files are processed in parallel using a process pool
+    (or thread pool if threads is True); output is printed in the same order as filepaths
+    unless ordered is False.
+
+    If cache_path is provided, field values are stored in and retrieved from
+    the MetadataCache database at cache_path.
+    """
+    render = functools.partial(
+        render_templates,
+        templates=templates,
+        no_filename=no_filename,
+        path=path,
+        null_separator=null_separator,
+        undefined=undefined,
+        cache_path=cache_path,
+    )
+    for line in map_files(render, filepaths, jobs, threads, ordered):
+        print(line)
 
 
 def print_templates(
@@ -46,12 +179,29 @@ def print_templates(
     undefined: str | None,
 ) -> None:
     """Print template string for filepath"""
+    print(
+        render_templates(
+            filepath, templates, no_filename, path, null_separator, undefined
+        )
+    )
+
+
+def render_templates(
+    filepath: str,
+    templates: tuple[str],
+    no_filename: bool,
+    path: bool,
+    null_separator: bool,
+    undefined: str | None,
+    cache_path: str | None = None,
+) -> str:
+    """Render templates for filepath and return the line to print"""
     options = RenderOptions(none_str=NONE_STR_SENTINEL)
+    # use a single FileTemplate so the file is only read once for all templates
     rendered_templates = []
-    for template in templates:
-        rendered_templates.extend(
-            FileTemplate(filepath).render(template, options=options)
-        )
+    with get_file_template(filepath, cache_path) as file_template:
+        for rendered in file_template.render_many(templates, options=options):
+            rendered_templates.extend(rendered)
     header = (
         ""
         if no_filename
@@ -61,19 +211,26 @@ def print_templates(
         str(t).replace(NONE_STR_SENTINEL, undefined or "") for t in rendered_templates
     ]
     separator = "\0" if null_separator else " "
-    print(f"{header}{separator.join(rendered_templates)}")
+    return f"{header}{separator.join(rendered_templates)}"
 
 
 def print_templates_to_csv_for_files(
-    filepaths: tuple[str],
+    filepaths: Iterable[str],
     templates: tuple[str],
     no_filename: bool,
     path: bool,
     no_header: bool,
     delimiter: str,
     undefined: str | None,
+    jobs: int = 1,
+    threads: bool = False,
+    ordered: bool = True,
+    cache_path: str | None = None,
 ) -> None:
-    """Print template string for each filepath as CSV"""
+    """Print template string for each filepath as CSV
+
+    See print_templates_for_files for description of jobs, threads, ordered, cache_path.
+    """
 
     delimiter = delimiter or ","  # default to comma if delimiter is None
 
@@ -95,67 +252,133 @@ def print_templates_to_csv_for_files(
     templates = [strip_field_name(t) for t in templates]
     if not no_filename:
         templates.insert(0, "{filepath}" if path else "{filepath.name}")
-    for filepath in filepaths:
-        print_templates_to_csv(filepath, templates, csv_writer, undefined)
+    render = functools.partial(
+        render_templates_to_csv,
+        templates=templates,
+        undefined=undefined,
+        cache_path=cache_path,
+    )
+    for columns in map_files(render, filepaths, jobs, threads, ordered):
+        csv_writer.writerow(columns)
 
 
 def print_templates_to_csv(
     filepath: str, templates: tuple[str], csv_writer: csv.writer, undefined: str | None
 ) -> None:
     """Print template string for filepath as CSV"""
+    csv_writer.writerow(render_templates_to_csv(filepath, templates, undefined))
+
+
+def render_templates_to_csv(
+    filepath: str,
+    templates: tuple[str],
+    undefined: str | None,
+    cache_path: str | None = None,
+) -> list[str]:
+    """Render templates for filepath and return list of CSV columns"""
     options = RenderOptions(none_str=NONE_STR_SENTINEL)
-    columns = [
-        " ".join(FileTemplate(filepath).render(template, options=options))
-        for template in templates
-    ]
-    columns = [str(t).replace(NONE_STR_SENTINEL, undefined or "") for t in columns]
-    csv_writer.writerow(columns)
+    with get_file_template(filepath, cache_path) as file_template:
+        columns = [
+            " ".join(rendered)
+            for rendered in file_template.render_many(templates, options=options)
+        ]
+    return [str(t).replace(NONE_STR_SENTINEL, undefined or "") for t in columns]
 
 
 def print_templates_to_json_for_files(
-    filepaths: tuple[str],
+    filepaths: Iterable[str],
     templates: tuple[str],
     no_filename: bool,
     path: bool,
     array: bool,
     undefined: str | None,
+    jobs: int = 1,
+    threads: bool = False,
+    ordered: bool = True,
+    cache_path: str | None = None,
 ) -> None:
-    """Print template string for each filepath as JSON"""
-    data_list = []
-    for filepath in filepaths:
-        data = get_dict_for_templates(filepath, templates, undefined)
-        if not no_filename:
-            data["filename"] = filepath if path else pathlib.Path(filepath).name
-        data_list.append(data)
+    """Print template string for each filepath as JSON
+
+    See print_templates_for_files for description of jobs, threads, ordered, cache_path.
+    """
+    render = functools.partial(
+        get_dict_for_templates,
+        templates=templates,
+        undefined=undefined,
+        filename=not no_filename,
+        path=path,
+        cache_path=cache_path,
+    )
+    results = map_files(render, filepaths, jobs, threads, ordered)
     if array:
-        print(convert_to_json(data_list))
+        write_json_array(results, sys.stdout)
     else:
-        for data in data_list:
-            print(convert_to_json(data))
+        # newline delimited JSON: one compact object per line, written as each file is processed
+        for data in results:
+            print(convert_to_json(data, indent=None))
+
+
+def write_json_array(data_iter: Iterable[Any], fp: TextIO, indent: int = 4) -> None:
+    """Write items from data_iter to fp as a JSON array, one item at a time
+
+    Output is identical to convert_to_json(list(data_iter)) but items are written as they
+    are produced so memory use does not grow with the number of items.
+    """
+    prefix = " " * indent
+    count = 0
+    for data in data_iter:
+        fp.write("[\n" if count == 0 else ",\n")
+        fp.write(textwrap.indent(convert_to_json(data, indent=indent), prefix))
+        count += 1
+    fp.write("\n]\n" if count else "[]\n")
 
 
 def get_dict_for_templates(
-    filepath: str, templates: tuple[str], undefined: str | None
+    filepath: str,
+    templates: tuple[str],
+    undefined: str | None,
+    filename: bool = False,
+    path: bool = False,
+    cache_path: str | None = None,
 ) -> dict[str, str]:
-    """Get dict for filepath for converting to JSON"""
+    """Get dict for filepath for converting to JSON
+
+    If filename is True, "filename" key is set to the name of the file (or full path if path is True).
+    """
     options = RenderOptions(none_str=NONE_STR_SENTINEL)
     data = {}
-    for template in templates:
+    with get_file_template(filepath, cache_path) as file_template:
+        rendered_templates = file_template.render_many(
+            (strip_field_name(template) for template in templates), options=options
+        )
+    for template, rendered in zip(templates, rendered_templates):
         field = get_field_name(template)
-        template = strip_field_name(template)
-        rendered = FileTemplate(filepath).render(template, options=options)
         rendered = [
             str(t).replace(NONE_STR_SENTINEL, undefined or "") for t in rendered
         ]
         rendered = [t or None for t in rendered]
         data[field] = rendered[0] if len(rendered) == 1 else rendered
+    if filename:
+        data["filename"] = filepath if path else pathlib.Path(filepath).name
     return data
 
 
-def convert_to_json(data: Any, indent: int = 4) -> str:
-    """Convert data to JSON, converting datetime objects to ISO format"""
+def get_file_template(filepath: str, cache_path: str | None = None) -> FileTemplate:
+    """Return FileTemplate for filepath, using the MetadataCache at cache_path if provided"""
+    cache = open_cache(cache_path) if cache_path else None
+    return FileTemplate(filepath, cache=cache)
+
+
+def convert_to_json(data: Any, indent: int | None = 4) -> str:
+    """Convert data to JSON, converting datetime objects to ISO format
+
+    If indent is None, returns compact JSON on a single line.
+    """
     default = lambda o: o.isoformat() if isinstance(o, datetime.datetime) else o
-    return json.dumps(data, indent=indent, sort_keys=True, default=default)
+    separators = (",", ":") if indent is None else None
+    return json.dumps(
+        data, indent=indent, separators=separators, sort_keys=True, default=default
+    )
 
 
 def get_field_name(template: str) -> str:
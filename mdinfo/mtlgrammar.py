@@ -0,0 +1,285 @@
+"""Recursive descent parser for the Metadata Template Language (MTL)
+
+Implements the PEG grammar in mtlparser.tx without textX: parse() returns a model with
+the same shape as the textX model for the grammar (the same class and attribute names,
+with None for optional parts that are not present) so it can be used by MTLParser
+in place of textX, which is slow both to build the metamodel and to parse.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import List, NamedTuple, Optional
+
+__all__ = ["ParseError", "parse"]
+
+# terminals of the grammar in mtlparser.tx
+# a repeated rule such as FIELD_WORD+ is a single regex as the PEG repetition is greedy
+NON_TEMPLATE_STRING = re.compile(r"[^\{\},\?]*")
+DELIM_WORD = re.compile(r"[^\{\}]*(?=\+[\w\%])")
+FIELD = re.compile(r"(?:[\%]?[\.\w]+)+")
+SUBFIELD = re.compile(r"(?:[\.\w:\/\-\~\'\"\%\@\#\^\’]+(?:\\\s)?)+")
+FIELD_ARG = re.compile(r"[^\(\)\{\}]+")
+FILTER_FUNCTION = re.compile(r"[\.\w:\/]+(\([^\)]*\))?")
+SPACES = re.compile(r" +")
+NEGATION = "not "
+OPERATORS = (
+    "contains",
+    "matches",
+    "startswith",
+    "endswith",
+    "<=",
+    ">=",
+    "<",
+    ">",
+    "==",
+    "!=",
+)
+FIND_WORD = re.compile(r"[^\[\]\|]*(?=\,)")
+REPLACE_WORD = re.compile(r"[^\[\]\|]*")
+
+
+class ParseError(Exception):
+    """Raised when a template string does not conform to the MTL grammar"""
+
+    pass
+
+
+class Delim(NamedTuple):
+    value: Optional[str]
+
+
+class FieldArg(NamedTuple):
+    value: str
+
+
+class Filter(NamedTuple):
+    value: List[str]
+
+
+class FindReplacePair(NamedTuple):
+    find: Optional[str]
+    replace: Optional[str]
+
+
+class FindReplace(NamedTuple):
+    pairs: List[FindReplacePair]
+
+
+class Conditional(NamedTuple):
+    negation: Optional[str]
+    operator: str
+    value: List[Statement]
+
+
+class Combine(NamedTuple):
+    value: Optional[Statement]
+
+
+class Boolean(NamedTuple):
+    value: Optional[Statement]
+
+
+class Default(NamedTuple):
+    value: Optional[Statement]
+
+
+class Template(NamedTuple):
+    delim: Optional[Delim]
+    field: str
+    subfield: Optional[str]
+    fieldarg: Optional[FieldArg]
+    filter: Optional[Filter]
+    findreplace: Optional[FindReplace]
+    conditional: Optional[Conditional]
+    combine: Optional[Combine]
+    bool: Optional[Boolean]
+    default: Optional[Default]
+
+
+class TemplateString(NamedTuple):
+    pre: Optional[str]
+    template: Optional[Template]
+    post: Optional[str]
+
+
+class Statement(NamedTuple):
+    template_strings: List[TemplateString]
+
+    def __bool__(self) -> bool:
+        # textX returns an empty string for an empty template
+        return bool(self.template_strings)
+
+
+def parse(template: str) -> Statement:
+    """Parse template string into a Statement
+
+    Raises:
+        ParseError: if template is not a valid MTL template
+    """
+    return _Parser(template).parse()
+
+
+class _Parser:
+    """Parser for a single template string
+
+    Nested statements that match nothing are None as in the textX model. Optional parts
+    of a template that start to match but then fail (for example a '(' without a matching ')')
+    raise ParseError straight away: the grammar has no other way to match that character
+    so textX would fail to parse the template too.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pos = 0
+
+    def parse(self) -> Statement:
+        statement = self.statement()
+        if self.pos != len(self.text):
+            self.error("'{' or end of template")
+        return statement or Statement([])
+
+    def error(self, expected: str):
+        """Raise ParseError for the current position"""
+        raise ParseError(
+            f"Expected {expected} at position {self.pos + 1}: "
+            f"'{self.text[:self.pos]}*{self.text[self.pos:]}'"
+        )
+
+    def match(self, regex: re.Pattern) -> Optional[str]:
+        """Match regex at the current position; return the matched string or None if no match or empty"""
+        match = regex.match(self.text, self.pos)
+        if not match:
+            return None
+        self.pos = match.end()
+        return match.group() or None
+
+    def consume(self, literal: str) -> bool:
+        """Consume literal if it is at the current position"""
+        if self.text.startswith(literal, self.pos):
+            self.pos += len(literal)
+            return True
+        return False
+
+    def statement(self) -> Optional[Statement]:
+        template_strings = []
+        while True:
+            start = self.pos
+            pre = self.match(NON_TEMPLATE_STRING)
+            template = self.template() if self.consume("{") else None
+            post = self.match(NON_TEMPLATE_STRING)
+            if self.pos == start:
+                break
+            template_strings.append(TemplateString(pre, template, post))
+        return Statement(template_strings) if template_strings else None
+
+    def template(self) -> Template:
+        """Parse a template; the opening brace has been consumed"""
+        delim = self.delim()
+
+        field = self.match(FIELD)
+        if field is None:
+            self.error("field name")
+
+        subfield = None
+        if self.consume(":"):
+            subfield = self.match(SUBFIELD)
+            if subfield is None:
+                self.error("subfield")
+
+        fieldarg = None
+        if self.consume("("):
+            fieldarg = FieldArg(self.match(FIELD_ARG) or "")
+            if not self.consume(")"):
+                self.error("')'")
+
+        filter_ = self.filter() if self.consume("|") else None
+        findreplace = self.findreplace() if self.consume("[") else None
+        conditional = (
+            self.conditional() if self.text.startswith(" ", self.pos) else None
+        )
+        combine = Combine(self.statement()) if self.consume("&") else None
+        bool_ = Boolean(self.statement()) if self.consume("?") else None
+        default = Default(self.statement()) if self.consume(",") else None
+
+        if not self.consume("}"):
+            self.error("'}'")
+        return Template(
+            delim,
+            field,
+            subfield,
+            fieldarg,
+            filter_,
+            findreplace,
+            conditional,
+            combine,
+            bool_,
+            default,
+        )
+
+    def delim(self) -> Optional[Delim]:
+        match = DELIM_WORD.match(self.text, self.pos)
+        if match:
+            # DELIM_WORD is always followed by '+'
+            self.pos = match.end() + 1
+            return Delim(match.group() or None)
+        if self.consume("+"):
+            return Delim(None)
+        return None
+
+    def filter(self) -> Optional[Filter]:
+        """Parse filters; the leading '|' has been consumed"""
+        values = []
+        while True:
+            start = self.pos
+            if values and not self.consume("|"):
+                break
+            value = self.match(FILTER_FUNCTION)
+            if value is None:
+                self.pos = start
+                break
+            values.append(value)
+        # the leading '|' is suppressed in the grammar so a filter with no functions is None
+        return Filter(values) if values else None
+
+    def findreplace(self) -> FindReplace:
+        """Parse find/replace pairs; the opening '[' has been consumed"""
+        pairs = []
+        while True:
+            start = self.pos
+            if pairs and not self.consume("|"):
+                break
+            match = FIND_WORD.match(self.text, self.pos)
+            if not match:
+                self.pos = start
+                break
+            # FIND_WORD is always followed by ','
+            self.pos = match.end() + 1
+            pairs.append(
+                FindReplacePair(match.group() or None, self.match(REPLACE_WORD))
+            )
+        if not self.consume("]"):
+            self.error("find/replace pair or ']'")
+        return FindReplace(pairs)
+
+    def conditional(self) -> Conditional:
+        """Parse a conditional expression which starts with one or more spaces"""
+        self.match(SPACES)
+        negation = NEGATION if self.consume(NEGATION) else None
+        for operator in OPERATORS:
+            if self.consume(operator):
+                break
+        else:
+            self.error("conditional operator")
+        if self.match(SPACES) is None:
+            self.error("' '")
+
+        values = []
+        while True:
+            statement = self.statement()
+            if statement is None:
+                break
+            values.append(statement)
+            if not self.consume("|"):
+                break
+        return Conditional(negation, operator, values)
@@ -6,14 +6,19 @@
 
 from __future__ import annotations
 
+import collections
+import collections.abc
 import dataclasses
+import functools
+import itertools
 import pathlib
 import re
 import shlex
+import threading
 from dataclasses import dataclass
-from typing import Any, Callable, List, Optional, Tuple
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional, Tuple
 
-from textx import TextXSyntaxError, metamodel_from_file
+from .mtlgrammar import ParseError, Statement, parse
 
 
 class UnknownFieldError(Exception):
@@ -28,6 +33,50 @@ class SyntaxError(Exception):
     pass
 
 
+class LazyValues(collections.abc.Sequence):
+    """Sequence of rendered values which is only rendered when first accessed
+
+    Used for the default value of a field when the default contains other template fields
+    so that a fallback chain such as {pdf:title,{docx:title}} only looks up the fallback
+    fields if they are needed.
+    """
+
+    def __init__(self, render: Callable[[], List[str]]):
+        self._render = render
+        self._values = None
+
+    @property
+    def rendered(self) -> bool:
+        """True if the values have been rendered"""
+        return self._values is not None
+
+    @property
+    def values(self) -> List[str]:
+        """Return the values, rendering them if needed"""
+        if self._values is None:
+            self._values = self._render()
+            self._render = None
+        return self._values
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, LazyValues):
+            other = other.values
+        return self.values == other
+
+    def __repr__(self) -> str:
+        values = repr(self._values) if self.rendered else "<not rendered>"
+        return f"{self.__class__.__name__}({values})"
+
+
 # convert TemplateString to dataclass
 @dataclass
 class TemplateString:
@@ -43,11 +92,24 @@ class TemplateString:
     conditional: list[TemplateString] = dataclasses.field(default_factory=list)
     bool: list[TemplateString] = dataclasses.field(default_factory=list)
     default: TemplateString | None = None
+    combine: list[TemplateString] = dataclasses.field(default_factory=list)
     post: str = ""
 
 
 MTL_GRAMMAR_MODEL = str(pathlib.Path(__file__).parent / "mtlparser.tx")
-"""TextX metamodel for template language """
+"""Grammar for the template language; implemented by the parser in mtlgrammar"""
+
+TEMPLATE_CACHE_SIZE = 1024
+"""Maximum number of parsed template statements kept in the MTLParserModel cache"""
+
+
+class TemplateCacheInfo(NamedTuple):
+    """Statistics for the MTLParserModel template cache"""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
 
 
 PUNCTUATION_FIELDS = {
@@ -89,29 +151,121 @@ def format_str_value(value: Any, format_str: str) -> str:
     return format_str.format(value)
 
 
+def _statement_fields(statement) -> Iterable[str]:
+    """Yield the name of each field in a parsed Statement, including nested fields"""
+    for ts in statement.template_strings:
+        if not ts.template:
+            continue
+        yield ts.template.field
+        for branch in (ts.template.combine, ts.template.bool, ts.template.default):
+            if branch is not None and branch.value is not None:
+                yield from _statement_fields(branch.value)
+        if ts.template.conditional is not None:
+            for value in ts.template.conditional.value or []:
+                yield from _statement_fields(value)
+
+
+def _assigns_variables(statement) -> bool:
+    """Return True if parsed Statement (which may be None) assigns a {var}"""
+    return statement is not None and "var" in _statement_fields(statement)
+
+
+RenderFunction = Callable[["MTLParser"], List[str]]
+"""Compiled template statement: renders the statement for an MTLParser"""
+
+
+class CompiledTemplate(NamedTuple):
+    """A parsed template and the function which renders it"""
+
+    statement: Statement
+    render: RenderFunction
+
+
 class MTLParserModel:
-    """Parser model for MTLParser"""
+    """Parser model for MTLParser
+
+    Parsed and compiled template statements are kept in a bounded LRU cache keyed by the
+    template string so a template used for many files is only parsed and compiled once per run.
+    """
 
     # implemented as Singleton
+    _init_lock = threading.Lock()
 
     def __new__(cls, *args, **kwargs):
         """create new object or return instance of already created singleton"""
-        if not hasattr(cls, "instance") or not cls.instance:
-            cls.instance = super().__new__(cls)
+        # a new MTLParser is created for every template rendered so check without the lock first
+        instance = cls.__dict__.get("instance")
+        if instance is not None:
+            return instance
+        with cls._init_lock:
+            if not hasattr(cls, "instance") or not cls.instance:
+                cls.instance = super().__new__(cls)
 
         return cls.instance
 
     def __init__(self):
         """return existing singleton or create a new one"""
 
-        if hasattr(self, "metamodel"):
+        if "_cache" in self.__dict__:
             return
 
-        self.metamodel = metamodel_from_file(MTL_GRAMMAR_MODEL, skipws=False)
+        # lock as the singleton may be first used by several threads at once (mdinfo --threads)
+        with self._init_lock:
+            if hasattr(self, "_cache"):
+                return
+            self._init_model()
+
+    def _init_model(self):
+        """Create the template cache"""
+        self.cache_size = TEMPLATE_CACHE_SIZE
+        self._cache_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        # set last: __init__ checks for _cache without the lock
+        self._cache = collections.OrderedDict()
 
     def parse(self, template_statement):
-        """Parse a template_statement string"""
-        return self.metamodel.model_from_str(template_statement)
+        """Parse a template_statement string, returning cached model if already parsed"""
+        return self.compile(template_statement).statement
+
+    def compile(self, template_statement) -> CompiledTemplate:
+        """Parse and compile a template_statement string, returning cached result if already compiled"""
+        with self._cache_lock:
+            compiled = self._cache.get(template_statement)
+            if compiled is not None:
+                self._hits += 1
+                self._cache.move_to_end(template_statement)
+                return compiled
+            self._misses += 1
+
+        # parse and compile outside the lock; the compiled template holds no state
+        # so it is safe to share across files (and threads)
+        statement = parse(template_statement)
+        compiled = CompiledTemplate(
+            statement,
+            _compile_statement(statement) if statement else lambda parser: [],
+        )
+
+        with self._cache_lock:
+            self._cache[template_statement] = compiled
+            self._cache.move_to_end(template_statement)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return compiled
+
+    def cache_info(self) -> TemplateCacheInfo:
+        """Return hit/miss statistics for the template cache"""
+        with self._cache_lock:
+            return TemplateCacheInfo(
+                self._hits, self._misses, self.cache_size, len(self._cache)
+            )
+
+    def cache_clear(self):
+        """Clear the template cache and reset statistics"""
+        with self._cache_lock:
+            self._cache.clear()
+            self._hits = 0
+            self._misses = 0
 
     def fields(self, template_statement):
         """Return list of fields found in a template statement; does not verify that fields are valid"""
@@ -137,6 +291,8 @@ class MTLParser:
         Args:
             get_field_values: function to get the values for a template; has signature
                 get_field_values(field: str, subfield: str, default: List[str]) -> Optional[List[Optional[str]]]
+                if the default contains template fields it is passed as a LazyValues sequence
+                which is rendered when first accessed
             get_filter_values: optional function to handle custom filter, has signature
                 get_filter_values(filtername: str, filterarg: Optional[str], values: List[str]) -> List[str]
                 should raise SyntaxError if filtername is not handled
@@ -186,279 +342,11 @@ class MTLParser:
         self.variables = {}
 
         try:
-            model = self.parser.parse(template)
-        except TextXSyntaxError as e:
+            compiled = self.parser.compile(template)
+        except ParseError as e:
             raise SyntaxError(e)
 
-        if not model:
-            # empty string
-            return []
-
-        return self._render_statement(model)
-
-    def _render_statement(
-        self,
-        statement,
-        field_arg=None,
-    ):
-        results = []
-        for ts in statement.template_strings:
-            results = self._render_template_string(
-                ts,
-                field_arg,
-                results=results,
-            )
-
-        rendered_strings = results
-
-        if self.sanitize:
-            rendered_strings = [self.sanitize(v) for v in rendered_strings]
-
-        return rendered_strings
-
-    def _render_template_string(
-        self,
-        ts,
-        field_arg,
-        results=None,
-    ):
-        """Render a TemplateString object"""
-
-        results = results or [""]
-
-        if ts.template:
-            # have a template field to process
-            field = ts.template.field
-            subfield = ts.template.subfield
-
-            # process filters
-            filters = []
-            if ts.template.filter is not None:
-                filters = ts.template.filter.value
-
-            # process field arguments
-            field_arg = None
-            if ts.template.fieldarg is not None:
-                field_arg = ts.template.fieldarg.value
-
-            # process delim
-            delim = None
-            if ts.template.delim is not None:
-                # if value is None, means format was {+field}
-                delim = ts.template.delim.value or ""
-                delim = self.expand_variables_to_str(delim, "delim")
-
-            # process combine operator
-            is_combine = False
-            combine_val = None
-            if ts.template.combine is not None:
-                is_combine = True
-                combine_val = (
-                    self._render_statement(
-                        ts.template.combine.value,
-                        field_arg=field_arg,
-                    )
-                    if ts.template.combine.value is not None
-                    else [""]
-                )
-
-            # process bool
-            is_bool = False
-            bool_val = None
-            if ts.template.bool is not None:
-                is_bool = True
-                bool_val = (
-                    self._render_statement(
-                        ts.template.bool.value,
-                        field_arg,
-                    )
-                    if ts.template.bool.value is not None
-                    else [""]
-                )
-
-            # process default
-            default = []
-            if ts.template.default is not None:
-                # default is also a TemplateString
-                default = (
-                    self._render_statement(
-                        ts.template.default.value,
-                        field_arg,
-                    )
-                    if ts.template.default.value is not None
-                    else [""]
-                )
-
-            # process conditional
-            operator = None
-            negation = None
-            conditional_value = []
-            if ts.template.conditional is not None:
-                operator = ts.template.conditional.operator
-                negation = ts.template.conditional.negation
-                if ts.template.conditional.value is not None:
-                    # conditional value is also a TemplateString
-                    conditional_value = []
-                    for cv in ts.template.conditional.value:
-                        conditional_value += self._render_statement(cv)
-                else:
-                    # this shouldn't happen
-                    conditional_value = [""]
-
-            if field.startswith("%"):
-                # variable in form {%var}
-                vals = self.variables.get(field[1:], None)
-                if vals is None:
-                    raise SyntaxError(f"Variable '{field[1:]}' is not defined.")
-            elif field == "var":
-                if not subfield or not default:
-                    raise SyntaxError(
-                        "var must have a subfield and value in form {var:subfield,value}"
-                    )
-                default = [
-                    d for d in default if d != ""
-                ]  # #5, remove empty values from variable assignment
-                self.variables[subfield] = default
-                vals = []
-            else:
-                vals = self.get_field_values(field, subfield, field_arg, default)
-
-            if vals and self.sanitize_value:
-                vals = [self.sanitize_value(v) for v in vals]
-
-            if vals is None:
-                if field:
-                    raise UnknownFieldError(f"Unknown template field: {field}")
-                vals = []
-
-            vals = [val for val in vals if val is not None]
-
-            if self.expand_inplace or delim is not None:
-                sep = delim if delim is not None else self.inplace_sep
-                vals = [sep.join(vals)] if vals else []
-
-            for filter_ in filters:
-                vals = self.get_filter_values(filter_, vals)
-
-            # process find/replace
-            if ts.template.findreplace:
-                new_vals = []
-                for val in vals:
-                    for pair in ts.template.findreplace.pairs:
-                        find = pair.find or ""
-                        find = self.expand_variables_to_str(find, "find/replace")
-                        repl = pair.replace or ""
-                        repl = self.expand_variables_to_str(repl, "find/replace")
-                        val = val.replace(find, repl)
-                    new_vals.append(val)
-                vals = new_vals
-
-            if operator:
-                # have a conditional operator
-
-                def string_test(test_function):
-                    """Perform string comparison using test_function; closure to capture conditional_value, vals, negation"""
-                    match = False
-                    for c in conditional_value:
-                        for v in vals:
-                            if test_function(v, c):
-                                match = True
-                                break
-                        if match:
-                            break
-                    return (
-                        ["True"]
-                        if (match and not negation) or (negation and not match)
-                        else []
-                    )
-
-                def comparison_test(test_function):
-                    """Perform numerical comparisons using test_function; closure to capture conditional_val, vals, negation"""
-                    # returns True if any of the values match the condition
-                    if len(conditional_value) != 1:
-                        raise SyntaxError(
-                            f"comparison operators may only be used with a single conditional value: {conditional_value}"
-                        )
-                    try:
-                        match = any(
-                            bool(test_function(float(v), float(conditional_value[0])))
-                            for v in vals
-                        )
-                        return (
-                            ["True"]
-                            if (match and not negation) or (negation and not match)
-                            else []
-                        )
-                    except ValueError:
-                        raise SyntaxError(
-                            f"comparison operators may only be used with values that can be converted to numbers: {vals} {conditional_value}"
-                        )
-
-                if operator in ["contains", "matches", "startswith", "endswith"]:
-                    # process any "or" values separated by "|"
-                    temp_values = []
-                    for c in conditional_value:
-                        temp_values.extend(c.split("|"))
-                    conditional_value = temp_values
-
-                if operator == "contains":
-                    vals = string_test(lambda v, c: c in v)
-                elif operator == "matches":
-                    vals = string_test(lambda v, c: v == c)
-                elif operator == "startswith":
-                    vals = string_test(lambda v, c: v.startswith(c))
-                elif operator == "endswith":
-                    vals = string_test(lambda v, c: v.endswith(c))
-                elif operator == "==":
-                    match = sorted(vals) == sorted(conditional_value)
-                    vals = (
-                        ["True"]
-                        if (match and not negation) or (negation and not match)
-                        else []
-                    )
-                elif operator == "!=":
-                    match = sorted(vals) != sorted(conditional_value)
-                    vals = (
-                        ["True"]
-                        if (match and not negation) or (negation and not match)
-                        else []
-                    )
-                elif operator == "<":
-                    vals = comparison_test(lambda v, c: v < c)
-                elif operator == "<=":
-                    vals = comparison_test(lambda v, c: v <= c)
-                elif operator == ">":
-                    vals = comparison_test(lambda v, c: v > c)
-                elif operator == ">=":
-                    vals = comparison_test(lambda v, c: v >= c)
-
-            if is_combine and combine_val:
-                vals.extend(val for val in combine_val if val)
-
-            if is_bool:
-                vals = bool_val if vals else default
-            elif not vals and field != "var":
-                # don't assign default value if the template was variable assignment
-                vals = default or [self.none_str]
-
-            pre = ts.pre or ""
-            post = ts.post or ""
-
-            rendered = [pre + str(val) + post for val in vals] if vals else [pre + post]
-            results_new = []
-            for ren in rendered:
-                for res in results:
-                    res_new = res + ren
-                    results_new.append(res_new)
-            results = results_new
-
-        else:
-            # no template
-            pre = ts.pre or ""
-            post = ts.post or ""
-            results = [r + pre + post for r in results]
-
-        return results
+        return compiled.render(self)
 
     def parse_statement(
         self,
@@ -468,7 +356,7 @@ class MTLParser:
 
         try:
             model = self.parser.parse(template_statement)
-        except TextXSyntaxError as e:
+        except ParseError as e:
             raise SyntaxError(e) from e
 
         if not model:
@@ -478,7 +366,7 @@ class MTLParser:
         return self._parse_statement(model)
 
     def _parse_statement(self, statement):
-        """Parse a textx:mtlparser.Statement into a list of TemplateString tuples but don't render them"""
+        """Parse a mtlgrammar.Statement into a list of TemplateString tuples but don't render them"""
         return [self._parse_template_string(ts) for ts in statement.template_strings]
 
     def _parse_template_string(
@@ -531,6 +419,12 @@ class MTLParser:
         else:
             default = []
 
+        # process combine
+        if ts.template.combine is not None and ts.template.combine.value is not None:
+            combine = self._parse_statement(ts.template.combine.value)
+        else:
+            combine = []
+
         # process conditional
         if ts.template.conditional is not None:
             operator = ts.template.conditional.operator
@@ -566,6 +460,7 @@ class MTLParser:
             conditional_values,
             bool_val,
             default,
+            combine,
             post,
         )
 
@@ -578,42 +473,11 @@ class MTLParser:
             value: the value to expand
             name: the name of the value being expanded (used in error messages)
         """
-        expanded = self.expand_variables(value)
-        if len(expanded) != 1:
-            raise SyntaxError(f"{name} must have a single value, not {expanded}")
-        return expanded[0]
+        return _expand_tokens_to_str(_tokenize_variables(value), self.variables, name)
 
     def expand_variables(self, value: str) -> List[str]:
         """Expand variables in value"""
-        # replace any variables with their values
-        values = [value]
-        new_values = []
-        # allow %% to escape %, match variables in form %var
-        variable_match = re.compile(r"(?:%%)*(%[\w]+)?")
-        while True:
-            for value in values:
-                match = variable_match.search(value)
-                if not match or not match[1]:
-                    break
-                var = match[1]
-                var_name = var[1:]
-                if var_name not in self.variables:
-                    raise SyntaxError(f"Variable '{var_name}' is not defined.")
-                for val in values:
-                    for var_val in self.variables[var_name]:
-                        new_values.append(
-                            re.sub(f"(%%)*{var}", r"\g<1>" + var_val, val)
-                        )
-            if new_values == values or not new_values:
-                break
-            values = new_values.copy()
-            new_values = []
-
-        # replace %% with %
-        # any %% left in the string will be replaced with %
-        values = [value.replace("%%", "%") for value in values]
-
-        return values
+        return _expand_tokens(_tokenize_variables(value), self.variables)
 
     def get_field_values(
         self,
@@ -674,121 +538,557 @@ class MTLParser:
 
     def get_filter_values(self, filter_: str, values: List[str]) -> List[str]:
         """Return filtered values"""
-        if re.search(r"\(.*\)", filter_):
-            # filter has arguments
-            filter_, args = filter_.split("(", 1)
-            args = args.rstrip(")")
+        filter_, args = _split_filter(filter_)
+        if args is not None:
             args = self.expand_variables_to_str(args, "Filter arguments")
-        else:
-            args = None
-
-        if filter_ in [
-            "split",
-            "chop",
-            "chomp",
-            "append",
-            "prepend",
-            "remove",
-            "slice",
-            "sslice",
-        ] and (args is None or not len(args)):
+
+        if filter_ in FILTERS_WITH_ARGS and not args:
             raise SyntaxError(f"{filter_} requires arguments")
 
-        if filter_ == "lower":
-            value = [v.lower() for v in values]
-        elif filter_ == "upper":
-            value = [v.upper() for v in values]
-        elif filter_ == "strip":
-            value = [v.strip() for v in values]
-        elif filter_ == "capitalize":
-            value = [v.capitalize() for v in values]
-        elif filter_ == "titlecase":
-            value = [v.title() for v in values]
-        elif filter_ == "braces":
-            value = ["{" + v + "}" for v in values]
-        elif filter_ == "parens":
-            value = [f"({v})" for v in values]
-        elif filter_ == "brackets":
-            value = [f"[{v}]" for v in values]
-        elif filter_ == "shell_quote":
-            value = [shlex.quote(v) for v in values]
-        elif filter_ == "split":
-            if delim := args:
-                new_values = []
-                for v in values:
-                    new_values.extend(v.split(delim))
-                value = new_values
-            else:
-                value = values
-        elif filter_ == "chop":
-            # chop off characters from the end
-            try:
-                chop = int(args)
-            except ValueError as e:
-                raise SyntaxError(f"Invalid value for chop: {args}") from e
-            value = [v[:-chop] for v in values] if chop else values
-        elif filter_ == "chomp":
-            # chop off characters from the beginning
-            try:
-                chomp = int(args)
-            except ValueError as e:
-                raise SyntaxError(f"Invalid value for chomp: {args}") from e
-            value = [v[chomp:] for v in values] if chomp else values
-        elif filter_ == "autosplit":
-            # try to split keyword strings automatically
-            temp_values = [v.replace(",", " ") for v in values]
-            temp_values = [v.replace(";", " ") for v in temp_values]
-            value = []
-            for val in temp_values:
-                value.extend(val.split())
-        elif filter_ == "sort":
-            # sort list of values
-            value = sorted(values)
-        elif filter_ == "rsort":
-            # reverse sort list of values
-            value = sorted(values, reverse=True)
-        elif filter_ == "reverse":
-            # reverse list of values
-            value = values[::-1]
-        elif filter_ == "uniq":
-            # remove duplicate values from list
-            temp_values = []
-            for v in values:
-                if v not in temp_values:
-                    temp_values.append(v)
-            value = temp_values
-        elif filter_ == "join":
-            # join list of values with delimiter
-            delim = args or ""
-            value = [delim.join(values)]
-        elif filter_ == "append":
-            # append value to list
-            value = values + [args]
-        elif filter_ == "prepend":
-            # prepend value to list
-            value = [args] + values
-        elif filter_ == "appends":
-            # append value to each item in list
-            value = [f"{v}{args}" for v in values]
-        elif filter_ == "prepends":
-            # prepend value to each item in list
-            value = [f"{args}{v}" for v in values]
-        elif filter_ == "remove":
-            # remove value from list
-            value = [v for v in values if v != args]
-        elif filter_ == "slice":
-            # slice list of values
-            value = values[create_slice(args)]
-        elif filter_ == "sslice":
-            # slice each value in a list
-            slice_ = create_slice(args)
-            value = [v[slice_] for v in values]
+        if filter_ in _FILTERS:
+            return _FILTERS[filter_](values, args)
         elif self.filter_values:
             # call filter function supplied in __init__
-            value = self.filter_values(filter_, args, values)
+            return self.filter_values(filter_, args, values)
         else:
             raise SyntaxError(f"Unhandled filter: {filter_}")
-        return value
+
+
+# allow %% to escape %, match variables in form %var
+VARIABLE_REGEX = re.compile(r"%%|%(\w+)")
+FILTER_ARGS_REGEX = re.compile(r"\(.*\)")
+
+
+@functools.lru_cache(maxsize=1024)
+def _tokenize_variables(value: str) -> Tuple[str, ...]:
+    """Split value into text and the names of the variables it references
+
+    Returns a tuple with the text (with %% replaced by %) at even indices and variable
+    names at odd indices, e.g. "%%%x-%y" -> ("%", "x", "-", "y", "")
+    """
+    tokens = []
+    text = ""
+    pos = 0
+    for match in VARIABLE_REGEX.finditer(value):
+        text += value[pos : match.start()]
+        pos = match.end()
+        if match[1] is None:
+            text += "%"
+        else:
+            tokens += [text, match[1]]
+            text = ""
+    tokens.append(text + value[pos:])
+    return tuple(tokens)
+
+
+def _expand_tokens(tokens: Tuple[str, ...], variables: dict) -> List[str]:
+    """Expand tokens returned by _tokenize_variables with the values of variables
+
+    Returns one string for each combination of the values of the variables referenced;
+    a variable referenced more than once has the same value in each place.
+    A variable with no values expands to an empty string.
+    """
+    if len(tokens) == 1:
+        return [tokens[0]]
+    names = list(dict.fromkeys(tokens[1::2]))
+    for name in names:
+        if name not in variables:
+            raise SyntaxError(f"Variable '{name}' is not defined.")
+    values = [variables[name] or [""] for name in names]
+    expanded = []
+    for combination in itertools.product(*values):
+        value = dict(zip(names, combination))
+        pieces = list(tokens)
+        pieces[1::2] = [value[name] for name in tokens[1::2]]
+        expanded.append("".join(pieces))
+    return expanded
+
+
+def _expand_tokens_to_str(tokens: Tuple[str, ...], variables: dict, name: str) -> str:
+    """Expand tokens returned by _tokenize_variables; raises SyntaxError if more than one value"""
+    expanded = _expand_tokens(tokens, variables)
+    if len(expanded) != 1:
+        raise SyntaxError(f"{name} must have a single value, not {expanded}")
+    return expanded[0]
+
+
+def _split_filter(filter_: str) -> Tuple[str, Optional[str]]:
+    """Split filter in form name(args) into (name, args); args is None if filter has no arguments"""
+    if FILTER_ARGS_REGEX.search(filter_):
+        # filter has arguments
+        filter_, args = filter_.split("(", 1)
+        return filter_, args.rstrip(")")
+    return filter_, None
+
+
+def _filter_split(values: List[str], args: str) -> List[str]:
+    if not args:
+        return values
+    new_values = []
+    for v in values:
+        new_values.extend(v.split(args))
+    return new_values
+
+
+def _filter_chop(values: List[str], args: str) -> List[str]:
+    # chop off characters from the end
+    try:
+        chop = int(args)
+    except ValueError as e:
+        raise SyntaxError(f"Invalid value for chop: {args}") from e
+    return [v[:-chop] for v in values] if chop else values
+
+
+def _filter_chomp(values: List[str], args: str) -> List[str]:
+    # chop off characters from the beginning
+    try:
+        chomp = int(args)
+    except ValueError as e:
+        raise SyntaxError(f"Invalid value for chomp: {args}") from e
+    return [v[chomp:] for v in values] if chomp else values
+
+
+def _filter_autosplit(values: List[str], args: Optional[str]) -> List[str]:
+    # try to split keyword strings automatically
+    value = []
+    for v in values:
+        value.extend(v.replace(",", " ").replace(";", " ").split())
+    return value
+
+
+def _filter_uniq(values: List[str], args: Optional[str]) -> List[str]:
+    # remove duplicate values from list
+    temp_values = []
+    for v in values:
+        if v not in temp_values:
+            temp_values.append(v)
+    return temp_values
+
+
+def _filter_sslice(values: List[str], args: str) -> List[str]:
+    # slice each value in a list
+    slice_ = create_slice(args)
+    return [v[slice_] for v in values]
+
+
+_FILTERS = {
+    "lower": lambda values, args: [v.lower() for v in values],
+    "upper": lambda values, args: [v.upper() for v in values],
+    "strip": lambda values, args: [v.strip() for v in values],
+    "capitalize": lambda values, args: [v.capitalize() for v in values],
+    "titlecase": lambda values, args: [v.title() for v in values],
+    "braces": lambda values, args: ["{" + v + "}" for v in values],
+    "parens": lambda values, args: [f"({v})" for v in values],
+    "brackets": lambda values, args: [f"[{v}]" for v in values],
+    "shell_quote": lambda values, args: [shlex.quote(v) for v in values],
+    "split": _filter_split,
+    "chop": _filter_chop,
+    "chomp": _filter_chomp,
+    "autosplit": _filter_autosplit,
+    "sort": lambda values, args: sorted(values),
+    "rsort": lambda values, args: sorted(values, reverse=True),
+    "reverse": lambda values, args: values[::-1],
+    "uniq": _filter_uniq,
+    # join list of values with delimiter
+    "join": lambda values, args: [(args or "").join(values)],
+    "append": lambda values, args: values + [args],
+    "prepend": lambda values, args: [args] + values,
+    # append or prepend value to each item in list
+    "appends": lambda values, args: [f"{v}{args}" for v in values],
+    "prepends": lambda values, args: [f"{args}{v}" for v in values],
+    "remove": lambda values, args: [v for v in values if v != args],
+    "slice": lambda values, args: values[create_slice(args)],
+    "sslice": _filter_sslice,
+}
+"""Built-in filters: functions with signature filter(values, args) -> values"""
+
+FILTERS_WITH_ARGS = {
+    "split",
+    "chop",
+    "chomp",
+    "append",
+    "prepend",
+    "remove",
+    "slice",
+    "sslice",
+}
+"""Built-in filters which require arguments"""
+
+
+def _compile_statement(statement) -> RenderFunction:
+    """Compile a parsed Statement into a function which renders it for an MTLParser
+
+    Everything that doesn't depend on the field values or variables is done once here:
+    constant text is joined, filters and conditional operators are looked up and the
+    branches which must be rendered eagerly are found, so rendering the template for
+    each file only does the work which depends on the file.
+    """
+    if len(statement.template_strings) == 1 and _is_field_reference(
+        statement.template_strings[0].template
+    ):
+        ts = statement.template_strings[0]
+        return _compile_field_reference(ts.template, ts.pre or "", ts.post or "")
+
+    parts = []
+    text = ""
+    for ts in statement.template_strings:
+        if ts.template is None:
+            text += (ts.pre or "") + (ts.post or "")
+            continue
+        # constant text before the template is rendered as part of the template's pre
+        parts.append(
+            _compile_template(ts.template, text + (ts.pre or ""), ts.post or "")
+        )
+        text = ""
+
+    if len(parts) == 1 and not text:
+        # most templates are a single template field, e.g. {size}
+        render_part = parts[0]
+
+        def render_statement(parser: MTLParser) -> List[str]:
+            results = render_part(parser, [""])
+            if parser.sanitize:
+                results = [parser.sanitize(v) for v in results]
+            return results
+
+        return render_statement
+
+    def render_statement(parser: MTLParser) -> List[str]:
+        results = [""]
+        for part in parts:
+            results = part(parser, results)
+        if text:
+            results = [result + text for result in results]
+        if parser.sanitize:
+            results = [parser.sanitize(v) for v in results]
+        return results
+
+    return render_statement
+
+
+def _is_field_reference(template) -> bool:
+    """Return True if template is just a field, e.g. {size} or {pdf:title}, with no
+    delimiter, filters, find/replace, conditional, combine, bool or default"""
+    return (
+        template is not None
+        and template.delim is None
+        and template.filter is None
+        and template.findreplace is None
+        and template.conditional is None
+        and template.combine is None
+        and template.bool is None
+        and template.default is None
+        and not template.field.startswith("%")
+        and template.field != "var"
+    )
+
+
+def _compile_field_reference(template, pre: str, post: str) -> RenderFunction:
+    """Compile a statement which is a single field reference, e.g. {size}
+
+    Renders the same as _compile_statement but looks up and stringifies the values
+    directly as there are no other template fields to combine the values with.
+    """
+    field = template.field
+    subfield = template.subfield
+    field_arg = template.fieldarg.value if template.fieldarg is not None else None
+
+    def render_field_reference(parser: MTLParser) -> List[str]:
+        for get_function in parser.field_values:
+            vals = get_function(field, subfield, field_arg, [])
+            if vals is not None:
+                break
+        if vals:
+            if parser.sanitize_value:
+                vals = [parser.sanitize_value(v) for v in vals]
+            if None in vals:
+                vals = [val for val in vals if val is not None]
+        elif vals is None:
+            raise UnknownFieldError(f"Unknown template field: {field}")
+
+        if parser.expand_inplace and vals:
+            vals = [parser.inplace_sep.join(vals)]
+
+        if not vals:
+            results = [pre + parser.none_str + post]
+        elif pre or post:
+            results = [pre + str(val) + post for val in vals]
+        else:
+            results = list(map(str, vals))
+        if parser.sanitize:
+            results = [parser.sanitize(v) for v in results]
+        return results
+
+    return render_field_reference
+
+
+def _compile_branch(statement) -> RenderFunction:
+    """Compile the statement of a combine, bool or default branch; an empty branch renders as [""]"""
+    if statement is None:
+        return lambda parser: [""]
+    return _compile_statement(statement)
+
+
+def _compile_text(value: str, name: str) -> Callable[[MTLParser], str]:
+    """Compile a string which may contain variables, e.g. a delimiter or filter argument"""
+    tokens = _tokenize_variables(value)
+    if len(tokens) == 1:
+        # no variables
+        text = tokens[0]
+        return lambda parser: text
+    return lambda parser: _expand_tokens_to_str(tokens, parser.variables, name)
+
+
+def _compile_filter(filter_: str) -> Callable[[MTLParser, List[str]], List[str]]:
+    """Compile a filter into a function which returns the filtered values"""
+    name, args = _split_filter(filter_)
+    apply = _FILTERS.get(name)
+    if apply is None:
+        # custom filter
+        return lambda parser, values: parser.get_filter_values(filter_, values)
+    if args is None:
+        if name in FILTERS_WITH_ARGS:
+            # raise the error when rendered
+            return lambda parser, values: parser.get_filter_values(filter_, values)
+        return lambda parser, values: apply(values, None)
+
+    tokens = _tokenize_variables(args)
+    if len(tokens) == 1:
+        # no variables
+        args = tokens[0]
+        if name in FILTERS_WITH_ARGS and not args:
+            return lambda parser, values: parser.get_filter_values(filter_, values)
+        return lambda parser, values: apply(values, args)
+
+    def apply_filter(parser: MTLParser, values: List[str]) -> List[str]:
+        args = _expand_tokens_to_str(tokens, parser.variables, "Filter arguments")
+        if name in FILTERS_WITH_ARGS and not args:
+            raise SyntaxError(f"{name} requires arguments")
+        return apply(values, args)
+
+    return apply_filter
+
+
+def _compile_conditional(
+    operator: str, negation: bool
+) -> Callable[[List[str], List[str]], List[str]]:
+    """Compile a conditional operator into a function test(values, conditional_values)
+    which returns ["True"] if the condition is met, otherwise []"""
+
+    def result(match: bool) -> List[str]:
+        return ["True"] if match != negation else []
+
+    if operator in ("contains", "matches", "startswith", "endswith"):
+        string_test = {
+            "contains": lambda v, c: c in v,
+            "matches": lambda v, c: v == c,
+            "startswith": lambda v, c: v.startswith(c),
+            "endswith": lambda v, c: v.endswith(c),
+        }[operator]
+
+        def test(vals, conditional_value):
+            # process any "or" values separated by "|"
+            conditional_value = [
+                value for c in conditional_value for value in c.split("|")
+            ]
+            return result(
+                any(string_test(v, c) for c in conditional_value for v in vals)
+            )
+
+    elif operator in ("==", "!="):
+        equal = operator == "=="
+
+        def test(vals, conditional_value):
+            return result((sorted(vals) == sorted(conditional_value)) == equal)
+
+    else:
+        comparison_test = {
+            "<": lambda v, c: v < c,
+            "<=": lambda v, c: v <= c,
+            ">": lambda v, c: v > c,
+            ">=": lambda v, c: v >= c,
+        }[operator]
+
+        def test(vals, conditional_value):
+            # returns True if any of the values match the condition
+            if len(conditional_value) != 1:
+                raise SyntaxError(
+                    f"comparison operators may only be used with a single conditional value: {conditional_value}"
+                )
+            try:
+                return result(
+                    any(
+                        bool(comparison_test(float(v), float(conditional_value[0])))
+                        for v in vals
+                    )
+                )
+            except ValueError:
+                raise SyntaxError(
+                    f"comparison operators may only be used with values that can be converted to numbers: {vals} {conditional_value}"
+                )
+
+    return test
+
+
+def _compile_template(
+    template, pre: str, post: str
+) -> Callable[[MTLParser, List[str]], List[str]]:
+    """Compile a template field into a function render(parser, results) which returns
+    results with each rendered value of the template appended"""
+    field = template.field
+    subfield = template.subfield
+    field_arg = template.fieldarg.value if template.fieldarg is not None else None
+    is_variable = field.startswith("%")
+    is_var = field == "var"
+
+    # if value is None, means format was {+field}
+    delim = (
+        _compile_text(template.delim.value or "", "delim")
+        if template.delim is not None
+        else None
+    )
+    filters = [
+        _compile_filter(filter_)
+        for filter_ in (template.filter.value if template.filter is not None else [])
+    ]
+    find_replace = [
+        (
+            _compile_text(pair.find or "", "find/replace"),
+            _compile_text(pair.replace or "", "find/replace"),
+        )
+        for pair in (template.findreplace.pairs if template.findreplace else [])
+    ]
+
+    conditional_values = []
+    test = None
+    if template.conditional is not None:
+        conditional_values = [
+            _compile_statement(value) for value in template.conditional.value
+        ]
+        test = _compile_conditional(
+            template.conditional.operator, bool(template.conditional.negation)
+        )
+
+    # combine, bool and default are rendered only when needed
+    # unless they assign variables which must happen in template order
+    combine = bool_ = None
+    combine_eager = bool_eager = False
+    if template.combine is not None:
+        combine = _compile_branch(template.combine.value)
+        combine_eager = _assigns_variables(template.combine.value)
+    if template.bool is not None:
+        bool_ = _compile_branch(template.bool.value)
+        bool_eager = _assigns_variables(template.bool.value)
+
+    # default is passed to get_field_values so if it contains template fields
+    # it is passed as LazyValues and only rendered if used
+    default_ = None
+    default_lazy = False
+    if template.default is not None:
+        default_ = _compile_branch(template.default.value)
+        if template.default.value is not None:
+            fields = set(_statement_fields(template.default.value))
+            default_lazy = bool(fields) and "var" not in fields
+
+    has_setup = delim is not None or combine_eager or bool_eager
+
+    def render_template(parser: MTLParser, results: List[str]) -> List[str]:
+        sep = combine_val = bool_val = None
+        if has_setup:
+            if delim is not None:
+                sep = delim(parser)
+            if combine_eager:
+                combine_val = combine(parser)
+            if bool_eager:
+                bool_val = bool_(parser)
+
+        if default_ is None:
+            default = []
+        elif default_lazy:
+            default = LazyValues(lambda: default_(parser))
+        else:
+            default = default_(parser)
+
+        if conditional_values:
+            conditional_value = []
+            for render_value in conditional_values:
+                conditional_value += render_value(parser)
+
+        if is_variable:
+            # variable in form {%var}
+            vals = parser.variables.get(field[1:], None)
+            if vals is None:
+                raise SyntaxError(f"Variable '{field[1:]}' is not defined.")
+        elif is_var:
+            if not subfield or not default:
+                raise SyntaxError(
+                    "var must have a subfield and value in form {var:subfield,value}"
+                )
+            # #5, remove empty values from variable assignment
+            default = [d for d in default if d != ""]
+            parser.variables[subfield] = default
+            vals = []
+        else:
+            vals = parser.get_field_values(field, subfield, field_arg, default)
+
+        if vals:
+            if parser.sanitize_value:
+                vals = [parser.sanitize_value(v) for v in vals]
+            if None in vals:
+                vals = [val for val in vals if val is not None]
+        elif vals is None:
+            if field:
+                raise UnknownFieldError(f"Unknown template field: {field}")
+            vals = []
+
+        if sep is not None or parser.expand_inplace:
+            sep = sep if sep is not None else parser.inplace_sep
+            vals = [sep.join(vals)] if vals else []
+
+        for filter_ in filters:
+            vals = filter_(parser, vals)
+
+        if find_replace and vals:
+            pairs = []
+            for find, repl in find_replace:
+                find = find(parser)
+                # an empty find string, e.g. an empty variable, would match between every character
+                if find:
+                    pairs.append((find, repl(parser)))
+            new_vals = []
+            for val in vals:
+                for find, repl in pairs:
+                    val = val.replace(find, repl)
+                new_vals.append(val)
+            vals = new_vals
+
+        if test is not None:
+            vals = test(vals, conditional_value)
+
+        if combine is not None and not (bool_ is not None and vals):
+            # with bool, combined values only matter if the field has no values
+            if combine_val is None:
+                combine_val = combine(parser)
+            # vals may be the list returned by get_field_values so don't extend it in place
+            vals = vals + [val for val in combine_val if val]
+
+        if bool_ is not None:
+            if vals and bool_val is None:
+                bool_val = bool_(parser)
+            vals = bool_val if vals else list(default)
+        elif not vals and not is_var:
+            # don't assign default value if the template was variable assignment
+            vals = list(default) or [parser.none_str]
+
+        if len(results) == 1:
+            prefix = results[0] + pre
+            return (
+                [prefix + str(val) + post for val in vals] if vals else [prefix + post]
+            )
+        rendered = [pre + str(val) + post for val in vals] if vals else [pre + post]
+        return [result + ren for ren in rendered for result in results]
+
+    return render_template
 
 
 def create_slice(args):
@@ -0,0 +1,406 @@
+"""Read metadata from Office Open XML (.docx, .xlsx, .pptx) files without loading the document"""
+
+from __future__ import annotations
+
+import datetime
+import posixpath
+import re
+import zipfile
+from dataclasses import dataclass
+from typing import IO, Any, Callable, Iterator, Optional
+from xml.etree.ElementTree import ParseError, iterparse
+
+from .filecontext import FileContext
+
+__all__ = [
+    "AppProperties",
+    "CoreProperties",
+    "OOXMLPackage",
+    "get_package",
+    "read_core_properties",
+]
+
+NS_CP = "http://schemas.openxmlformats.org/package/2006/metadata/core-properties"
+NS_DC = "http://purl.org/dc/elements/1.1/"
+NS_DCTERMS = "http://purl.org/dc/terms/"
+NS_PACKAGE_RELS = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_CONTENT_TYPES = "http://schemas.openxmlformats.org/package/2006/content-types"
+NS_EXTENDED_PROPERTIES = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/extended-properties"
+)
+NS_SPREADSHEETML = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+
+RT_CORE_PROPERTIES = "http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties"
+RT_EXTENDED_PROPERTIES = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/extended-properties"
+RT_OFFICE_DOCUMENT = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+)
+
+WORKBOOK_CONTENT_TYPES = {
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.template.main+xml",
+    "application/vnd.ms-excel.sheet.macroEnabled.main+xml",
+    "application/vnd.ms-excel.template.macroEnabled.main+xml",
+}
+
+# errors reading a part which mean the package is damaged
+_READ_ERRORS = (zipfile.BadZipFile, ParseError, KeyError, OSError, EOFError)
+
+# core properties element -> CoreProperties attribute
+CORE_PROPERTIES_ELEMENTS = {
+    f"{{{NS_CP}}}category": "category",
+    f"{{{NS_CP}}}contentStatus": "content_status",
+    f"{{{NS_DCTERMS}}}created": "created",
+    f"{{{NS_DC}}}creator": "author",
+    f"{{{NS_DC}}}description": "comments",
+    f"{{{NS_DC}}}identifier": "identifier",
+    f"{{{NS_CP}}}keywords": "keywords",
+    f"{{{NS_DC}}}language": "language",
+    f"{{{NS_CP}}}lastModifiedBy": "last_modified_by",
+    f"{{{NS_CP}}}lastPrinted": "last_printed",
+    f"{{{NS_DCTERMS}}}modified": "modified",
+    f"{{{NS_CP}}}revision": "revision",
+    f"{{{NS_DC}}}subject": "subject",
+    f"{{{NS_DC}}}title": "title",
+    f"{{{NS_CP}}}version": "version",
+}
+
+DATETIME_PROPERTIES = ("created", "last_printed", "modified")
+
+# extended properties element -> AppProperties attribute
+APP_PROPERTIES_ELEMENTS = {
+    f"{{{NS_EXTENDED_PROPERTIES}}}{element}": attribute
+    for element, attribute in {
+        "Application": "application",
+        "AppVersion": "app_version",
+        "Characters": "characters",
+        "CharactersWithSpaces": "characters_with_spaces",
+        "Company": "company",
+        "HiddenSlides": "hidden_slides",
+        "Lines": "lines",
+        "Manager": "manager",
+        "Notes": "notes",
+        "Pages": "pages",
+        "Paragraphs": "paragraphs",
+        "PresentationFormat": "presentation_format",
+        "Slides": "slides",
+        "Template": "template",
+        "TotalTime": "total_time",
+        "Words": "words",
+    }.items()
+}
+
+APP_PROPERTIES_INT = {
+    "characters",
+    "characters_with_spaces",
+    "hidden_slides",
+    "lines",
+    "notes",
+    "pages",
+    "paragraphs",
+    "slides",
+    "total_time",
+    "words",
+}
+
+_RE_OFFSET = re.compile(r"([+-])(\d\d):(\d\d)")
+
+
+@dataclass
+class CoreProperties:
+    """Core properties (docProps/core.xml) of an OOXML package
+
+    Values match those of python-docx's CoreProperties: string properties are ""
+    if not present, dates are naive datetimes in UTC (or None) and revision is an int.
+    """
+
+    author: str = ""
+    category: str = ""
+    comments: str = ""
+    content_status: str = ""
+    created: Optional[datetime.datetime] = None
+    identifier: str = ""
+    keywords: str = ""
+    language: str = ""
+    last_modified_by: str = ""
+    last_printed: Optional[datetime.datetime] = None
+    modified: Optional[datetime.datetime] = None
+    revision: int = 0
+    subject: str = ""
+    title: str = ""
+    version: str = ""
+
+
+@dataclass
+class AppProperties:
+    """Extended properties (docProps/app.xml) of an OOXML package
+
+    Properties not present in the package are None.
+    """
+
+    application: Optional[str] = None
+    app_version: Optional[str] = None
+    characters: Optional[int] = None
+    characters_with_spaces: Optional[int] = None
+    company: Optional[str] = None
+    hidden_slides: Optional[int] = None
+    lines: Optional[int] = None
+    manager: Optional[str] = None
+    notes: Optional[int] = None
+    pages: Optional[int] = None
+    paragraphs: Optional[int] = None
+    presentation_format: Optional[str] = None
+    slides: Optional[int] = None
+    template: Optional[str] = None
+    total_time: Optional[int] = None
+    words: Optional[int] = None
+
+
+class OOXMLPackage:
+    """Office Open XML package (zip file) opened to read its metadata parts
+
+    Only the zip central directory and the parts that are read are loaded;
+    the document body, styles, media, etc. are never decompressed.
+    Each part is read at most once; methods return None if the part is missing or invalid.
+    """
+
+    def __init__(self, filepath: str):
+        """Open the package at filepath
+
+        Raises:
+            zipfile.BadZipFile: if filepath is not a zip file
+        """
+        self.filepath = filepath
+        self._zip = zipfile.ZipFile(filepath)
+        self._package_rels: Optional[dict[str, list[str]]] = None
+        self._content_types: Optional[dict[str, str]] = None
+        self._parts: dict[str, Any] = {}
+
+    def __enter__(self) -> OOXMLPackage:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the package"""
+        self._zip.close()
+
+    def part_related_by(self, reltype: str) -> Optional[str]:
+        """Return name of the part the package is related to by relationship type reltype
+
+        Returns None if the package has no such relationship or it's ambiguous.
+        """
+        if self._package_rels is None:
+            self._package_rels = self._read_package_rels()
+        targets = self._package_rels.get(reltype, [])
+        if len(targets) != 1 or targets[0] not in self._zip.NameToInfo:
+            return None
+        return targets[0]
+
+    def content_type(self, partname: str) -> Optional[str]:
+        """Return content type of partname from [Content_Types].xml"""
+        if self._content_types is None:
+            self._content_types = self._read_content_types()
+        content_type = self._content_types.get(f"/{partname}".lower())
+        if content_type is None:
+            extension = posixpath.splitext(partname)[1][1:].lower()
+            content_type = self._content_types.get(extension)
+        return content_type
+
+    def core_properties(self) -> Optional[CoreProperties]:
+        """Return the package's core properties"""
+        return self._read_part("core", self._read_core_properties)
+
+    def app_properties(self) -> Optional[AppProperties]:
+        """Return the package's extended properties"""
+        return self._read_part("app", self._read_app_properties)
+
+    def sheet_count(self) -> Optional[int]:
+        """Return number of sheets in a spreadsheet package or None if not a spreadsheet"""
+        return self._read_part("sheets", self._read_sheet_count)
+
+    def _read_part(self, name: str, reader: Callable[[], Any]) -> Any:
+        """Return value of reader(), calling it only the first time"""
+        if name not in self._parts:
+            try:
+                self._parts[name] = reader()
+            except _READ_ERRORS:
+                self._parts[name] = None
+        return self._parts[name]
+
+    def _read_core_properties(self) -> Optional[CoreProperties]:
+        partname = self.part_related_by(RT_CORE_PROPERTIES)
+        if partname is None:
+            return None
+        properties = CoreProperties()
+        seen = set()
+        with self._zip.open(partname) as fd:
+            for element in _iter_children(fd):
+                attribute = CORE_PROPERTIES_ELEMENTS.get(element.tag)
+                if attribute is None or attribute in seen:
+                    continue
+                # only the first element of each type is used
+                seen.add(attribute)
+                text = element.text or ""
+                if attribute in DATETIME_PROPERTIES:
+                    setattr(properties, attribute, parse_w3cdtf(text))
+                elif attribute == "revision":
+                    properties.revision = _parse_revision(text)
+                else:
+                    setattr(properties, attribute, text)
+        return properties
+
+    def _read_app_properties(self) -> Optional[AppProperties]:
+        partname = self.part_related_by(RT_EXTENDED_PROPERTIES)
+        if partname is None:
+            return None
+        properties = AppProperties()
+        with self._zip.open(partname) as fd:
+            for element in _iter_children(fd):
+                attribute = APP_PROPERTIES_ELEMENTS.get(element.tag)
+                if attribute is None or getattr(properties, attribute) is not None:
+                    continue
+                text = (element.text or "").strip()
+                if attribute in APP_PROPERTIES_INT:
+                    try:
+                        value = int(text)
+                    except ValueError:
+                        continue
+                else:
+                    value = text
+                setattr(properties, attribute, value)
+        return properties
+
+    def _read_sheet_count(self) -> Optional[int]:
+        partname = self.part_related_by(RT_OFFICE_DOCUMENT)
+        if (
+            partname is None
+            or self.content_type(partname) not in WORKBOOK_CONTENT_TYPES
+        ):
+            return None
+        with self._zip.open(partname) as fd:
+            for element in _iter_children(fd):
+                if element.tag == f"{{{NS_SPREADSHEETML}}}sheets":
+                    return sum(
+                        1
+                        for sheet in element
+                        if sheet.tag == f"{{{NS_SPREADSHEETML}}}sheet"
+                    )
+        return 0
+
+    def _read_package_rels(self) -> dict[str, list[str]]:
+        """Read the package relationships (_rels/.rels); returns dict of type: [part names]"""
+        rels = {}
+        if "_rels/.rels" not in self._zip.NameToInfo:
+            return rels
+        with self._zip.open("_rels/.rels") as fd:
+            for element in _iter_children(fd):
+                if element.tag != f"{{{NS_PACKAGE_RELS}}}Relationship":
+                    continue
+                if element.get("TargetMode") == "External":
+                    continue
+                target = element.get("Target", "")
+                partname = posixpath.normpath(target.lstrip("/"))
+                rels.setdefault(element.get("Type"), []).append(partname)
+        return rels
+
+    def _read_content_types(self) -> dict[str, str]:
+        """Read [Content_Types].xml; returns dict of lower case part name or extension: content type"""
+        content_types = {}
+        if "[Content_Types].xml" not in self._zip.NameToInfo:
+            return content_types
+        with self._zip.open("[Content_Types].xml") as fd:
+            for element in _iter_children(fd):
+                if element.tag == f"{{{NS_CONTENT_TYPES}}}Override":
+                    key = element.get("PartName", "").lower()
+                elif element.tag == f"{{{NS_CONTENT_TYPES}}}Default":
+                    key = element.get("Extension", "").lower()
+                else:
+                    continue
+                content_types[key] = element.get("ContentType")
+        return content_types
+
+
+def get_package(
+    filepath: str, context: Optional[FileContext] = None
+) -> Optional[OOXMLPackage]:
+    """Return OOXMLPackage for filepath or None if filepath is not a zip file
+
+    If context is provided, the package is opened once and shared by all plugins
+    reading metadata from the file.
+    """
+
+    def open_package():
+        try:
+            return OOXMLPackage(filepath)
+        except (zipfile.BadZipFile, OSError):
+            return None
+
+    if context is None:
+        return open_package()
+    return context.get_or_set("ooxml:package", open_package)
+
+
+def read_core_properties(filepath: str) -> Optional[CoreProperties]:
+    """Return core properties of the OOXML package at filepath
+
+    Returns None if the file is not a valid package or has no core properties part;
+    in this case use the library for the file format (e.g. python-docx) instead.
+    """
+    package = get_package(filepath)
+    if package is None:
+        return None
+    with package:
+        return package.core_properties()
+
+
+def parse_w3cdtf(value: str) -> Optional[datetime.datetime]:
+    """Parse W3C date/time string to naive datetime in UTC; returns None if not valid
+
+    Matches python-docx: e.g. '2003', '2003-12', '2003-12-31', '2003-12-31T10:14:55Z',
+    or '2003-12-31T10:14:55-08:00'.
+    """
+    templates = ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%Y-%m", "%Y")
+    parseable_part = value[:19]
+    offset_str = value[19:]
+    dt = None
+    for template in templates:
+        try:
+            dt = datetime.datetime.strptime(parseable_part, template)
+        except ValueError:
+            continue
+    if dt is None:
+        return None
+    if len(offset_str) == 6:
+        match = _RE_OFFSET.match(offset_str)
+        if match is None:
+            return None
+        sign, hours, minutes = match.groups()
+        sign_factor = -1 if sign == "+" else 1
+        dt += datetime.timedelta(
+            hours=int(hours) * sign_factor, minutes=int(minutes) * sign_factor
+        )
+    return dt
+
+
+def _parse_revision(value: str) -> int:
+    """Return revision as int; non-integer or negative revisions are 0"""
+    try:
+        revision = int(value)
+    except ValueError:
+        return 0
+    return max(revision, 0)
+
+
+def _iter_children(fd: IO[bytes]) -> Iterator:
+    """Stream parse XML from fd, yielding each complete child element of the root element"""
+    depth = 0
+    for event, element in iterparse(fd, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield element
+            element.clear()
@@ -0,0 +1,145 @@
+"""Process files in parallel using a process or thread pool"""
+
+from __future__ import annotations
+
+import collections
+import functools
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Callable, Iterable, Iterator, TypeVar
+
+from .stats import RUN_STATS
+
+__all__ = ["get_job_count", "map_files"]
+
+T = TypeVar("T")
+
+# number of files queued per worker; bounds memory when processing a very large
+# (or unbounded) stream of files while keeping the workers busy
+QUEUE_SIZE_PER_JOB = 4
+
+
+def get_job_count(jobs: int | None) -> int:
+    """Return number of jobs to run; 0 or None means one job per CPU"""
+    if not jobs:
+        return os.cpu_count() or 1
+    return max(1, jobs)
+
+
+def map_files(
+    func: Callable[[str], T],
+    filepaths: Iterable[str],
+    jobs: int = 1,
+    threads: bool = False,
+    ordered: bool = True,
+) -> Iterator[T]:
+    """Apply func to each filepath, yielding the results
+
+    Args:
+        func: function called with each filepath; must be picklable (e.g. a module level
+            function or a functools.partial of one) unless threads is True
+        filepaths: iterable of file paths; consumed lazily
+        jobs: number of parallel workers; if 1, files are processed sequentially in this process
+        threads: if True, use a thread pool instead of a process pool
+        ordered: if True, results are yielded in the same order as filepaths,
+            otherwise results are yielded as soon as they are ready
+
+    Returns:
+        iterator of func(filepath) results
+
+    Note: an exception raised by func is re-raised when its result is yielded
+    and any files not yet processed are cancelled.
+    Run statistics (mdinfo.stats.RUN_STATS) collected in worker processes are
+    added to the run statistics of this process.
+    """
+    if jobs <= 1:
+        yield from map(func, filepaths)
+        return
+
+    if threads:
+        executor = ThreadPoolExecutor(max_workers=jobs)
+        results = _map(executor, func, filepaths, jobs, ordered)
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        results = _map(
+            executor,
+            functools.partial(_call_with_stats, func),
+            filepaths,
+            jobs,
+            ordered,
+        )
+        results = _merge_stats(results)
+    try:
+        yield from results
+    except BaseException:
+        executor.shutdown(wait=True, cancel_futures=True)
+        raise
+    else:
+        executor.shutdown(wait=True)
+
+
+def _map(
+    executor: Executor,
+    func: Callable[[str], T],
+    filepaths: Iterable[str],
+    jobs: int,
+    ordered: bool,
+) -> Iterator[T]:
+    """Map func over filepaths with executor"""
+    if ordered:
+        return _map_ordered(executor, func, filepaths, jobs)
+    return _map_unordered(executor, func, filepaths, jobs)
+
+
+def _call_with_stats(
+    func: Callable[[str], T], filepath: str
+) -> tuple[T, collections.Counter]:
+    """Call func(filepath) in a worker process and return result with the run statistics it collected"""
+    before = RUN_STATS.copy()
+    result = func(filepath)
+    return result, RUN_STATS - before
+
+
+def _merge_stats(results: Iterator[tuple[T, collections.Counter]]) -> Iterator[T]:
+    """Add run statistics returned by worker processes to this process' statistics"""
+    for result, stats in results:
+        RUN_STATS.update(stats)
+        yield result
+
+
+def _map_ordered(
+    executor: Executor, func: Callable[[str], T], filepaths: Iterable[str], jobs: int
+) -> Iterator[T]:
+    """Yield results in input order"""
+    max_pending = jobs * QUEUE_SIZE_PER_JOB
+    pending = collections.deque()
+    for filepath in filepaths:
+        pending.append(executor.submit(func, filepath))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _map_unordered(
+    executor: Executor, func: Callable[[str], T], filepaths: Iterable[str], jobs: int
+) -> Iterator[T]:
+    """Yield results in completion order"""
+    max_pending = jobs * QUEUE_SIZE_PER_JOB
+    pending = set()
+    for filepath in filepaths:
+        pending.add(executor.submit(func, filepath))
+        if len(pending) >= max_pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
@@ -1,4 +1,8 @@
-""" utility functions for validating/sanitizing path components """
+""" utility functions for validating/sanitizing path components and finding files """
+
+import fnmatch
+import os
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
 
 import pathvalidate
 
@@ -10,6 +14,9 @@ MAX_FILENAME_LEN = 255
 # TODO: Update for other OSes
 MAX_DIRNAME_LEN = 255
 
+# Number of bytes read at a time by read_paths
+READ_PATHS_CHUNK_SIZE = 64 * 1024
+
 
 def sanitize_filepath(filepath):
     """sanitize a filepath"""
@@ -84,3 +91,124 @@ def sanitize_pathpart(pathpart, replacement=":"):
             drop = len(pathpart) - MAX_DIRNAME_LEN
             pathpart = pathpart[:-drop]
     return pathpart
+
+
+def iter_files(
+    paths: Iterable[str],
+    recursive: bool = False,
+    include: Iterable[str] = (),
+    exclude: Iterable[str] = (),
+    max_depth: Optional[int] = None,
+    onerror: Optional[Callable[[OSError], None]] = None,
+) -> Iterator[str]:
+    """Yield file paths from paths, optionally walking directories recursively
+
+    Paths are yielded lazily so a very large directory tree can be processed
+    without building the full list of files in memory.
+
+    Args:
+        paths: iterable of paths to files or directories
+        recursive: if True, directories in paths are walked to find the files they contain;
+            if False, directories are yielded as is
+        include: glob patterns; if provided, only files matching at least one pattern are yielded
+        exclude: glob patterns; files and directories matching any pattern are skipped
+        max_depth: if provided, descend at most max_depth levels below each directory in paths;
+            max_depth=1 yields only the files directly in the directory
+        onerror: optional function called with the OSError if a directory cannot be read;
+            if not provided, the error is raised
+
+    Note: Patterns are matched against the file name unless the pattern contains a path separator
+    in which case the pattern is matched against the full path. Symbolic links to directories are not followed.
+    """
+    include = tuple(include)
+    exclude = tuple(exclude)
+    for path in paths:
+        if recursive and os.path.isdir(path):
+            yield from _walk_dir(path, 1, include, exclude, max_depth, onerror)
+        elif _match_path(path, include, exclude):
+            yield path
+
+
+def _walk_dir(
+    dirpath: str,
+    depth: int,
+    include: tuple[str, ...],
+    exclude: tuple[str, ...],
+    max_depth: Optional[int],
+    onerror: Optional[Callable[[OSError], None]],
+) -> Iterator[str]:
+    """Yield the files in dirpath, recursing into sub-directories up to max_depth"""
+    try:
+        with os.scandir(dirpath) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError as e:
+        if onerror is None:
+            raise
+        onerror(e)
+        return
+
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            is_dir = False
+        if is_dir:
+            if (max_depth is None or depth < max_depth) and not _match_any(
+                entry, exclude
+            ):
+                yield from _walk_dir(
+                    entry.path, depth + 1, include, exclude, max_depth, onerror
+                )
+        elif entry.is_file() and _match_path(entry.path, include, exclude):
+            yield entry.path
+
+
+def _match_path(path: str, include: tuple[str, ...], exclude: tuple[str, ...]) -> bool:
+    """Return True if path matches include patterns (if any) and doesn't match exclude patterns"""
+    if not include and not exclude:
+        return True
+    name = os.path.basename(path)
+    if include and not any(_fnmatch(path, name, p) for p in include):
+        return False
+    return not any(_fnmatch(path, name, p) for p in exclude)
+
+
+def _match_any(entry: os.DirEntry, patterns: tuple[str, ...]) -> bool:
+    """Return True if directory entry matches any of patterns"""
+    return any(_fnmatch(entry.path, entry.name, p) for p in patterns)
+
+
+def _fnmatch(path: str, name: str, pattern: str) -> bool:
+    """Match pattern against name or against path if pattern contains a path separator"""
+    if os.sep in pattern or (os.altsep and os.altsep in pattern):
+        return fnmatch.fnmatch(path, pattern)
+    return fnmatch.fnmatch(name, pattern)
+
+
+def read_paths(fd: BinaryIO, separator: bytes = b"\n") -> Iterator[str]:
+    """Yield paths read from binary file fd as they become available
+
+    Paths are separated by separator, e.g. b"\n" or b"\0" for the output of `find -print0`.
+    Empty paths are skipped and with a newline separator, a trailing carriage return is removed.
+    Paths are decoded with the file system encoding so any path can be read.
+
+    The file is read in chunks, returning as soon as data is available if fd is a pipe,
+    so an unbounded stream of paths can be processed without reading it all first.
+    """
+    read = getattr(fd, "read1", fd.read)
+    buffer = b""
+    while True:
+        chunk = read(READ_PATHS_CHUNK_SIZE)
+        if not chunk:
+            break
+        *records, buffer = (buffer + chunk).split(separator)
+        yield from _decode_paths(records, separator)
+    yield from _decode_paths([buffer], separator)
+
+
+def _decode_paths(records: list[bytes], separator: bytes) -> Iterator[str]:
+    for record in records:
+        if separator == b"\n" and record.endswith(b"\r"):
+            record = record[:-1]
+        if record:
+            yield os.fsdecode(record)
@@ -0,0 +1,482 @@
+"""Fast reader for the document information dictionary of PDF files"""
+
+from __future__ import annotations
+
+import mmap
+import re
+import zlib
+from typing import Any, Optional
+
+__all__ = ["PDFRef", "read_pdf_info"]
+
+# number of bytes at the end of the file searched for startxref
+TAIL_SIZE = 4096
+
+# maximum number of cross-reference sections followed via /Prev
+MAX_XREF_SECTIONS = 256
+
+WHITESPACE = b"\x00\t\n\x0c\r "
+
+_RE_WHITESPACE = re.compile(rb"(?:[\x00\t\n\x0c\r ]+|%[^\r\n]*)+")
+_RE_NUMBER = re.compile(rb"[+-]?(?:\d+\.?\d*|\.\d+)")
+_RE_REF = re.compile(rb"\s+(\d+)\s+R(?=[\x00\t\n\x0c\r ()<>\[\]{}/%]|$)")
+_RE_NAME = re.compile(rb"[^\x00\t\n\x0c\r ()<>\[\]{}/%]*")
+_RE_NAME_ESCAPE = re.compile(rb"#([0-9A-Fa-f]{2})")
+_RE_KEYWORD = re.compile(rb"[A-Za-z]+")
+_RE_OBJ = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+_RE_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+_RE_SUBSECTION = re.compile(rb"\s*(\d+)\s+(\d+)[ \t]*(?:\r\n|\r|\n)")
+_RE_XREF_ENTRY = re.compile(rb"(\d{10}) (\d{5}) ([fn])")
+
+_LITERAL_ESCAPES = {
+    ord("n"): b"\n",
+    ord("r"): b"\r",
+    ord("t"): b"\t",
+    ord("b"): b"\b",
+    ord("f"): b"\f",
+    ord("("): b"(",
+    ord(")"): b")",
+    ord("\\"): b"\\",
+}
+
+
+class PDFRef(tuple):
+    """Reference to an indirect object, (object number, generation)"""
+
+    def __new__(cls, objid: int, genno: int):
+        return super().__new__(cls, (objid, genno))
+
+
+class _Unsupported(Exception):
+    """Raised when the PDF uses a structure not handled by the fast reader"""
+
+    pass
+
+
+def read_pdf_info(pdfpath: str) -> Optional[dict[str, Any]]:
+    """Read the document information dictionary (/Info) of a PDF file
+
+    Only the end of the file, the cross-reference sections and the /Info object are read
+    so this is much faster than constructing a pdfminer PDFDocument for large files.
+    String values referenced indirectly from the /Info dictionary are resolved.
+
+    Args:
+        pdfpath: path to the PDF file
+
+    Returns:
+        dict with the /Info entries (keys without the leading "/"; strings as bytes, names as str)
+        which is empty if the PDF has no /Info dictionary, or None if the PDF
+        cannot be read by the fast reader (for example, it is encrypted or malformed)
+        in which case a full PDF parser should be used instead.
+    """
+    with open(pdfpath, "rb") as fd:
+        try:
+            data = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            return None
+        try:
+            return _PDFInfoReader(data).read_info()
+        except (
+            _Unsupported,
+            AttributeError,
+            IndexError,
+            KeyError,
+            TypeError,
+            ValueError,
+            zlib.error,
+        ):
+            return None
+        finally:
+            data.close()
+
+
+class _PDFInfoReader:
+    """Reads the /Info dictionary from a memory-mapped PDF file"""
+
+    def __init__(self, data: mmap.mmap):
+        self.data = data
+        # cross-reference sections, newest first
+        self.sections: list[Any] = []
+        self.object_streams: dict[int, tuple[bytes, dict[int, int]]] = {}
+
+    def read_info(self) -> dict[str, Any]:
+        """Return the /Info dictionary of the file"""
+        tail = self.data[max(0, len(self.data) - TAIL_SIZE) :]
+        matches = list(_RE_STARTXREF.finditer(tail))
+        if not matches:
+            raise _Unsupported("startxref not found")
+
+        trailers = self._read_xref_sections(int(matches[-1].group(1)))
+        if "Encrypt" in trailers[0]:
+            # strings are encrypted
+            raise _Unsupported("encrypted")
+        info_ref = next(
+            (trailer["Info"] for trailer in trailers if "Info" in trailer), None
+        )
+        if info_ref is None:
+            return {}
+        info = self._resolve(info_ref)
+        if not isinstance(info, dict):
+            raise _Unsupported("Info is not a dictionary")
+        return {key: self._resolve(value) for key, value in info.items()}
+
+    def _read_xref_sections(self, offset: int) -> list[dict[str, Any]]:
+        """Read the cross-reference section at offset and all previous sections; returns trailers"""
+        trailers = []
+        visited = set()
+        pending = [offset]
+        while pending:
+            offset = pending.pop(0)
+            if offset in visited or len(visited) >= MAX_XREF_SECTIONS:
+                continue
+            visited.add(offset)
+            if self.data[offset : offset + 4] == b"xref":
+                section, trailer = self._read_xref_table(offset + 4)
+                stm_offset = trailer.get("XRefStm")
+                if stm_offset is not None and stm_offset not in visited:
+                    # hybrid-reference file: the table marks objects in object streams as free
+                    # so the stream section is searched before the table it belongs to
+                    visited.add(stm_offset)
+                    self.sections.append(self._read_xref_stream(stm_offset)[0])
+                self.sections.append(section)
+            else:
+                section, trailer = self._read_xref_stream(offset)
+                self.sections.append(section)
+            trailers.append(trailer)
+            if "Prev" in trailer:
+                pending.append(trailer["Prev"])
+        return trailers
+
+    def _read_xref_table(self, pos: int) -> tuple[_XRefTable, dict[str, Any]]:
+        """Read a cross-reference table starting at pos (after the xref keyword)"""
+        subsections = []
+        while True:
+            pos = self._skip_whitespace(pos)
+            if self.data[pos : pos + 7] == b"trailer":
+                trailer, _ = self._parse_object(pos + 7)
+                if not isinstance(trailer, dict):
+                    raise _Unsupported("invalid trailer")
+                return _XRefTable(self.data, subsections), trailer
+            match = _RE_SUBSECTION.match(self.data, pos)
+            if not match:
+                raise _Unsupported("invalid xref subsection")
+            start, count = int(match.group(1)), int(match.group(2))
+            pos = match.end()
+            # each entry is exactly 20 bytes so entries are looked up without parsing the table
+            if count and not _RE_XREF_ENTRY.match(self.data, pos):
+                raise _Unsupported("invalid xref entry")
+            subsections.append((start, count, pos))
+            pos += count * 20
+
+    def _read_xref_stream(self, offset: int) -> tuple[_XRefStream, dict[str, Any]]:
+        """Read a cross-reference stream object at offset"""
+        stream_dict, data = self._read_stream(offset)
+        if stream_dict.get("Type") != "XRef":
+            raise _Unsupported("not an xref stream")
+        widths = stream_dict["W"]
+        size = stream_dict["Size"]
+        index = stream_dict.get("Index", [0, size])
+        return _XRefStream(data, widths, index), stream_dict
+
+    def _read_stream(self, offset: int) -> tuple[dict[str, Any], bytes]:
+        """Read the stream object at offset and return its dictionary and decoded data"""
+        match = _RE_OBJ.match(self.data, offset)
+        if not match:
+            raise _Unsupported("object not found")
+        stream_dict, pos = self._parse_object(match.end())
+        pos = self._skip_whitespace(pos)
+        if not isinstance(stream_dict, dict) or self.data[pos : pos + 6] != b"stream":
+            raise _Unsupported("not a stream")
+        pos += 6
+        if self.data[pos : pos + 2] == b"\r\n":
+            pos += 2
+        elif self.data[pos : pos + 1] in (b"\r", b"\n"):
+            pos += 1
+        length = stream_dict["Length"]
+        if not isinstance(length, int):
+            # length stored in an indirect object
+            length = self._resolve(length)
+        data = self.data[pos : pos + length]
+        return stream_dict, _decode_stream(stream_dict, data)
+
+    def _resolve(self, value: Any, depth: int = 0) -> Any:
+        """Return value, resolving indirect object references"""
+        while isinstance(value, PDFRef):
+            if depth > 8:
+                raise _Unsupported("too many levels of indirection")
+            value = self._read_object(value)
+            depth += 1
+        return value
+
+    def _read_object(self, ref: PDFRef) -> Any:
+        """Read the indirect object ref"""
+        for section in self.sections:
+            entry = section.lookup(ref[0])
+            if entry is None:
+                continue
+            kind, field1, field2 = entry
+            if kind == "f":
+                return None
+            if kind == "n":
+                match = _RE_OBJ.match(self.data, field1)
+                if not match or int(match.group(1)) != ref[0]:
+                    raise _Unsupported("object not at xref offset")
+                value, _ = self._parse_object(match.end())
+                return value
+            # compressed object: field1 is the object stream, field2 the index within it
+            return self._read_compressed_object(ref[0], field1)
+        return None
+
+    def _read_compressed_object(self, objid: int, stream_objid: int) -> Any:
+        """Read object objid from object stream stream_objid"""
+        if stream_objid not in self.object_streams:
+            offset = None
+            for section in self.sections:
+                entry = section.lookup(stream_objid)
+                if entry is not None:
+                    if entry[0] != "n":
+                        raise _Unsupported("object stream not found")
+                    offset = entry[1]
+                    break
+            if offset is None:
+                raise _Unsupported("object stream not found")
+            stream_dict, data = self._read_stream(offset)
+            header = data[: stream_dict["First"]].split()
+            offsets = {
+                int(header[i]): stream_dict["First"] + int(header[i + 1])
+                for i in range(0, len(header) - 1, 2)
+            }
+            self.object_streams[stream_objid] = (data, offsets)
+        data, offsets = self.object_streams[stream_objid]
+        value, _ = _Parser(data).parse_object(offsets[objid])
+        return value
+
+    def _parse_object(self, pos: int) -> tuple[Any, int]:
+        return _Parser(self.data).parse_object(pos)
+
+    def _skip_whitespace(self, pos: int) -> int:
+        match = _RE_WHITESPACE.match(self.data, pos)
+        return match.end() if match else pos
+
+
+class _XRefTable:
+    """Classic cross-reference table section"""
+
+    def __init__(self, data: mmap.mmap, subsections: list[tuple[int, int, int]]):
+        self.data = data
+        self.subsections = subsections
+
+    def lookup(self, objid: int) -> Optional[tuple[str, int, int]]:
+        for start, count, pos in self.subsections:
+            if start <= objid < start + count:
+                pos += (objid - start) * 20
+                match = _RE_XREF_ENTRY.match(self.data, pos)
+                if not match:
+                    raise _Unsupported("invalid xref entry")
+                return (
+                    match.group(3).decode(),
+                    int(match.group(1)),
+                    int(match.group(2)),
+                )
+        return None
+
+
+class _XRefStream:
+    """Cross-reference stream section"""
+
+    def __init__(self, data: bytes, widths: list[int], index: list[int]):
+        self.data = data
+        self.widths = widths
+        self.row_size = sum(widths)
+        self.index = list(zip(index[::2], index[1::2]))
+
+    def lookup(self, objid: int) -> Optional[tuple[str, int, int]]:
+        row = 0
+        for start, count in self.index:
+            if start <= objid < start + count:
+                row += objid - start
+                break
+            row += count
+        else:
+            return None
+        pos = row * self.row_size
+        fields = []
+        for width in self.widths:
+            fields.append(int.from_bytes(self.data[pos : pos + width], "big"))
+            pos += width
+        kind = fields[0] if self.widths[0] else 1
+        return ({0: "f", 1: "n", 2: "c"}[kind], fields[1], fields[2])
+
+
+class _Parser:
+    """Minimal parser for PDF objects (not including streams)"""
+
+    def __init__(self, data: Any):
+        self.data = data
+
+    def parse_object(self, pos: int) -> tuple[Any, int]:
+        """Parse the object at pos, returning the object and the position following it"""
+        data = self.data
+        pos = self.skip_whitespace(pos)
+        char = data[pos : pos + 1]
+        if char == b"<":
+            if data[pos + 1 : pos + 2] == b"<":
+                return self.parse_dict(pos + 2)
+            end = data.find(b">", pos)
+            if end == -1:
+                raise _Unsupported("unterminated hex string")
+            hexstr = bytes(data[pos + 1 : end]).translate(None, WHITESPACE)
+            if len(hexstr) % 2:
+                hexstr += b"0"
+            return bytes.fromhex(hexstr.decode("ascii")), end + 1
+        if char == b"(":
+            return self.parse_literal_string(pos + 1)
+        if char == b"/":
+            match = _RE_NAME.match(data, pos + 1)
+            name = _RE_NAME_ESCAPE.sub(
+                lambda m: bytes.fromhex(m.group(1).decode()), match.group(0)
+            )
+            return name.decode("latin-1"), match.end()
+        if char == b"[":
+            values = []
+            pos += 1
+            while True:
+                pos = self.skip_whitespace(pos)
+                if data[pos : pos + 1] == b"]":
+                    return values, pos + 1
+                value, pos = self.parse_object(pos)
+                values.append(value)
+        match = _RE_NUMBER.match(data, pos)
+        if match:
+            number = match.group(0)
+            if b"." in number:
+                return float(number), match.end()
+            ref = _RE_REF.match(data, match.end())
+            if ref:
+                return PDFRef(int(number), int(ref.group(1))), ref.end()
+            return int(number), match.end()
+        match = _RE_KEYWORD.match(data, pos)
+        if match:
+            keyword = match.group(0)
+            if keyword in (b"true", b"false"):
+                return keyword == b"true", match.end()
+            if keyword == b"null":
+                return None, match.end()
+        raise _Unsupported(f"unexpected token at {pos}")
+
+    def parse_dict(self, pos: int) -> tuple[dict[str, Any], int]:
+        """Parse a dictionary starting at pos (after the <<)"""
+        values = {}
+        while True:
+            pos = self.skip_whitespace(pos)
+            if self.data[pos : pos + 2] == b">>":
+                return values, pos + 2
+            key, pos = self.parse_object(pos)
+            if not isinstance(key, str):
+                raise _Unsupported("dictionary key is not a name")
+            values[key], pos = self.parse_object(pos)
+
+    def parse_literal_string(self, pos: int) -> tuple[bytes, int]:
+        """Parse a literal string starting at pos (after the opening parenthesis)"""
+        data = self.data
+        value = bytearray()
+        depth = 1
+        while True:
+            char = data[pos]
+            pos += 1
+            if char == 0x28:  # (
+                depth += 1
+            elif char == 0x29:  # )
+                depth -= 1
+                if not depth:
+                    return bytes(value), pos
+            elif char == 0x5C:  # backslash
+                char = data[pos]
+                pos += 1
+                if char in _LITERAL_ESCAPES:
+                    value += _LITERAL_ESCAPES[char]
+                elif 0x30 <= char <= 0x37:
+                    # octal character code of up to 3 digits
+                    end = pos
+                    while end < pos + 2 and 0x30 <= data[end] <= 0x37:
+                        end += 1
+                    value.append(int(bytes(data[pos - 1 : end]), 8) & 0xFF)
+                    pos = end
+                elif char == 0x0D:
+                    # line continuation
+                    if data[pos] == 0x0A:
+                        pos += 1
+                elif char != 0x0A:
+                    value.append(char)
+                continue
+            value.append(char)
+
+    def skip_whitespace(self, pos: int) -> int:
+        match = _RE_WHITESPACE.match(self.data, pos)
+        return match.end() if match else pos
+
+
+def _decode_stream(stream_dict: dict[str, Any], data: bytes) -> bytes:
+    """Decode stream data; only FlateDecode (with optional PNG predictors) is supported"""
+    filters = stream_dict.get("Filter", [])
+    params = stream_dict.get("DecodeParms") or {}
+    if isinstance(filters, str):
+        filters = [filters]
+    if isinstance(params, list):
+        if len(params) > 1:
+            raise _Unsupported("multiple decode parameters")
+        params = params[0] if params else {}
+    if not filters:
+        return data
+    if filters != ["FlateDecode"]:
+        raise _Unsupported(f"unsupported filter {filters}")
+    data = zlib.decompress(data)
+    predictor = params.get("Predictor", 1)
+    if predictor == 1:
+        return data
+    if predictor < 10:
+        raise _Unsupported(f"unsupported predictor {predictor}")
+    return _png_unpredict(data, params.get("Columns", 1))
+
+
+def _png_unpredict(data: bytes, columns: int) -> bytes:
+    """Reverse PNG predictors applied to rows of columns bytes (one byte per pixel)"""
+    output = bytearray()
+    previous = bytearray(columns)
+    row_size = columns + 1
+    for pos in range(0, len(data) - columns, row_size):
+        filter_type = data[pos]
+        row = bytearray(data[pos + 1 : pos + row_size])
+        if filter_type == 1:
+            for i in range(1, len(row)):
+                row[i] = (row[i] + row[i - 1]) & 0xFF
+        elif filter_type == 2:
+            for i in range(len(row)):
+                row[i] = (row[i] + previous[i]) & 0xFF
+        elif filter_type == 3:
+            for i in range(len(row)):
+                left = row[i - 1] if i else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif filter_type == 4:
+            for i in range(len(row)):
+                left = row[i - 1] if i else 0
+                upper_left = previous[i - 1] if i else 0
+                row[i] = (row[i] + _paeth(left, previous[i], upper_left)) & 0xFF
+        elif filter_type != 0:
+            raise _Unsupported(f"unsupported PNG filter {filter_type}")
+        output += row
+        previous = row
+    return bytes(output)
+
+
+def _paeth(left: int, upper: int, upper_left: int) -> int:
+    estimate = left + upper - upper_left
+    distance_left = abs(estimate - left)
+    distance_upper = abs(estimate - upper)
+    distance_upper_left = abs(estimate - upper_left)
+    if distance_left <= distance_upper and distance_left <= distance_upper_left:
+        return left
+    if distance_upper <= distance_upper_left:
+        return upper
+    return upper_left
@@ -10,13 +10,19 @@
     AIFF/AIFF-C
 """
 
-from typing import Iterable, List, Optional
-
-from tinytag.tinytag import TinyTag, TinyTagException
+from typing import TYPE_CHECKING, Iterable, List, Optional
 
 import mdinfo
+from mdinfo.audio_utils import has_embedded_image
+from mdinfo.filecontext import FileContext
+
+if TYPE_CHECKING:
+    from tinytag.tinytag import TinyTag
+
+# tinytag is imported when an {audio} field is first rendered, not when the plugin is loaded
 
-# Note: mdinfo.cli.print_warning used below, cannot import it here as you'll get a "partially initialized module" error
+# Note: mdinfo.cli.print_warning used below, cannot import it here as you'll get a "partially initialized module" error;
+# it's imported when needed as mdinfo.cli is not imported when mdinfo is used as a library
 
 FIELDS = {
     "{audio}": "Use in form '{audio:TAG}'; Returns tag value for various audio types include mp3, "
@@ -35,6 +41,7 @@ SUBFIELDS = {
     "duration": "duration of the song in seconds",
     "filesize": "file size in bytes",
     "genre": "genre as string",
+    "has_image": "True if the file has embedded cover art, otherwise False",
     "samplerate": "samples per second",
     "title": "title of the song",
     "track": "track number as string",
@@ -66,6 +73,11 @@ def get_template_help() -> Iterable:
     return ["**Audio Files**", fields, text, subfields]
 
 
+@mdinfo.hookimpl
+def get_template_fields() -> Iterable[str]:
+    return [field[1:-1] for field in FIELDS]
+
+
 @mdinfo.hookimpl
 def get_template_value(
     filepath: str,
@@ -73,11 +85,13 @@ def get_template_value(
     subfield: Optional[str],
     field_arg: Optional[str],
     default: List[str],
+    context: FileContext,
 ) -> Optional[List[Optional[str]]]:
-    """lookup value for file dates
+    """lookup value for audio tags
 
     Args:
         field: template field to find value for.
+        context: FileContext used to parse the tags only once per file
 
     Returns:
         The matching template value (which may be None).
@@ -85,17 +99,58 @@ def get_template_value(
     if "{" + field + "}" not in FIELDS:
         return None
 
+    from tinytag.tinytag import TinyTagException
+
     try:
-        tag = TinyTag.get(filepath)
         if field == "audio":
             if subfield is None:
                 raise ValueError("subfield must be specified for audio field")
             if subfield not in SUBFIELDS:
                 raise ValueError(f"Unknown audio subfield: {subfield}")
-            vals = str(getattr(tag, subfield))
+            if subfield == "has_image":
+                vals = str(get_has_image(filepath, context))
+            else:
+                vals = str(getattr(get_audio_tag(filepath, context), subfield))
         return [vals]
     except TinyTagException as e:
-        mdinfo.cli.print_warning(
+        from mdinfo.cli import print_warning
+
+        print_warning(
             f"Error reading tag {field}:{subfield} for file {filepath}: {e}"
         )
         return [None]
+
+
+def get_audio_tag(filepath: str, context: Optional[FileContext] = None) -> "TinyTag":
+    """Return TinyTag for filepath, reusing the tag stored in context if available
+
+    Embedded images are not loaded; use get_has_image() to check for cover art.
+    """
+    from tinytag.tinytag import TinyTag
+
+    if context is None:
+        return TinyTag.get(filepath, image=False)
+    return context.get_or_set(
+        "audio:tag", lambda: TinyTag.get(filepath, image=False)
+    )
+
+
+def get_has_image(filepath: str, context: Optional[FileContext] = None) -> bool:
+    """Return True if filepath has embedded cover art
+
+    The tag headers are scanned without reading the image data; for formats the
+    scanner doesn't handle, the tags are parsed again by tinytag with the image loaded.
+    """
+
+    def has_image() -> bool:
+        found = has_embedded_image(filepath)
+        if found is not None:
+            return found
+
+        from tinytag.tinytag import TinyTag
+
+        return TinyTag.get(filepath, image=True).get_image() is not None
+
+    if context is None:
+        return has_image()
+    return context.get_or_set("audio:has_image", has_image)
@@ -4,10 +4,10 @@ import datetime
 import pathlib
 from typing import Any, Iterable, List, Optional, Union
 
-import docx
-
 import mdinfo
 from mdinfo.datetime_formatter import DateTimeFormatter
+from mdinfo.filecontext import FileContext
+from mdinfo.ooxml_utils import get_package, read_core_properties
 
 FIELDS = {
     "{docx}": "Access metadata properties of Microsoft Word document files (.docx); "
@@ -83,6 +83,11 @@ def get_template_help() -> Iterable:
     ]
 
 
+@mdinfo.hookimpl
+def get_template_fields() -> Iterable[str]:
+    return [field[1:-1] for field in FIELDS]
+
+
 @mdinfo.hookimpl
 def get_template_value(
     filepath: str,
@@ -90,6 +95,7 @@ def get_template_value(
     subfield: Optional[str],
     field_arg: Optional[str],
     default: List[str],
+    context: FileContext,
 ) -> Optional[List[Optional[str]]]:
     """lookup value for template docx template fields"""
     if field != "docx":
@@ -102,7 +108,7 @@ def get_template_value(
     if subfield_parts[0] not in SUBFIELDS:
         raise ValueError(f"Unknown docx subfield {subfield}")
 
-    value = get_docx_property(filepath, subfield_parts[0])
+    value = get_docx_property(filepath, subfield_parts[0], context)
 
     if len(subfield_parts) == 2 and isinstance(value, datetime.datetime):
         # have a date/time attribute
@@ -133,8 +139,38 @@ def format_value(value: Any) -> Optional[str]:
         return str(value)
 
 
-def get_docx_property(filepath: str, attribute: str) -> Optional[Union[List, str]]:
-    """Return docx core properties attribute or None"""
-    doc = docx.Document(filepath)
-    core_properties = doc.core_properties
+def get_docx_property(
+    filepath: str, attribute: str, context: Optional[FileContext] = None
+) -> Optional[Union[List, str]]:
+    """Return docx core properties attribute or None
+
+    If context is provided, the document is only loaded the first time a property is requested.
+    """
+    if context is None:
+        core_properties = get_core_properties(filepath)
+    else:
+        core_properties = context.get_or_set(
+            "docx:core_properties", lambda: get_core_properties(filepath, context)
+        )
     return getattr(core_properties, attribute, None)
+
+
+def get_core_properties(filepath: str, context: Optional[FileContext] = None) -> Any:
+    """Return core properties of the docx file at filepath
+
+    Reads just docProps/core.xml if possible rather than loading the whole document
+    with python-docx which is slow for large documents. If context is provided, the
+    package is shared with the ooxml plugin.
+    """
+    if context is None:
+        core_properties = read_core_properties(filepath)
+    else:
+        package = get_package(filepath, context)
+        core_properties = package.core_properties() if package else None
+    if core_properties is not None:
+        return core_properties
+
+    # python-docx (and lxml) are slow to import so defer until needed
+    import docx
+
+    return docx.Document(filepath).core_properties
@@ -1,19 +1,21 @@
 """Plugin for mdinfo template to process file dates"""
 
 import datetime
-import os
-import sys
 from typing import Iterable, List, Optional
 
 from datetime_tzutils import datetime_utc_to_local
 
 import mdinfo
 from mdinfo.datetime_formatter import DateTimeFormatter
+from mdinfo.filecontext import FileContext
 
 TODAY = None
 
 FIELDS = {
-    "{created}": "File creation date/time (MacOS only; only other platforms returns file inode change time)",
+    "{created}": "File creation date/time if recorded by the platform and file system (see {birthtime}), "
+    "otherwise the file inode change time",
+    "{birthtime}": "File creation (birth) date/time; available on MacOS, Windows (Python 3.12+) and Linux "
+    "if the kernel and file system support it, otherwise undefined",
     "{modified}": "File modification date/time",
     "{accessed}": "File last accessed date/time",
     "{today}": "The current date/time (as of when {today} is first evaluated)",
@@ -62,6 +64,11 @@ def get_template_help() -> Iterable:
     return ["**Date/Time Fields**", fields, text, attributes]
 
 
+@mdinfo.hookimpl
+def get_template_fields() -> Iterable[str]:
+    return [field[1:-1] for field in FIELDS]
+
+
 @mdinfo.hookimpl
 def get_template_value(
     filepath: str,
@@ -69,11 +76,13 @@ def get_template_value(
     subfield: Optional[str],
     field_arg: Optional[str],
     default: List[str],
+    context: FileContext,
 ) -> Optional[List[Optional[str]]]:
     """lookup value for file dates
 
     Args:
         field: template field to find value for.
+        context: FileContext used to share the os.stat() result for filepath
 
     Returns:
         The matching template value (which may be None).
@@ -84,15 +93,18 @@ def get_template_value(
     if "{" + field[0] + "}" not in FIELDS:
         return None
 
-    stat_info = os.stat(filepath)
+    stat_info = context.stat()
     dt = None
-    if field[0] == "created":
-        if sys.platform == "darwin":
-            # MacOS provides file creation date/time
-            dt = datetime.datetime.fromtimestamp(stat_info.st_birthtime)
-        else:
-            # use ctime for other platforms which is last inode change
+    if field[0] in ("created", "birthtime"):
+        birthtime = context.birthtime()
+        if birthtime is not None:
+            dt = datetime.datetime.fromtimestamp(birthtime)
+        elif field[0] == "created":
+            # birth time not available so use ctime which is last inode change
+            # (or creation time on Windows with Python < 3.12)
             dt = datetime.datetime.fromtimestamp(stat_info.st_ctime)
+        else:
+            return [None]
     elif field[0] == "modified":
         dt = datetime.datetime.fromtimestamp(stat_info.st_mtime)
     elif field[0] == "accessed":
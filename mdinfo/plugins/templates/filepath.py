@@ -43,6 +43,11 @@ def get_template_help() -> Iterable:
     return ["**File Path Fields**", fields, text, subfields]
 
 
+@mdinfo.hookimpl
+def get_template_fields() -> Iterable[str]:
+    return [field[1:-1] for field in FIELDS]
+
+
 @mdinfo.hookimpl
 def get_template_value(
     filepath: str,
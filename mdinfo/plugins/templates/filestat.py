@@ -1,11 +1,13 @@
 """File stat template plugin for mdinfo"""
 
 import grp
-import os
 import pwd
-from typing import Iterable, List, Optional
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
 
 import mdinfo
+from mdinfo.filecontext import FileContext
+from mdinfo.stats import increment
 
 FIELDS = {
     "{size}": "Size of file in bytes",
@@ -15,6 +17,12 @@ FIELDS = {
     "{group}": "Group name of the file owner",
 }
 
+# user and group names by id, cached for the life of the process as lookups
+# may be slow (e.g. a network round trip for LDAP users)
+_user_names: Dict[int, str] = {}
+_group_names: Dict[int, str] = {}
+_names_lock = threading.Lock()
+
 
 @mdinfo.hookimpl
 def get_template_help() -> Iterable:
@@ -22,6 +30,11 @@ def get_template_help() -> Iterable:
     return ["**File Information Fields**", fields]
 
 
+@mdinfo.hookimpl
+def get_template_fields() -> Iterable[str]:
+    return [field[1:-1] for field in FIELDS]
+
+
 @mdinfo.hookimpl
 def get_template_value(
     filepath: str,
@@ -29,11 +42,13 @@ def get_template_value(
     subfield: Optional[str],
     field_arg: Optional[str],
     default: List[str],
+    context: FileContext,
 ) -> Optional[List[Optional[str]]]:
     """lookup value for os.stat values for filepath
 
     Args:
         field: template field to find value for.
+        context: FileContext used to share the os.stat() result for filepath
 
     Returns:
         The matching template value (which may be None).
@@ -42,7 +57,7 @@ def get_template_value(
         return None
 
     # TODO: add size.kB, size.MB, size.GB, size.TB, size.PB, size.EB, size.ZB, size.YB
-    stat_info = os.stat(filepath)
+    stat_info = context.stat()
     val = None
     if field == "size":
         val = stat_info.st_size
@@ -51,10 +66,47 @@ def get_template_value(
     elif field == "gid":
         val = stat_info.st_gid
     elif field == "user":
-        val = pwd.getpwuid(stat_info.st_uid).pw_name
+        val = get_user_name(stat_info.st_uid)
     elif field == "group":
-        val = grp.getgrgid(stat_info.st_gid).gr_name
+        val = get_group_name(stat_info.st_gid)
     else:
         raise ValueError("Unknown field: {" + field + "}")
 
     return [str(val)]
+
+
+def get_user_name(uid: int) -> str:
+    """Return name of user with id uid or the uid as a string if there is no such user"""
+    return _get_name(
+        _user_names, uid, lambda: pwd.getpwuid(uid).pw_name, "user_lookups"
+    )
+
+
+def get_group_name(gid: int) -> str:
+    """Return name of group with id gid or the gid as a string if there is no such group"""
+    return _get_name(
+        _group_names, gid, lambda: grp.getgrgid(gid).gr_name, "group_lookups"
+    )
+
+
+def _get_name(
+    names: Dict[int, str], id_: int, lookup: Callable[[], str], stat_name: str
+) -> str:
+    """Return names[id_], calling lookup() to find the name the first time id_ is seen
+
+    Unknown ids are cached too so they are only looked up once. The lookup is done
+    without holding the lock so a slow lookup doesn't block other threads; two threads
+    may both look up a new id but the result is the same. Each lookup is counted in
+    run statistic stat_name.
+    """
+    try:
+        return names[id_]
+    except KeyError:
+        pass
+    increment(stat_name)
+    try:
+        name = lookup()
+    except KeyError:
+        name = str(id_)
+    with _names_lock:
+        return names.setdefault(id_, name)
@@ -0,0 +1,204 @@
+"""Plugin template for mdinfo to access Office Open XML (.docx, .xlsx, .pptx) file metadata"""
+
+import datetime
+import pathlib
+from typing import Any, Iterable, List, Optional
+
+import mdinfo
+from mdinfo.datetime_formatter import DateTimeFormatter
+from mdinfo.filecontext import FileContext
+from mdinfo.ooxml_utils import get_package
+
+FIELDS = {
+    "{ooxml}": "Access metadata properties of Microsoft Office Open XML files "
+    "(Word .docx, Excel .xlsx, PowerPoint .pptx and their macro-enabled and template variants); "
+    "use in format {ooxml:SUBFIELD}"
+}
+
+CORE_SUBFIELDS = {
+    "author": "An entity primarily responsible for making the content of the resource.",
+    "category": "A categorization of the content of this package.",
+    "comments": "An explanation of the content of the resource.",
+    "content_status": "The status of the content, e.g. “Draft”, “Reviewed”, or “Final”.",
+    "created": "Date of creation of the resource; a date/time value.",
+    "identifier": "An unambiguous reference to the resource within a given context.",
+    "keywords": "A delimited set of keywords to support searching and indexing.",
+    "language": "The language of the intellectual content of the resource.",
+    "last_modified_by": "The user who performed the last modification.",
+    "last_printed": "The date and time of the last printing; a date/time value.",
+    "modified": "Date on which the resource was changed; a date/time value.",
+    "revision": "The revision number.",
+    "subject": "The topic of the content of the resource.",
+    "title": "The name given to the resource.",
+    "version": "The version designator.",
+}
+
+APP_SUBFIELDS = {
+    "application": "The name of the application that created the document, e.g. “Microsoft Office Word”.",
+    "app_version": "The version of the application that created the document.",
+    "company": "The name of the company associated with the document.",
+    "manager": "The name of the manager associated with the document.",
+    "template": "The name of the template used to create the document.",
+    "total_time": "Total time the document has been edited, in minutes.",
+    "pages": "Number of pages (Word documents).",
+    "words": "Number of words (Word documents and PowerPoint presentations).",
+    "characters": "Number of characters (Word documents).",
+    "characters_with_spaces": "Number of characters including spaces (Word documents).",
+    "lines": "Number of lines (Word documents).",
+    "paragraphs": "Number of paragraphs (Word documents and PowerPoint presentations).",
+    "slides": "Number of slides (PowerPoint presentations).",
+    "notes": "Number of slides with notes (PowerPoint presentations).",
+    "hidden_slides": "Number of hidden slides (PowerPoint presentations).",
+    "presentation_format": "Intended format of the presentation, e.g. “Widescreen” (PowerPoint presentations).",
+}
+
+SHEETS_SUBFIELDS = {
+    "sheets": "Number of worksheets (Excel workbooks).",
+}
+
+SUBFIELDS = {**CORE_SUBFIELDS, **APP_SUBFIELDS, **SHEETS_SUBFIELDS}
+
+DATETIME_SUBFIELDS = ["created", "modified", "last_printed"]
+
+DATETIME_ATTRIBUTES = {
+    "date": "ISO date, e.g. 2020-03-22",
+    "year": "4-digit year, e.g. 2021",
+    "yy": "2-digit year, e.g. 21",
+    "month": "Month name as locale's full name, e.g. December",
+    "mon": "Month as locale's abbreviated name, e.g. Dec",
+    "mm": "2-digit month, e.g. 12",
+    "dd": "2-digit day of the month, e.g. 22",
+    "dow": "Day of the week as locale's full name, e.g. Tuesday",
+    "doy": "Julian day of year starting from 001",
+    "hour": "2-digit hour, e.g. 10",
+    "min": "2-digit minute, e.g. 15",
+    "sec": "2-digit second, e.g. 30",
+    "strftime": "Apply strftime template to date/time. Should be used in form "
+    + "{ooxml:created.strftime,TEMPLATE} where TEMPLATE is a valid strftime template, e.g. "
+    + "{ooxml:created.strftime,%Y-%U} would result in year-week number of year: '2020-23'. "
+    + "If used with no template will return null value. "
+    + "See https://strftime.org/ for help on strftime templates.",
+}
+
+SUFFIXES = {
+    ".docx",
+    ".docm",
+    ".dotx",
+    ".dotm",
+    ".xlsx",
+    ".xlsm",
+    ".xltx",
+    ".xltm",
+    ".pptx",
+    ".pptm",
+    ".potx",
+    ".potm",
+}
+
+
+@mdinfo.hookimpl
+def get_template_help() -> Iterable:
+    text = """
+    Access metadata properties of Microsoft Office Open XML files (.docx, .xlsx, .pptx).
+    Use in format {ooxml:SUBFIELD} where SUBFIELD is one of the following:
+
+    """
+    text2 = (
+        f"If the subfield is a date/time value ({', '.join(DATETIME_SUBFIELDS)}) "
+        "the following attributes are available in dot notation (e.g. {ooxml:created.year}):"
+    )
+
+    fields = [["Field", "Description"], *[[k, v] for k, v in FIELDS.items()]]
+    subfields = [["Subfield", "Description"], *[[k, v] for k, v in SUBFIELDS.items()]]
+    datetime_properties = [
+        ["Attribute", "Description"],
+        *[[k, v] for k, v in DATETIME_ATTRIBUTES.items()],
+    ]
+    return [
+        "**Microsoft Office Open XML Fields**",
+        fields,
+        text,
+        subfields,
+        text2,
+        datetime_properties,
+    ]
+
+
+@mdinfo.hookimpl
+def get_template_fields() -> Iterable[str]:
+    return [field[1:-1] for field in FIELDS]
+
+
+@mdinfo.hookimpl
+def get_template_value(
+    filepath: str,
+    field: str,
+    subfield: Optional[str],
+    field_arg: Optional[str],
+    default: List[str],
+    context: FileContext,
+) -> Optional[List[Optional[str]]]:
+    """lookup value for template ooxml template fields"""
+    if field != "ooxml":
+        return None
+
+    if pathlib.Path(filepath).suffix.lower() not in SUFFIXES:
+        return [None]
+
+    subfield_parts = (subfield or "").split(".", 1)
+    if subfield_parts[0] not in SUBFIELDS:
+        raise ValueError(f"Unknown ooxml subfield {subfield}")
+
+    value = get_ooxml_property(filepath, subfield_parts[0], context)
+
+    if len(subfield_parts) == 2 and isinstance(value, datetime.datetime):
+        # have a date/time attribute
+        dt_attribute = subfield_parts[1]
+        if dt_attribute not in DATETIME_ATTRIBUTES:
+            raise ValueError(f"Unknown ooxml datetime attribute {dt_attribute}")
+        if dt_attribute == "strftime":
+            if default:
+                try:
+                    value = value.strftime(default[0]) if value else None
+                except:
+                    raise ValueError(f"Invalid strftime template: '{default}'")
+            else:
+                value = None
+            return [value]
+        return [getattr(DateTimeFormatter(value), dt_attribute)]
+
+    return [format_value(value)]
+
+
+def format_value(value: Any) -> Optional[str]:
+    """format values for ooxml template"""
+    if value is None or value == "":
+        return None
+    elif isinstance(value, datetime.datetime):
+        return value.isoformat()
+    else:
+        return str(value)
+
+
+def get_ooxml_property(
+    filepath: str, attribute: str, context: Optional[FileContext] = None
+) -> Any:
+    """Return core or extended property attribute of the OOXML file at filepath or None
+
+    If context is provided, the package is opened once and each metadata part is read
+    at most once no matter how many properties are requested.
+    """
+    package = get_package(filepath, context)
+    if package is None:
+        return None
+    try:
+        if attribute in CORE_SUBFIELDS:
+            properties = package.core_properties()
+        elif attribute in APP_SUBFIELDS:
+            properties = package.app_properties()
+        else:
+            return package.sheet_count()
+        return getattr(properties, attribute, None)
+    finally:
+        if context is None:
+            package.close()
@@ -4,13 +4,13 @@ import datetime
 import logging
 import pathlib
 import re
-from typing import Any, Iterable, List, Optional, Union
-
-from pdfminer.pdfdocument import PDFDocument
-from pdfminer.pdfparser import PDFParser
+from typing import Any, Dict, Iterable, List, Optional, Union
 
 import mdinfo
 from mdinfo.datetime_formatter import DateTimeFormatter
+from mdinfo.filecontext import FileContext
+from mdinfo.hookspecs import FieldRequest
+from mdinfo.pdf_utils import read_pdf_info
 
 # pdfminer.six logs a crazy amount of info to logging.INFO so turn off the noise
 logging.getLogger("pdfminer").setLevel(logging.WARNING)
@@ -93,6 +93,11 @@ def get_template_help() -> Iterable:
     ]
 
 
+@mdinfo.hookimpl
+def get_template_fields() -> Iterable[str]:
+    return [field[1:-1] for field in FIELDS]
+
+
 @mdinfo.hookimpl
 def get_template_value(
     filepath: str,
@@ -100,6 +105,7 @@ def get_template_value(
     subfield: Optional[str],
     field_arg: Optional[str],
     default: List[str],
+    context: FileContext,
 ) -> Optional[List[Optional[str]]]:
     """lookup value for template pdf template fields"""
     if field != "pdf":
@@ -112,7 +118,7 @@ def get_template_value(
     if subfield_parts[0] not in SUBFIELDS:
         raise ValueError(f"Unknown pdf subfield {subfield}")
 
-    value = get_pdf_property(filepath, subfield_parts[0])
+    value = get_pdf_property(filepath, subfield_parts[0], context)
 
     if len(subfield_parts) == 2 and isinstance(value, datetime.datetime):
         # have a date/time attribute
@@ -133,6 +139,30 @@ def get_template_value(
     return [format_value(value)]
 
 
+@mdinfo.hookimpl
+def get_template_values(
+    filepath: str,
+    fields: List[FieldRequest],
+    context: FileContext,
+) -> Dict[FieldRequest, List[Optional[str]]]:
+    """lookup values for all pdf template fields used in the templates, reading the pdf only once"""
+    values = {}
+    for request in fields:
+        try:
+            values[request] = get_template_value(
+                filepath,
+                request.field,
+                request.subfield,
+                request.field_arg,
+                list(request.default),
+                context,
+            )
+        except Exception:
+            # leave the error for get_template_value to raise when the template is rendered
+            continue
+    return values
+
+
 def format_value(value: Any) -> Optional[str]:
     """format values for pdf template"""
     if not value:
@@ -144,10 +174,15 @@ def format_value(value: Any) -> Optional[str]:
 
 
 def get_pdf_property(
-    filepath: str, subfield: str
+    filepath: str, subfield: str, context: Optional[FileContext] = None
 ) -> Optional[Union[str, datetime.datetime]]:
-    """get pdf property"""
-    metadata = get_pdf_metadata_info(filepath)
+    """get pdf property; if context is provided, the pdf is only parsed once per file"""
+    if context is None:
+        metadata = get_pdf_metadata_info(filepath)
+    else:
+        metadata = context.get_or_set(
+            "pdf:info", lambda: get_pdf_metadata_info(filepath)
+        )
     try:
         subfield_mapping = SUBFIELD_MAPPING[subfield]
     except KeyError:
@@ -179,6 +214,16 @@ def get_pdf_metadata_info(pdfpath: str) -> dict:
     """
     Get the metadata info from a pdf file
     """
+    # read just the /Info dictionary if possible as this is much faster than parsing
+    # the whole document with pdfminer; returns None if the pdf needs the full parser
+    info = read_pdf_info(pdfpath)
+    if info is not None:
+        return info
+
+    # pdfminer is slow to import so defer until a {pdf} field is rendered
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfparser import PDFParser
+
     with open(pdfpath, "rb") as fp:
         parser = PDFParser(fp)
         doc = PDFDocument(parser)
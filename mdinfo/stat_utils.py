@@ -0,0 +1,159 @@
+"""Stat files including their birth (creation) time where the platform supports it"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import sys
+import threading
+from typing import Optional, Tuple
+
+__all__ = ["stat_with_birthtime"]
+
+# from linux/fcntl.h and linux/stat.h
+AT_FDCWD = -100
+STATX_BASIC_STATS = 0x000007FF
+STATX_BTIME = 0x00000800
+
+# statx errors which mean statx itself is unusable (e.g. old kernel or blocked by seccomp)
+STATX_UNAVAILABLE_ERRORS = (errno.ENOSYS, errno.EPERM, errno.EOPNOTSUPP)
+
+
+class _StatxTimestamp(ctypes.Structure):
+    _fields_ = [
+        ("tv_sec", ctypes.c_int64),
+        ("tv_nsec", ctypes.c_uint32),
+        ("__reserved", ctypes.c_int32),
+    ]
+
+
+class _Statx(ctypes.Structure):
+    """struct statx from linux/stat.h"""
+
+    _fields_ = [
+        ("stx_mask", ctypes.c_uint32),
+        ("stx_blksize", ctypes.c_uint32),
+        ("stx_attributes", ctypes.c_uint64),
+        ("stx_nlink", ctypes.c_uint32),
+        ("stx_uid", ctypes.c_uint32),
+        ("stx_gid", ctypes.c_uint32),
+        ("stx_mode", ctypes.c_uint16),
+        ("__spare0", ctypes.c_uint16),
+        ("stx_ino", ctypes.c_uint64),
+        ("stx_size", ctypes.c_uint64),
+        ("stx_blocks", ctypes.c_uint64),
+        ("stx_attributes_mask", ctypes.c_uint64),
+        ("stx_atime", _StatxTimestamp),
+        ("stx_btime", _StatxTimestamp),
+        ("stx_ctime", _StatxTimestamp),
+        ("stx_mtime", _StatxTimestamp),
+        ("stx_rdev_major", ctypes.c_uint32),
+        ("stx_rdev_minor", ctypes.c_uint32),
+        ("stx_dev_major", ctypes.c_uint32),
+        ("stx_dev_minor", ctypes.c_uint32),
+        # fields added by newer kernels
+        ("__spare", ctypes.c_uint64 * 14),
+    ]
+
+
+_statx = None
+_statx_loaded = False
+_statx_lock = threading.Lock()
+
+
+def _load_statx():
+    """Return libc statx function or None if not available"""
+    global _statx, _statx_loaded
+    with _statx_lock:
+        if not _statx_loaded:
+            _statx_loaded = True
+            if sys.platform.startswith("linux"):
+                try:
+                    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+                    _statx = libc.statx
+                except (AttributeError, OSError):
+                    # glibc < 2.28 or not glibc
+                    _statx = None
+                else:
+                    _statx.argtypes = [
+                        ctypes.c_int,
+                        ctypes.c_char_p,
+                        ctypes.c_int,
+                        ctypes.c_uint,
+                        ctypes.POINTER(_Statx),
+                    ]
+                    _statx.restype = ctypes.c_int
+    return _statx
+
+
+def _disable_statx():
+    global _statx
+    with _statx_lock:
+        _statx = None
+
+
+def stat_with_birthtime(
+    path: str,
+) -> Tuple[os.stat_result, Optional[float]]:
+    """Stat path, following symlinks, and return (os.stat_result, birth time)
+
+    Birth time is the file creation time as a POSIX timestamp or None if not available.
+    On Linux this uses a single statx() call which returns the birth time if the kernel
+    and file system support it; on other platforms os.stat() is used and the birth time
+    is st_birthtime where available (e.g. macOS, BSD and Windows with Python 3.12+).
+
+    Raises:
+        OSError: as os.stat() does if path can't be stat'd
+    """
+    statx = _load_statx()
+    if statx is not None:
+        buf = _Statx()
+        if statx(AT_FDCWD, os.fsencode(path), 0, STATX_BASIC_STATS | STATX_BTIME, buf):
+            error = ctypes.get_errno()
+            if error not in STATX_UNAVAILABLE_ERRORS:
+                raise OSError(error, os.strerror(error), path)
+            _disable_statx()
+        else:
+            birthtime = (
+                _timestamp(buf.stx_btime) if buf.stx_mask & STATX_BTIME else None
+            )
+            return _stat_result(buf), birthtime
+
+    stat = os.stat(path)
+    return stat, getattr(stat, "st_birthtime", None)
+
+
+def _timestamp(ts: _StatxTimestamp) -> float:
+    """Return statx timestamp as float seconds, computed the same way as os.stat()"""
+    return ts.tv_sec + ts.tv_nsec * 1e-9
+
+
+def _stat_result(buf: _Statx) -> os.stat_result:
+    """Return os.stat_result for statx result buf"""
+    return os.stat_result(
+        (
+            buf.stx_mode,
+            buf.stx_ino,
+            os.makedev(buf.stx_dev_major, buf.stx_dev_minor),
+            buf.stx_nlink,
+            buf.stx_uid,
+            buf.stx_gid,
+            buf.stx_size,
+            buf.stx_atime.tv_sec,
+            buf.stx_mtime.tv_sec,
+            buf.stx_ctime.tv_sec,
+        ),
+        {
+            "st_atime": _timestamp(buf.stx_atime),
+            "st_mtime": _timestamp(buf.stx_mtime),
+            "st_ctime": _timestamp(buf.stx_ctime),
+            "st_atime_ns": buf.stx_atime.tv_sec * 10**9 + buf.stx_atime.tv_nsec,
+            "st_mtime_ns": buf.stx_mtime.tv_sec * 10**9 + buf.stx_mtime.tv_nsec,
+            "st_ctime_ns": buf.stx_ctime.tv_sec * 10**9 + buf.stx_ctime.tv_nsec,
+            "st_blksize": buf.stx_blksize,
+            "st_blocks": buf.stx_blocks,
+            "st_rdev": os.makedev(buf.stx_rdev_major, buf.stx_rdev_minor),
+        },
+    )
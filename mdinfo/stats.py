@@ -0,0 +1,25 @@
+"""Run statistics collected while processing files"""
+
+from __future__ import annotations
+
+import collections
+import threading
+
+__all__ = ["RUN_STATS", "increment", "reset"]
+
+RUN_STATS = collections.Counter()
+"""Counters for the current run, e.g. RUN_STATS["cache_hits"]"""
+
+_lock = threading.Lock()
+
+
+def increment(name: str, count: int = 1) -> None:
+    """Increment run statistic name by count"""
+    with _lock:
+        RUN_STATS[name] += count
+
+
+def reset() -> None:
+    """Reset all run statistics"""
+    with _lock:
+        RUN_STATS.clear()
@@ -0,0 +1,121 @@
+"""Test detection of embedded cover art in audio files"""
+
+import struct
+import wave
+
+import pytest
+from tinytag.tinytag import TinyTag
+
+from mdinfo.audio_utils import has_embedded_image
+from mdinfo.filetemplate import FileTemplate
+
+AUDIO_FILE = "tests/test_files/warm_lights.mp3"
+
+# 1 MB of image data which should never be read
+IMAGE_DATA = b"\x89PNG" + bytes(1024 * 1024)
+
+
+def synchsafe(value):
+    return bytes((value >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def id3_frame(version, frame_id, data):
+    if version == 2:
+        return frame_id + len(data).to_bytes(3, "big") + data
+    size = synchsafe(len(data)) if version == 4 else struct.pack(">I", len(data))
+    return frame_id + size + b"\x00\x00" + data
+
+
+def id3_tag(version, image=True):
+    """Return ID3v2 tag with a title and, optionally, a picture frame and padding"""
+    title_id, image_id = (b"TT2", b"PIC") if version == 2 else (b"TIT2", b"APIC")
+    frames = id3_frame(version, title_id, b"\x00Title")
+    if image:
+        frames += id3_frame(version, image_id, b"\x00PNG\x03\x00" + IMAGE_DATA)
+    frames += bytes(256)
+    return b"ID3" + bytes((version, 0, 0)) + synchsafe(len(frames)) + frames
+
+
+def flac_file(image=True, id3=False):
+    blocks = [(0, bytes(34)), (4, b"\x00" * 8)]
+    if image:
+        blocks.append((6, IMAGE_DATA))
+    blocks.append((1, bytes(16)))
+    data = id3_tag(3, image=False) if id3 else b""
+    data += b"fLaC"
+    for i, (block_type, block) in enumerate(blocks):
+        last = 0x80 if i == len(blocks) - 1 else 0
+        data += bytes((block_type | last,)) + len(block).to_bytes(3, "big") + block
+    return data
+
+
+def atom(atom_type, data):
+    return struct.pack(">I4s", 8 + len(data), atom_type) + data
+
+
+def mp4_file(image=True):
+    items = atom(b"\xa9nam", atom(b"data", b"\x00\x00\x00\x01\x00\x00\x00\x00Title"))
+    if image:
+        items += atom(
+            b"covr", atom(b"data", b"\x00\x00\x00\x0e\x00\x00\x00\x00" + IMAGE_DATA)
+        )
+    meta = atom(
+        b"meta", b"\x00\x00\x00\x00" + atom(b"hdlr", bytes(25)) + atom(b"ilst", items)
+    )
+    moov = atom(b"moov", atom(b"mvhd", bytes(100)) + atom(b"udta", meta))
+    return atom(b"ftyp", b"M4A \x00\x00\x00\x00") + moov + atom(b"mdat", bytes(64))
+
+
+@pytest.mark.parametrize("version", [2, 3, 4])
+@pytest.mark.parametrize("image", [True, False])
+def test_has_embedded_image_id3(tmp_path, version, image):
+    filepath = tmp_path / "test.mp3"
+    filepath.write_bytes(id3_tag(version, image) + b"\xff\xfb\x90\x00" + bytes(413))
+    assert has_embedded_image(str(filepath)) is image
+
+
+@pytest.mark.parametrize("image", [True, False])
+@pytest.mark.parametrize("id3", [True, False])
+def test_has_embedded_image_flac(tmp_path, image, id3):
+    filepath = tmp_path / "test.flac"
+    filepath.write_bytes(flac_file(image, id3))
+    assert has_embedded_image(str(filepath)) is image
+
+
+@pytest.mark.parametrize("image", [True, False])
+def test_has_embedded_image_mp4(tmp_path, image):
+    filepath = tmp_path / "test.m4a"
+    filepath.write_bytes(mp4_file(image))
+    assert has_embedded_image(str(filepath)) is image
+
+
+def test_has_embedded_image_test_file():
+    """Test has_embedded_image agrees with tinytag"""
+    image = TinyTag.get(AUDIO_FILE, image=True).get_image()
+    assert has_embedded_image(AUDIO_FILE) is (image is not None)
+
+
+def test_has_embedded_image_unsupported(tmp_path):
+    """Test has_embedded_image returns None for formats it doesn't handle"""
+    truncated = tmp_path / "truncated.m4a"
+    truncated.write_bytes(mp4_file()[:200])
+    assert has_embedded_image(str(truncated)) is None
+    assert has_embedded_image("tests/test_files/pears.jpg") is None
+
+
+def test_audio_has_image(tmp_path):
+    """Test {audio:has_image} with scanned files and fallback to tinytag"""
+    filepath = tmp_path / "test.flac"
+    filepath.write_bytes(flac_file())
+    assert FileTemplate(str(filepath)).render("{audio:has_image}") == ["True"]
+    assert FileTemplate(AUDIO_FILE).render("{audio:has_image}") == ["False"]
+
+    # wav files are not scanned
+    wav = tmp_path / "test.wav"
+    with wave.open(str(wav), "wb") as fd:
+        fd.setnchannels(1)
+        fd.setsampwidth(2)
+        fd.setframerate(8000)
+        fd.writeframes(bytes(1600))
+    assert has_embedded_image(str(wav)) is None
+    assert FileTemplate(str(wav)).render("{audio:has_image}") == ["False"]
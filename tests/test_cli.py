@@ -217,3 +217,353 @@ def test_cli_json_array(source: pathlib.Path, target: pathlib.Path):
         {"file": "warm_lights.mp3", "size": "7982019"},
     ]
     assert got == expected
+
+
+@pytest.mark.parametrize("jobs_args", [["--jobs", "2"], ["--jobs", "2", "--threads"]])
+def test_cli_print_jobs(source: pathlib.Path, target: pathlib.Path, jobs_args):
+    """Test CLI with -p/--print and --jobs preserves file order"""
+    from mdinfo.cli import cli
+
+    source_files = sorted(list(source.glob("*")))
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--print",
+            "{filepath.name}",
+            "--print",
+            "{size}",
+            *jobs_args,
+            *[str(p) for p in source_files],
+        ],
+    )
+    assert result.exit_code == 0
+    assert (
+        result.output
+        == "\n".join(f"{p.name}: {p.name} {p.stat().st_size}" for p in source_files)
+        + "\n"
+    )
+
+
+def test_cli_csv_jobs_unordered(source: pathlib.Path, target: pathlib.Path):
+    """Test CLI with --csv, --jobs and --unordered"""
+    from mdinfo.cli import cli
+
+    source_files = sorted(list(source.glob("*")))
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--print",
+            "file:{filepath.name}",
+            "-p",
+            "{size}",
+            "--no-filename",
+            "--csv",
+            "--jobs",
+            "2",
+            "--unordered",
+            *[str(p) for p in source_files],
+        ],
+    )
+    assert result.exit_code == 0
+    lines = [s for s in [string.strip() for string in result.output.split("\n")] if s]
+    assert lines[0] == "file,size"
+    assert sorted(lines[1:]) == [
+        "flowers.jpeg,3449684",
+        "pears.jpg,2771656",
+        "warm_lights.mp3,7982019",
+    ]
+
+
+def test_cli_json_array_jobs(source: pathlib.Path, target: pathlib.Path):
+    """Test CLI with --json --array and --jobs preserves file order"""
+    from mdinfo.cli import cli
+
+    source_files = sorted(list(source.glob("*")))
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--print",
+            "file:{filepath.name}",
+            "--no-filename",
+            "--json",
+            "--array",
+            "--jobs",
+            "2",
+            *[str(p) for p in source_files],
+        ],
+    )
+    assert result.exit_code == 0
+    assert json.loads(result.output) == [{"file": p.name} for p in source_files]
+
+
+@pytest.fixture(scope="function")
+def source_tree(tmpdir_factory) -> pathlib.Path:
+    """Directory tree with test files in nested sub-directories"""
+    cwd = pathlib.Path.cwd()
+    tmpdir = pathlib.Path(tmpdir_factory.mktemp("tree"))
+    (tmpdir / "a" / "b").mkdir(parents=True)
+    (tmpdir / "skip").mkdir()
+    copy_file(cwd / TEST_IMAGE_1, tmpdir / pathlib.Path(TEST_IMAGE_1).name)
+    copy_file(cwd / TEST_IMAGE_2, tmpdir / "a" / pathlib.Path(TEST_IMAGE_2).name)
+    copy_file(cwd / TEST_MP3_1, tmpdir / "a" / "b" / pathlib.Path(TEST_MP3_1).name)
+    copy_file(cwd / TEST_IMAGE_1, tmpdir / "skip" / "skipped.jpg")
+    return tmpdir
+
+
+def test_cli_recursive(source_tree: pathlib.Path):
+    """Test CLI with --recursive"""
+    from mdinfo.cli import cli
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        ["--print", "{filepath.name}", "--no-filename", "--recursive", str(source_tree)],
+    )
+    assert result.exit_code == 0
+    assert result.output.splitlines() == [
+        "warm_lights.mp3",
+        "flowers.jpeg",
+        "pears.jpg",
+        "skipped.jpg",
+    ]
+
+
+def test_cli_recursive_include_exclude(source_tree: pathlib.Path):
+    """Test CLI with --recursive, --include and --exclude"""
+    from mdinfo.cli import cli
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--print",
+            "{filepath.name}",
+            "--no-filename",
+            "--recursive",
+            "--include",
+            "*.jp*g",
+            "--include",
+            "*.mp3",
+            "--exclude",
+            "skip",
+            "--exclude",
+            "*.jpeg",
+            str(source_tree),
+        ],
+    )
+    assert result.exit_code == 0
+    assert result.output.splitlines() == ["warm_lights.mp3", "pears.jpg"]
+
+
+def test_cli_recursive_max_depth(source_tree: pathlib.Path):
+    """Test CLI with --recursive and --max-depth"""
+    from mdinfo.cli import cli
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--print",
+            "{filepath.name}",
+            "--no-filename",
+            "--recursive",
+            "--max-depth",
+            "2",
+            str(source_tree),
+        ],
+    )
+    assert result.exit_code == 0
+    assert result.output.splitlines() == ["flowers.jpeg", "pears.jpg", "skipped.jpg"]
+
+
+def test_cli_json_multiple_files(source: pathlib.Path, target: pathlib.Path):
+    """Test CLI with --json prints one JSON object per line"""
+    from mdinfo.cli import cli
+
+    source_files = sorted(list(source.glob("*")))
+    runner = CliRunner()
+
+    result = runner.invoke(
+        cli,
+        [
+            "--print",
+            "file:{filepath.name}",
+            "-p",
+            "{size}",
+            "--no-filename",
+            "--json",
+            *[str(p) for p in source_files],
+        ],
+    )
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"file": "flowers.jpeg", "size": "3449684"},
+        {"file": "pears.jpg", "size": "2771656"},
+        {"file": "warm_lights.mp3", "size": "7982019"},
+    ]
+
+
+def test_cli_cache(source: pathlib.Path, target: pathlib.Path):
+    """Test CLI with --cache and --cache-stats"""
+    from mdinfo.cli import cli
+
+    source_files = sorted(list(source.glob("*")))
+    cache_path = str(target / "cache.db")
+    args = [
+        "--print",
+        "{audio:title}",
+        "--no-filename",
+        "--cache",
+        cache_path,
+        "--cache-stats",
+        *[str(p) for p in source_files],
+    ]
+
+    runner = CliRunner()
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0
+    assert "0 hits, 3 misses" in result.stderr
+    assert "3 entries" in result.stderr
+
+    # second run should be served from the cache
+    result2 = runner.invoke(cli, args)
+    assert result2.exit_code == 0
+    assert result2.stdout.splitlines()[-1] == "Warm Lights (ft. Apoxode)"
+    assert "3 hits, 0 misses (100.0% hit rate)" in result2.stderr
+
+    # evict all entries
+    result3 = runner.invoke(cli, [*args, "--cache-max-entries", "0"])
+    assert result3.exit_code == 0
+    assert "3 evicted, 0 entries" in result3.stderr
+
+
+def test_cli_cache_stats_name_lookups(
+    source: pathlib.Path, target: pathlib.Path, monkeypatch
+):
+    """Test that --cache-stats reports the number of user and group name lookups"""
+    from mdinfo.cli import cli
+    from mdinfo.plugins.templates import filestat
+
+    monkeypatch.setattr(filestat, "_user_names", {})
+    monkeypatch.setattr(filestat, "_group_names", {})
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--print",
+            "{user}:{group}",
+            "--cache",
+            str(target / "cache.db"),
+            "--cache-stats",
+            *[str(p) for p in sorted(source.glob("*"))],
+        ],
+    )
+    assert result.exit_code == 0
+    # all files have the same owner so each name is looked up once
+    assert "Name lookups: 1 user, 1 group" in result.stderr
+
+
+@pytest.mark.parametrize("null_input", [False, True])
+def test_cli_files_from(source: pathlib.Path, null_input: bool):
+    """Test CLI with --files-from - reading paths from stdin"""
+    from mdinfo.cli import cli
+
+    source_files = [str(p) for p in sorted(source.glob("*"))]
+    separator = "\0" if null_input else "\n"
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--print",
+            "{filepath.name}",
+            "--no-filename",
+            "--files-from",
+            "-",
+            *(["--null-input"] if null_input else []),
+        ],
+        input=separator.join([*source_files, "", str(source / "missing.jpg")])
+        + separator,
+    )
+    assert result.exit_code == 0
+    assert result.stdout.splitlines() == [
+        "flowers.jpeg",
+        "pears.jpg",
+        "warm_lights.mp3",
+    ]
+    assert "File not found" in result.stderr
+
+
+def test_cli_files_from_file(source: pathlib.Path, target: pathlib.Path):
+    """Test CLI with --files-from FILE and FILES"""
+    from mdinfo.cli import cli
+
+    files_from = target / "files.txt"
+    files_from.write_text(f"{source / 'pears.jpg'}\r\n{source / 'flowers.jpeg'}")
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--print",
+            "{filepath.name}",
+            "--no-filename",
+            "--files-from",
+            str(files_from),
+            str(source / "warm_lights.mp3"),
+        ],
+    )
+    assert result.exit_code == 0
+    assert result.output.splitlines() == [
+        "warm_lights.mp3",
+        "pears.jpg",
+        "flowers.jpeg",
+    ]
+
+    # must have FILES or --files-from
+    result = runner.invoke(cli, ["--print", "{filepath.name}"])
+    assert result.exit_code == 2
+    assert "--files-from" in result.output
+
+
+def test_cli_explain():
+    """Test CLI with --explain"""
+    from mdinfo.cli import cli
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        ["--explain", "--json", "-p", "title:{pdf:title}", "-p", "{size}{var:x,y}"],
+    )
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert re.match(r"pdf:title\s+mdinfo.plugins.templates.pdf \(batch\)", lines[1])
+    assert re.match(r"size\s+mdinfo.plugins.templates.filestat$", lines[2])
+    assert re.match(r"var:x\s+\(template engine\)", lines[3])
+    assert (
+        "Plugins called: mdinfo.plugins.templates.pdf, mdinfo.plugins.templates.filestat"
+        in result.output
+    )
+    assert "mdinfo.plugins.templates.audio" in result.output.split("not called:")[1]
+
+
+def test_cli_explain_combine():
+    """Test CLI with --explain and a template with a combine branch"""
+    from mdinfo.cli import cli
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["--explain", "-p", "{pdf:title&{docx:title}}"])
+    assert result.exit_code == 0
+    lines = result.output.splitlines()
+    assert re.match(r"pdf:title\s+mdinfo.plugins.templates.pdf \(batch\)", lines[1])
+    assert re.match(r"docx:title\s+mdinfo.plugins.templates.docx$", lines[2])
+    assert (
+        "Plugins called: mdinfo.plugins.templates.pdf, mdinfo.plugins.templates.docx"
+        in result.output
+    )
+    assert "mdinfo.plugins.templates.docx" not in result.output.split("not called:")[1]
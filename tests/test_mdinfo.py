@@ -0,0 +1,96 @@
+"""Test mdinfo library API"""
+
+import pytest
+
+import mdinfo
+from mdinfo.mdinfo import FileMetadata, iter_metadata
+from mdinfo.mtlparser import SyntaxError, UnknownFieldError
+
+TEST_IMAGE_1 = "tests/test_files/pears.jpg"
+TEST_PDF_1 = "tests/test_files/test_pdf.pdf"
+TEST_MP3_1 = "tests/test_files/warm_lights.mp3"
+
+
+def test_iter_metadata():
+    """Test iter_metadata with a list of templates"""
+    results = iter_metadata(
+        iter([TEST_IMAGE_1, TEST_PDF_1]),
+        ["{size}", "title:{pdf:title}", "{filepath.suffix}"],
+    )
+    assert list(results) == [
+        FileMetadata(
+            TEST_IMAGE_1,
+            {"size": ["2771656"], "title": [None], "filepath.suffix": [".jpg"]},
+        ),
+        FileMetadata(
+            TEST_PDF_1,
+            {
+                "size": ["18520"],
+                "title": ["Test Document"],
+                "filepath.suffix": [".pdf"],
+            },
+        ),
+    ]
+
+
+@pytest.mark.parametrize("jobs,threads", [(1, False), (2, True), (2, False)])
+def test_iter_metadata_dict(jobs, threads):
+    """Test iter_metadata with a dict of templates, errors and parallel jobs"""
+    results = list(
+        iter_metadata(
+            [TEST_MP3_1, "tests/test_files/missing.jpg", TEST_PDF_1],
+            {"title": "{audio:title,}{pdf:title,}", "year": "{pdf:created.bogus}"},
+            jobs=jobs,
+            threads=threads,
+        )
+    )
+    assert [r.path for r in results] == [
+        TEST_MP3_1,
+        "tests/test_files/missing.jpg",
+        TEST_PDF_1,
+    ]
+    assert results[0].values == {
+        "title": ["Warm Lights (ft. Apoxode)"],
+        "year": [None],
+    }
+    assert not results[0].errors
+    assert not results[1].values
+    assert set(results[1].errors) == {"title", "year"}
+    assert "does not exist" in results[1].errors["title"]
+    assert results[2].values == {"title": ["Test Document"]}
+    assert "bogus" in results[2].errors["year"]
+
+
+def test_iter_metadata_shared_lookups(monkeypatch):
+    """Test iter_metadata looks up a field used by several templates only once"""
+    from mdinfo.filetemplate import FileTemplate
+
+    lookups = []
+    get_field_value = FileTemplate.get_field_value
+
+    def counting_get_field_value(self, field, *args):
+        lookups.append(field)
+        return get_field_value(self, field, *args)
+
+    monkeypatch.setattr(FileTemplate, "get_field_value", counting_get_field_value)
+    (result,) = iter_metadata(
+        [TEST_PDF_1], {"title": "{pdf:title}", "upper": "{pdf:title|upper}"}
+    )
+    assert result.values == {"title": ["Test Document"], "upper": ["TEST DOCUMENT"]}
+    assert lookups == ["pdf"]
+
+
+def test_iter_metadata_invalid_template():
+    """Test iter_metadata raises for invalid templates and unknown fields"""
+    with pytest.raises(SyntaxError):
+        next(iter_metadata([TEST_IMAGE_1], ["{size"]))
+    with pytest.raises(UnknownFieldError):
+        next(iter_metadata([TEST_IMAGE_1], ["{not_a_field}"]))
+
+
+def test_iter_metadata_package_export():
+    """Test iter_metadata is exported by the mdinfo package"""
+    assert mdinfo.iter_metadata is iter_metadata
+    assert mdinfo.FileMetadata is FileMetadata
+    with pytest.raises(AttributeError):
+        mdinfo.not_exported
@@ -0,0 +1,168 @@
+"""Test the MTL parser in mdinfo.mtlgrammar against the textX grammar it implements"""
+
+import random
+
+import pytest
+
+from mdinfo.mtlgrammar import ParseError, parse
+from mdinfo.mtlparser import MTL_GRAMMAR_MODEL
+
+textx = pytest.importorskip("textx")
+
+TEMPLATES = [
+    "",
+    "abc",
+    "{foo}",
+    "{foo}{bar}",
+    "x{foo}y{bar}z",
+    "{+foo}",
+    "{, +foo}",
+    "{foo:bar}",
+    "{foo:bar:baz}",
+    "{foo:bar\\ baz}",
+    "{created.strftime,%Y-%m-%d}",
+    "{%var}",
+    "{foo(42)}",
+    "{foo()}",
+    "{foo|lower|upper}",
+    "{foo|split(,)|sslice(1:3)}",
+    "{foo|}",
+    "{foo[a,b|c,]}",
+    "{foo[,x]}",
+    "{foo[a,b,c]}",
+    "{foo[]}",
+    "{foo contains bar|baz?yes,no}",
+    "{foo not == bar}",
+    "{foo  <=  42}",
+    "{foo == }",
+    "{foo == ,x}",
+    "{foo == ?x}",
+    "{foo == {bar}|{baz}}",
+    "{foo&{bar}?T,F}",
+    "{foo&}",
+    "{foo?}",
+    "{foo,}",
+    "{foo,{bar,{baz}}}",
+    "{var:x,{foo|autosplit&{bar|autosplit}}}{%x|sort}",
+    "{strip,{foo}}",
+    "{format:int:02d,{foo}}",
+    "{foo|lower[x,y] == z&w?t,f}",
+    # invalid templates
+    "{",
+    "}",
+    "a,b",
+    "{foo",
+    "{ foo}",
+    "{foo }",
+    "{foo:}",
+    "{foo(}",
+    "{foo()x}",
+    "{foo,bar,baz}",
+    "{foo[x]}",
+    "{foo|lower|}",
+    "{foo[a,b|]}",
+    "{foo not== bar}",
+    "{foo  not  == bar}",
+    "{foo,{bar}",
+]
+
+# pieces of templates used to generate random templates, most of which are not valid
+TOKENS = [
+    "{",
+    "{",
+    "}",
+    "}",
+    "a",
+    "foo",
+    "%x",
+    ".",
+    ":",
+    "sub",
+    "(",
+    ")",
+    "arg",
+    "|",
+    "lower",
+    "upper(x)",
+    "[",
+    "]",
+    ",",
+    "?",
+    "&",
+    "+",
+    " ",
+    "not ",
+    "==",
+    "<",
+    "contains",
+    "\\ ",
+    "-",
+    "x|y",
+    "'",
+]
+
+
+@pytest.fixture(scope="module")
+def metamodel():
+    return textx.metamodel_from_file(MTL_GRAMMAR_MODEL, skipws=False)
+
+
+def textx_parse(metamodel, template):
+    """Return textX model for template as nested tuples or None if template is not valid"""
+
+    def dump(obj):
+        if isinstance(obj, list):
+            return [dump(o) for o in obj]
+        if hasattr(obj, "_tx_attrs"):
+            return (
+                obj.__class__.__name__,
+                {name: dump(getattr(obj, name)) for name in obj._tx_attrs},
+            )
+        return obj
+
+    try:
+        model = metamodel.model_from_str(template)
+    except textx.TextXSyntaxError:
+        return None
+    # textX returns "" for an empty template
+    return dump(model) if model else ()
+
+
+def mtlgrammar_parse(template):
+    """Return mtlgrammar model for template as nested tuples or None if template is not valid"""
+
+    def dump(obj):
+        if isinstance(obj, list):
+            return [dump(o) for o in obj]
+        if hasattr(obj, "_fields"):
+            return (
+                obj.__class__.__name__,
+                {name: dump(getattr(obj, name)) for name in obj._fields},
+            )
+        return obj
+
+    try:
+        model = parse(template)
+    except ParseError:
+        return None
+    return dump(model) if model else ()
+
+
+@pytest.mark.parametrize("template", TEMPLATES)
+def test_parse(metamodel, template):
+    """Test parse returns the same model as textX"""
+    assert mtlgrammar_parse(template) == textx_parse(metamodel, template)
+
+
+def test_parse_random(metamodel):
+    """Test parse agrees with textX for random templates"""
+    rng = random.Random(42)
+    for _ in range(2000):
+        template = "".join(rng.choice(TOKENS) for _ in range(rng.randint(1, 12)))
+        assert mtlgrammar_parse(template) == textx_parse(metamodel, template), template
+
+
+def test_parse_error():
+    """Test ParseError shows where parsing failed"""
+    with pytest.raises(ParseError, match=r"Expected '\}' at position 5: '\{a,b\*,c\}'"):
+        parse("{a,b,c}")
@@ -5,7 +5,13 @@ import os
 
 import pytest
 
-from mdinfo.mtlparser import MTLParser, SyntaxError, TemplateString
+from mdinfo.mtlparser import (
+    MTLParser,
+    MTLParserModel,
+    SyntaxError,
+    TemplateString,
+    UnknownFieldError,
+)
 
 PUNCTUATION = {
     "comma": ",",
@@ -112,6 +118,12 @@ TEST_DATA = [
     ["{var:myvar,Fizz}Foo{%myvar}Bar", ["FooFizzBar"]],  # #4
     ["{var:myvar,Fizz}{foobar}{%myvar}Bar", ["foo,barFizzBar"]],  # #4
     ["{var:myvar,}{%myvar?True,False}", ["False"]],  # #5
+    ["{var:a,X}{var:b,Y}{foo[F,%a-%b]}", ["X-Yoo", "Bar"]],
+    ["{var:a,X}{foo|appends(-%a)}", ["Foo-X", "Bar-X"]],
+    ["{var:a,X}{foo[o,%%%a]}", ["F%X%X", "Bar"]],
+    ["{var:a,X}{foo[o,%%a]}", ["F%a%a", "Bar"]],
+    ["{var:a,}{foo[%a,X|o,0]}", ["F00", "Bar"]],
+    ["{foo[,X]}", ["Foo", "Bar"]],
     # conditionals
     ["{foo contains Foo?YES,NO}", ["YES"]],
     ["{foo contains Fo?YES,NO}", ["YES"]],
@@ -447,6 +459,54 @@ def test_expand_inplace():
     assert result[0] == "Foo/Bar"
 
 
+def test_lazy_branches():
+    """Test that default, bool and combine branches are only rendered when needed"""
+    template = CustomParser()
+    lookups = []
+
+    def get_field_values(field, subfield, field_arg, default):
+        lookups.append(field)
+        return template.get_field_values(field, subfield, field_arg, default)
+
+    template.parser.field_values[0] = get_field_values
+
+    for template_string, expected, fields in [
+        ["{bar,{answer}}", ["Foo Bar"], ["bar"]],
+        ["{baz,{answer}}", ["42"], ["baz", "answer"]],
+        ["{bar?{answer},{fizz}}", ["42"], ["bar", "answer"]],
+        ["{baz?{answer},{bar}}", ["Foo Bar"], ["baz", "bar"]],
+        ["{bar&{answer}?yes,no}", ["yes"], ["bar"]],
+        ["{baz&{answer}?yes,no}", ["yes"], ["baz", "answer"]],
+        ["{bar,{var:x,X}}{%x}", ["Foo BarX"], ["bar"]],
+    ]:
+        lookups.clear()
+        assert template.render(template_string) == expected
+        assert lookups == fields
+
+
+def test_expand_variables():
+    """Test expanding variables in a value"""
+    parser = MTLParser(get_field_values=lambda *x: None)
+    parser.variables = {
+        "x": ["A"],
+        "xy": ["B"],
+        "m": ["a", "b"],
+        "n": ["c", "d"],
+        "e": [],
+    }
+    assert parser.expand_variables("abc") == ["abc"]
+    assert parser.expand_variables("%x %xy%%x%") == ["A B%x%"]
+    assert parser.expand_variables("%m-%m") == ["a-a", "b-b"]
+    assert parser.expand_variables("%m%n") == ["ac", "ad", "bc", "bd"]
+    assert parser.expand_variables("[%e]") == ["[]"]
+    assert parser.expand_variables("%x\\1") == ["A\\1"]
+    assert parser.expand_variables_to_str("%x-%xy", "test") == "A-B"
+    with pytest.raises(SyntaxError, match="test must have a single value"):
+        parser.expand_variables_to_str("%m", "test")
+    with pytest.raises(SyntaxError, match="Variable 'z' is not defined"):
+        parser.expand_variables("%x%z")
+
+
 def test_template_var_error():
     """Test template var error"""
     template = CustomParser()
@@ -554,3 +614,86 @@ def test_parse_statement(template_string, expected):
     """Test parse_statement"""
     parser = MTLParser(get_field_values=lambda *x: x)
     assert parser.parse_statement(template_string) == expected
+
+
+def test_template_cache():
+    """Test that parsed templates are cached and reused"""
+    model = MTLParserModel()
+    model.cache_clear()
+    parser = CustomParser()
+    assert parser.render("{foo:foo}") == ["Foo"]
+    assert parser.render("{foo:foo}") == ["Foo"]
+    info = model.cache_info()
+    assert info.hits == 1
+    assert info.misses == 1
+    assert info.currsize == 1
+
+
+def test_template_compile_cache():
+    """Test that templates are compiled once and the compiled template is reused"""
+    model = MTLParserModel()
+    model.cache_clear()
+    compiled = model.compile("{foo:foo}{var:x,{bar}}")
+    assert MTLParserModel().compile("{foo:foo}{var:x,{bar}}") is compiled
+    assert model.parse("{foo:foo}{var:x,{bar}}") is compiled.statement
+    assert compiled.render(CustomParser().parser) == ["Foo"]
+    model.cache_clear()
+
+
+@pytest.mark.parametrize(
+    "template_string", ["{foo}", "{foo:bar}", "{baz}", "{foo(42)}", "[{foo}]"]
+)
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"expand_inplace": True, "inplace_sep": "; "},
+        {"sanitize": str.upper, "sanitize_value": lambda v: v and v.replace("o", "0")},
+        {"none_str": "NONE"},
+    ],
+)
+def test_field_reference(template_string, options):
+    """Test that a template which is a single field renders the same as the general case"""
+    template = CustomParser(**options)
+    # variable assignment renders nothing but isn't a single field template
+    assert template.render(template_string) == template.render(
+        template_string + "{var:x,y}"
+    )
+
+
+def test_field_reference_unknown_field():
+    """Test that a template which is a single unknown field raises UnknownFieldError"""
+    template = CustomParser()
+    with pytest.raises(UnknownFieldError):
+        template.render("{nope}")
+
+
+def test_template_combine_values_not_modified():
+    """Test that combine does not modify the values of the combined field"""
+    template = CustomParser()
+    assert template.render("{var:x,{bar}}{%x&{answer}}{%x}") == [
+        "Foo BarFoo Bar",
+        "42Foo Bar",
+    ]
+
+
+def test_template_cache_eviction():
+    """Test that template cache evicts least recently used templates"""
+    model = MTLParserModel()
+    model.cache_clear()
+    cache_size = model.cache_size
+    try:
+        model.cache_size = 2
+        parser = CustomParser()
+        parser.render("{foo:foo}")
+        parser.render("{foo:bar}")
+        parser.render("{foo:foo}")
+        parser.render("{bar}")  # evicts {foo:bar}
+        assert model.cache_info().currsize == 2
+        parser.render("{foo:foo}")
+        assert model.cache_info().hits == 2
+        parser.render("{foo:bar}")
+        assert model.cache_info().misses == 4
+    finally:
+        model.cache_size = cache_size
+        model.cache_clear()
@@ -0,0 +1,290 @@
+"""Test Office Open XML metadata reader"""
+
+import dataclasses
+import datetime
+import zipfile
+
+import docx
+import pytest
+
+from mdinfo.filecontext import FileContext
+from mdinfo.filetemplate import FileTemplate
+from mdinfo.ooxml_utils import (
+    AppProperties,
+    CoreProperties,
+    OOXMLPackage,
+    get_package,
+    parse_w3cdtf,
+    read_core_properties,
+)
+
+DOC_FILE_1 = "tests/test_files/test1_data.docx"
+DOC_FILE_2 = "tests/test_files/test2_no_data.docx"
+
+CORE_PROPERTIES_ATTRIBUTES = [
+    field.name for field in dataclasses.fields(CoreProperties)
+]
+
+CORE_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties"
+ xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/"
+ xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+<dc:title>First Title</dc:title>
+<dc:title>Second Title</dc:title>
+<dc:creator>Author &amp; Co</dc:creator>
+<cp:keywords>one, two</cp:keywords>
+<dc:subject/>
+<cp:revision>-3</cp:revision>
+<dcterms:created xsi:type="dcterms:W3CDTF">2021-11-07T14:50:06-08:00</dcterms:created>
+<dcterms:modified xsi:type="dcterms:W3CDTF">2021-11-07</dcterms:modified>
+<cp:lastPrinted>not a date</cp:lastPrinted>
+</cp:coreProperties>
+"""
+
+RELS_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+{core_rel}</Relationships>
+"""
+
+CORE_REL_XML = """<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" Target="{target}"/>
+"""
+
+
+def make_docx(path, core_xml=CORE_XML, core_part="docProps/core.xml", target=None):
+    """Copy DOC_FILE_2 to path replacing the core properties part (removed if core_xml is None)"""
+    core_rel = (
+        CORE_REL_XML.format(target=target or core_part) if core_xml is not None else ""
+    )
+    with zipfile.ZipFile(DOC_FILE_2) as src, zipfile.ZipFile(path, "w") as dst:
+        for item in src.infolist():
+            if item.filename == "docProps/core.xml":
+                continue
+            if item.filename == "_rels/.rels":
+                dst.writestr(item, RELS_XML.format(core_rel=core_rel))
+                continue
+            dst.writestr(item, src.read(item.filename))
+        if core_xml is not None:
+            dst.writestr(core_part, core_xml)
+    return str(path)
+
+
+CONTENT_TYPES_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/{main_part}" ContentType="{main_type}"/>
+</Types>
+"""
+
+PACKAGE_RELS_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="{main_part}"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" Target="docProps/core.xml"/>
+<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/extended-properties" Target="docProps/app.xml"/>
+</Relationships>
+"""
+
+APP_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties"
+ xmlns:vt="http://schemas.openxmlformats.org/officeDocument/2006/docPropsVTypes">
+<Application>{application}</Application>
+<TotalTime>12</TotalTime>
+{properties}<TitlesOfParts><vt:vector size="1" baseType="lpstr"><vt:lpstr>Part</vt:lpstr></vt:vector></TitlesOfParts>
+<Company>Acme</Company>
+<AppVersion>16.0300</AppVersion>
+</Properties>
+"""
+
+WORKBOOK_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+ xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<bookViews><workbookView/></bookViews>
+<sheets>
+<sheet name="One" sheetId="1" r:id="rId1"/>
+<sheet name="Two" sheetId="2" r:id="rId2"/>
+<sheet name="Three" sheetId="3" state="hidden" r:id="rId3"/>
+</sheets>
+</workbook>
+"""
+
+PRESENTATION_XML = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<p:presentation xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"/>
+"""
+
+XLSX_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"
+PPTX_TYPE = (
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml"
+)
+
+
+def make_package(path, main_part, main_type, main_xml, app_xml):
+    """Write a minimal OOXML package (as written by Excel or PowerPoint) to path"""
+    with zipfile.ZipFile(path, "w") as dst:
+        dst.writestr(
+            "[Content_Types].xml",
+            CONTENT_TYPES_XML.format(main_part=main_part, main_type=main_type),
+        )
+        dst.writestr("_rels/.rels", PACKAGE_RELS_XML.format(main_part=main_part))
+        dst.writestr(main_part, main_xml)
+        dst.writestr("docProps/core.xml", CORE_XML)
+        dst.writestr("docProps/app.xml", app_xml)
+    return str(path)
+
+
+def make_xlsx(path):
+    app_xml = APP_XML.format(application="Microsoft Excel", properties="")
+    return make_package(path, "xl/workbook.xml", XLSX_TYPE, WORKBOOK_XML, app_xml)
+
+
+def make_pptx(path):
+    app_xml = APP_XML.format(
+        application="Microsoft Office PowerPoint",
+        properties="<PresentationFormat>Widescreen</PresentationFormat>\n"
+        "<Words>27</Words><Paragraphs>9</Paragraphs><Slides>4</Slides>"
+        "<Notes>1</Notes><HiddenSlides>not a number</HiddenSlides>\n",
+    )
+    return make_package(
+        path, "ppt/presentation.xml", PPTX_TYPE, PRESENTATION_XML, app_xml
+    )
+
+
+def python_docx_properties(filepath):
+    core_properties = docx.Document(filepath).core_properties
+    return {attr: getattr(core_properties, attr) for attr in CORE_PROPERTIES_ATTRIBUTES}
+
+
+@pytest.mark.parametrize("filepath", [DOC_FILE_1, DOC_FILE_2])
+def test_read_core_properties_test_files(filepath):
+    """Test read_core_properties returns same values as python-docx"""
+    assert dataclasses.asdict(read_core_properties(filepath)) == (
+        python_docx_properties(filepath)
+    )
+
+
+@pytest.mark.parametrize("target", ["docProps/core.xml", "/docProps/core.xml"])
+def test_read_core_properties(tmp_path, target):
+    """Test read_core_properties with duplicate, empty and invalid values"""
+    filepath = make_docx(tmp_path / "test.docx", target=target)
+    core_properties = read_core_properties(filepath)
+    assert dataclasses.asdict(core_properties) == python_docx_properties(filepath)
+    assert core_properties.title == "First Title"
+    assert core_properties.author == "Author & Co"
+    assert core_properties.subject == ""
+    assert core_properties.comments == ""
+    assert core_properties.revision == 0
+    assert core_properties.created == datetime.datetime(2021, 11, 7, 22, 50, 6)
+    assert core_properties.modified == datetime.datetime(2021, 11, 7)
+    assert core_properties.last_printed is None
+
+
+def test_read_core_properties_not_available(tmp_path):
+    """Test read_core_properties returns None if core properties can't be read"""
+    assert (
+        read_core_properties(make_docx(tmp_path / "none.docx", core_xml=None)) is None
+    )
+    assert (
+        read_core_properties(make_docx(tmp_path / "bad.docx", core_xml="<bad")) is None
+    )
+    not_zip = tmp_path / "not_zip.docx"
+    not_zip.write_text("not a zip file")
+    assert read_core_properties(str(not_zip)) is None
+
+
+def test_docx_plugin_fallback(tmp_path):
+    """Test docx plugin falls back to python-docx if core properties can't be read"""
+    from mdinfo.plugins.templates.docx import get_core_properties
+
+    filepath = make_docx(tmp_path / "none.docx", core_xml=None)
+    # python-docx creates default properties if the document has none
+    assert get_core_properties(filepath).title == "Word Document"
+
+
+def test_app_properties_docx():
+    """Test reading extended properties of a docx file"""
+    with OOXMLPackage(DOC_FILE_1) as package:
+        app_properties = package.app_properties()
+        assert package.sheet_count() is None
+    assert app_properties.application == "Microsoft Macintosh Word"
+    assert app_properties.app_version == "14.0000"
+    assert app_properties.template == "Normal.dotm"
+    assert app_properties.pages == 1
+    assert app_properties.words == 0
+    assert app_properties.company == ""
+    assert app_properties.slides is None
+
+
+def test_xlsx(tmp_path):
+    """Test reading metadata of an xlsx file"""
+    with OOXMLPackage(make_xlsx(tmp_path / "test.xlsx")) as package:
+        assert package.core_properties().title == "First Title"
+        assert package.app_properties() == AppProperties(
+            application="Microsoft Excel",
+            app_version="16.0300",
+            company="Acme",
+            total_time=12,
+        )
+        assert package.sheet_count() == 3
+
+
+def test_pptx(tmp_path):
+    """Test reading metadata of a pptx file"""
+    with OOXMLPackage(make_pptx(tmp_path / "test.pptx")) as package:
+        assert package.core_properties().author == "Author & Co"
+        app_properties = package.app_properties()
+        assert package.sheet_count() is None
+    assert app_properties.application == "Microsoft Office PowerPoint"
+    assert app_properties.presentation_format == "Widescreen"
+    assert app_properties.slides == 4
+    assert app_properties.notes == 1
+    assert app_properties.hidden_slides is None
+    assert app_properties.words == 27
+    assert app_properties.pages is None
+
+
+def test_get_package_context(tmp_path):
+    """Test get_package opens the package once per context, is closed with the context
+    and returns None for non-zip files"""
+    filepath = make_xlsx(tmp_path / "test.xlsx")
+    context = FileContext(filepath)
+    package = get_package(filepath, context)
+    assert get_package(filepath, context) is package
+
+    # the package is closed with the context
+    context.close()
+    assert package._zip.fp is None
+    assert "ooxml:package" not in context
+
+    not_zip = tmp_path / "not_zip.xlsx"
+    not_zip.write_text("not a zip file")
+    assert get_package(str(not_zip), FileContext(str(not_zip))) is None
+
+
+def test_ooxml_plugin(tmp_path):
+    """Test ooxml template fields with xlsx and pptx files"""
+    xlsx = make_xlsx(tmp_path / "test.xlsx")
+    assert FileTemplate(xlsx).render(
+        "{ooxml:title}|{ooxml:application}|{ooxml:sheets}|{ooxml:slides}|{ooxml:created.year}"
+    ) == ["First Title|Microsoft Excel|3|_|2021"]
+    pptx = make_pptx(tmp_path / "test.pptx")
+    assert FileTemplate(pptx).render(
+        "{ooxml:author}|{ooxml:slides}|{ooxml:presentation_format}|{ooxml:sheets}"
+    ) == ["Author & Co|4|Widescreen|_"]
+    not_zip = tmp_path / "not_zip.xlsx"
+    not_zip.write_text("not a zip file")
+    assert FileTemplate(str(not_zip)).render("{ooxml:title}") == ["_"]
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("2003", datetime.datetime(2003, 1, 1)),
+        ("2003-12", datetime.datetime(2003, 12, 1)),
+        ("2003-12-31T10:14:55Z", datetime.datetime(2003, 12, 31, 10, 14, 55)),
+        ("2003-12-31T10:14:55+01:30", datetime.datetime(2003, 12, 31, 8, 44, 55)),
+        ("31/12/2003", None),
+        ("", None),
+    ],
+)
+def test_parse_w3cdtf(value, expected):
+    assert parse_w3cdtf(value) == expected
@@ -0,0 +1,214 @@
+"""Test fast PDF /Info reader"""
+
+import zlib
+
+import pytest
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+from pdfminer.psparser import PSLiteral
+
+from mdinfo.pdf_utils import read_pdf_info
+
+PDF_FILE_1 = "tests/test_files/test_pdf.pdf"
+PDF_FILE_2 = "tests/test_files/test_pdf_blank_metadata.pdf"
+
+INFO = (
+    b"<< /Title (Test \\(Title\\) with \\\\ escapes\\056\\\n continued)"
+    b" /Author 4 0 R /Subject <FEFF00540065007300740020> /Keywords ()"
+    b" /CreationDate (D:20211107145006Z00'00') /Trapped /False /Count 3 >>"
+)
+
+
+def read_bytes(filepath):
+    with open(filepath, "rb") as fd:
+        return fd.read()
+
+
+def pdfminer_info(filepath):
+    """Return /Info as read by pdfminer with indirect objects and names resolved"""
+    with open(filepath, "rb") as fp:
+        doc = PDFDocument(PDFParser(fp))
+        info = doc.info[0] if doc.info else {}
+        info = {key: resolve1(value) for key, value in info.items()}
+    return {
+        key: value.name if isinstance(value, PSLiteral) else value
+        for key, value in info.items()
+    }
+
+
+def make_pdf(
+    path, info=INFO, xref_stream=False, object_stream=False, trailer=b"", hybrid=False
+):
+    """Write a minimal PDF to path
+
+    Args:
+        info: the /Info dictionary
+        xref_stream: use a cross-reference stream (with PNG predictors) instead of a table
+        object_stream: store the /Info dictionary in an object stream (requires xref_stream)
+        trailer: additional entries for the trailer
+        hybrid: also write a cross-reference table which marks objects in object streams
+            as free and refers to the xref stream with /XRefStm, as Word does (requires xref_stream)
+    """
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [] /Count 0 >>",
+        3: info,
+        4: b"(Indirect Author)",
+    }
+    compressed = {3, 4} if object_stream else set()
+    pdf = bytearray(b"%PDF-1.5\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for objid, body in objects.items():
+        if objid in compressed:
+            continue
+        offsets[objid] = len(pdf)
+        pdf += b"%d 0 obj\n%s\nendobj\n" % (objid, body)
+    if compressed:
+        header = b""
+        data = b""
+        for objid in sorted(compressed):
+            header += b"%d %d " % (objid, len(data))
+            data += objects[objid] + b"\n"
+        stream = zlib.compress(header + data)
+        offsets[5] = len(pdf)
+        pdf += (
+            b"5 0 obj\n<< /Type /ObjStm /N %d /First %d /Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream\nendobj\n"
+            % (len(compressed), len(header), len(stream), stream)
+        )
+
+    size = 7 if xref_stream else 6
+    if not xref_stream:
+        xref_offset = len(pdf)
+        pdf += b"xref\n0 %d\n0000000000 65535 f \n" % size
+        for objid in range(1, size):
+            if objid in offsets:
+                pdf += b"%010d 00000 n \n" % offsets[objid]
+            else:
+                pdf += b"0000000000 00001 f \n"
+        pdf += b"trailer\n<< /Size %d /Root 1 0 R /Info 3 0 R %s>>\n" % (size, trailer)
+    else:
+        xref_offset = len(pdf)
+        rows = [(0, 0, 65535)]
+        for objid in range(1, size):
+            if objid in compressed:
+                rows.append((2, 5, sorted(compressed).index(objid)))
+            elif objid == 6:
+                rows.append((1, xref_offset, 0))
+            elif objid in offsets:
+                rows.append((1, offsets[objid], 0))
+            else:
+                rows.append((0, 0, 1))
+        # apply PNG "up" predictor to each row
+        data = b""
+        previous = bytes(7)
+        for row in rows:
+            row = (
+                row[0].to_bytes(1, "big")
+                + row[1].to_bytes(4, "big")
+                + row[2].to_bytes(2, "big")
+            )
+            data += b"\x02" + bytes((a - b) & 0xFF for a, b in zip(row, previous))
+            previous = row
+        stream = zlib.compress(data)
+        pdf += (
+            b"6 0 obj\n<< /Type /XRef /Size %d /W [1 4 2] /Root 1 0 R /Info 3 0 R %s"
+            b"/Filter /FlateDecode /DecodeParms << /Predictor 12 /Columns 7 >> /Length %d >>\n"
+            b"stream\n%s\nendstream\nendobj\n" % (size, trailer, len(stream), stream)
+        )
+        if hybrid:
+            stm_offset = xref_offset
+            xref_offset = len(pdf)
+            pdf += b"xref\n0 %d\n0000000000 65535 f \n" % size
+            for objid in range(1, size):
+                if objid == 6:
+                    pdf += b"%010d 00000 n \n" % stm_offset
+                elif objid in offsets:
+                    pdf += b"%010d 00000 n \n" % offsets[objid]
+                else:
+                    pdf += b"0000000000 00001 f \n"
+            pdf += (
+                b"trailer\n<< /Size %d /Root 1 0 R /Info 3 0 R /XRefStm %d %s>>\n"
+                % (
+                    size,
+                    stm_offset,
+                    trailer,
+                )
+            )
+    pdf += b"startxref\n%d\n%%%%EOF\n" % xref_offset
+    with open(path, "wb") as fd:
+        fd.write(pdf)
+    return str(path)
+
+
+@pytest.mark.parametrize("filepath", [PDF_FILE_1, PDF_FILE_2])
+def test_read_pdf_info_test_files(filepath):
+    """Test read_pdf_info returns same values as pdfminer, including incremental updates"""
+    assert read_pdf_info(filepath) == pdfminer_info(filepath)
+
+
+@pytest.mark.parametrize(
+    "xref_stream,object_stream,hybrid",
+    [
+        (False, False, False),
+        (True, False, False),
+        (True, True, False),
+        (True, True, True),
+    ],
+)
+def test_read_pdf_info(tmp_path, xref_stream, object_stream, hybrid):
+    """Test read_pdf_info with xref tables, xref streams, object streams and hybrid files"""
+    filepath = make_pdf(
+        tmp_path / "test.pdf",
+        xref_stream=xref_stream,
+        object_stream=object_stream,
+        hybrid=hybrid,
+    )
+    info = read_pdf_info(filepath)
+    assert info == pdfminer_info(filepath)
+    assert info["Title"] == b"Test (Title) with \\ escapes. continued"
+    assert info["Author"] == b"Indirect Author"
+    assert info["Subject"] == b"\xfe\xff\x00T\x00e\x00s\x00t\x00 "
+    assert info["Keywords"] == b""
+    assert info["Trapped"] == "False"
+    assert info["Count"] == 3
+
+
+def test_read_pdf_info_no_info(tmp_path):
+    """Test read_pdf_info with no /Info dictionary"""
+    filepath = make_pdf(tmp_path / "test.pdf", info=b"null")
+    assert read_pdf_info(filepath) is None
+    filepath = tmp_path / "no_info.pdf"
+    filepath.write_bytes(
+        read_bytes(make_pdf(tmp_path / "test.pdf")).replace(b"/Info 3 0 R", b" " * 11)
+    )
+    assert read_pdf_info(str(filepath)) == {}
+
+
+def test_read_pdf_info_unsupported(tmp_path):
+    """Test read_pdf_info returns None for PDFs that need a full parser"""
+    encrypted = make_pdf(tmp_path / "encrypted.pdf", trailer=b"/Encrypt 2 0 R ")
+    assert read_pdf_info(encrypted) is None
+
+    empty = tmp_path / "empty.pdf"
+    empty.write_bytes(b"")
+    assert read_pdf_info(str(empty)) is None
+
+    garbage = tmp_path / "garbage.pdf"
+    garbage.write_bytes(b"%PDF-1.4\nstartxref\n12345\n%%EOF\n")
+    assert read_pdf_info(str(garbage)) is None
+
+
+def test_get_pdf_metadata_info_fallback(tmp_path):
+    """Test pdf plugin falls back to pdfminer when the fast reader can't read the file"""
+    from mdinfo.plugins.templates.pdf import get_pdf_metadata_info
+
+    filepath = make_pdf(tmp_path / "test.pdf")
+    data = read_bytes(filepath)
+    # point startxref at the wrong offset; pdfminer recovers by scanning the file
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(data[: data.rindex(b"startxref")] + b"startxref\n1\n%%EOF\n")
+    assert read_pdf_info(str(broken)) is None
+    assert (
+        get_pdf_metadata_info(str(broken))["Title"] == read_pdf_info(filepath)["Title"]
+    )
@@ -0,0 +1,64 @@
+"""Test stat with birth time"""
+
+import datetime
+import os
+import sys
+
+import pytest
+
+from mdinfo import stat_utils
+from mdinfo.filetemplate import FileTemplate
+from mdinfo.stat_utils import stat_with_birthtime
+
+PHOTO_FILE = "tests/test_files/pears.jpg"
+
+
+def test_stat_with_birthtime():
+    """Test stat_with_birthtime returns the same stat result as os.stat"""
+    stat, birthtime = stat_with_birthtime(PHOTO_FILE)
+    assert stat == os.stat(PHOTO_FILE)
+    assert stat.st_mtime_ns == os.stat(PHOTO_FILE).st_mtime_ns
+    assert birthtime is None or isinstance(birthtime, float)
+
+
+def test_stat_with_birthtime_not_found():
+    with pytest.raises(FileNotFoundError):
+        stat_with_birthtime("tests/test_files/no_such_file.jpg")
+    with pytest.raises(FileNotFoundError):
+        FileTemplate("tests/test_files/no_such_file.jpg")
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="Linux only")
+def test_stat_with_birthtime_statx_unavailable(monkeypatch):
+    """Test fallback to os.stat if statx can't be used"""
+
+    def statx(*args):
+        return -1
+
+    monkeypatch.setattr(stat_utils, "_statx", statx)
+    monkeypatch.setattr(stat_utils, "_statx_loaded", True)
+    monkeypatch.setattr(stat_utils.ctypes, "get_errno", lambda: stat_utils.errno.ENOSYS)
+    assert stat_with_birthtime(PHOTO_FILE) == (os.stat(PHOTO_FILE), None)
+    assert stat_utils._statx is None
+
+
+def test_created_birthtime(tmp_path, monkeypatch):
+    """Test {created} and {birthtime} with and without a birth time"""
+    from mdinfo import filecontext
+
+    filepath = str(tmp_path / "test.txt")
+    with open(filepath, "w") as fd:
+        fd.write("test")
+    stat = os.stat(filepath)
+    ctime = datetime.datetime.fromtimestamp(stat.st_ctime).isoformat()
+
+    monkeypatch.setattr(filecontext, "stat_with_birthtime", lambda path: (stat, 0.0))
+    birthtime = datetime.datetime.fromtimestamp(0.0).isoformat()
+    assert FileTemplate(filepath).render("{created}|{birthtime}") == [
+        f"{birthtime}|{birthtime}"
+    ]
+
+    monkeypatch.setattr(filecontext, "stat_with_birthtime", lambda path: (stat, None))
+    assert FileTemplate(filepath).render("{created}|{birthtime}|{birthtime.year}") == [
+        f"{ctime}|_|_"
+    ]
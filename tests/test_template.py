@@ -80,6 +80,17 @@ TEST_DATA = [
     [DOC_FILE_1, "{docx:subject}", ["test"]],
     [DOC_FILE_1, "{docx:title}", ["Test Document"]],
     [DOC_FILE_1, "{docx:version}", ["1.0"]],
+    # ooxml
+    [PHOTO_FILE, "{ooxml:author}", ["_"]],
+    [DOC_FILE_1, "{ooxml:author}", ["Rhet Turnbull"]],
+    [DOC_FILE_1, "{ooxml:created.year}", ["2021"]],
+    [DOC_FILE_1, "{ooxml:revision}", ["42"]],
+    [DOC_FILE_1, "{ooxml:application}", ["Microsoft Macintosh Word"]],
+    [DOC_FILE_1, "{ooxml:pages}", ["1"]],
+    [DOC_FILE_1, "{ooxml:words}", ["0"]],
+    [DOC_FILE_1, "{ooxml:company}", ["_"]],
+    [DOC_FILE_1, "{ooxml:slides}", ["_"]],
+    [DOC_FILE_1, "{ooxml:sheets}", ["_"]],
     # docx with blank metadata
     [DOC_FILE_2, "{docx:author}", ["Rhet Turnbull"]],
     [DOC_FILE_2, "{docx:category}", ["_"]],
@@ -214,6 +225,119 @@ def test_template_render_filestat():
     ]
 
 
+def test_template_file_context_stat(monkeypatch):
+    """Test that the file is only stat'd once per FileTemplate"""
+    from mdinfo import filecontext
+
+    calls = []
+    stat_with_birthtime = filecontext.stat_with_birthtime
+
+    def stat(path):
+        calls.append(path)
+        return stat_with_birthtime(path)
+
+    monkeypatch.setattr(filecontext, "stat_with_birthtime", stat)
+    template = FileTemplate(PHOTO_FILE)
+    size = os.stat(PHOTO_FILE).st_size
+    assert template.render("{size} {uid} {modified.year} {created.year}")[0].startswith(
+        f"{size} "
+    )
+    assert template.render("{accessed}-{gid}-{birthtime}")
+    assert len(calls) == 1
+
+
+def test_template_filestat_names(monkeypatch):
+    """Test that user and group names are looked up once per id"""
+    import grp
+    import pwd
+
+    from mdinfo.plugins.templates import filestat
+    from mdinfo.stats import RUN_STATS, reset
+
+    lookups = []
+
+    def getpwuid(uid):
+        lookups.append("user")
+        raise KeyError(f"getpwuid(): uid not found: {uid}")
+
+    def getgrgid(gid):
+        lookups.append("group")
+        return grp.struct_group(("staff", "*", gid, []))
+
+    monkeypatch.setattr(filestat, "_user_names", {})
+    monkeypatch.setattr(filestat, "_group_names", {})
+    monkeypatch.setattr(pwd, "getpwuid", getpwuid)
+    monkeypatch.setattr(grp, "getgrgid", getgrgid)
+    reset()
+    stat = os.stat(PHOTO_FILE)
+    for filepath in [PHOTO_FILE, AUDIO_FILE, PHOTO_FILE]:
+        assert FileTemplate(filepath).render("{user}-{group}") == [
+            f"{stat.st_uid}-staff"
+        ]
+    assert lookups == ["user", "group"]
+    assert RUN_STATS["user_lookups"] == 1
+    assert RUN_STATS["group_lookups"] == 1
+
+
+def test_template_plan():
+    """Test plan_templates finds the fields and plugins used by templates"""
+    from mdinfo.filetemplate import PlannedField, plan_templates
+
+    plan = plan_templates(
+        ["{pdf:title} {size}", "{var:x,{audio:title}}{%x}{created.year|upper}"]
+    )
+    assert plan.fields == [
+        PlannedField("pdf:title", "mdinfo.plugins.templates.pdf", False, True),
+        PlannedField("size", "mdinfo.plugins.templates.filestat", False, False),
+        PlannedField("var:x", None, True, False),
+        PlannedField("audio:title", "mdinfo.plugins.templates.audio", False, False),
+        PlannedField("%x", None, True, False),
+        PlannedField(
+            "created.year", "mdinfo.plugins.templates.filedates", False, False
+        ),
+    ]
+    assert plan.plugins == [
+        "mdinfo.plugins.templates.pdf",
+        "mdinfo.plugins.templates.filestat",
+        "mdinfo.plugins.templates.audio",
+        "mdinfo.plugins.templates.filedates",
+    ]
+    assert "mdinfo.plugins.templates.docx" in plan.unused_plugins
+    assert not plan.unknown_fields
+    assert [r.field for r in plan.requests] == ["pdf", "size", "audio", "created.year"]
+
+
+def test_template_plan_combine():
+    """Test plan_templates finds the fields in a combine branch"""
+    from mdinfo.filetemplate import PlannedField, plan_templates
+
+    plan = plan_templates(["{pdf:title&{docx:title}}"])
+    assert plan.fields == [
+        PlannedField("pdf:title", "mdinfo.plugins.templates.pdf", False, True),
+        PlannedField("docx:title", "mdinfo.plugins.templates.docx", False, False),
+    ]
+    assert plan.plugins == [
+        "mdinfo.plugins.templates.pdf",
+        "mdinfo.plugins.templates.docx",
+    ]
+    assert "mdinfo.plugins.templates.docx" not in plan.unused_plugins
+    assert [r.field for r in plan.requests] == ["docx", "pdf"]
+
+
+def test_template_plan_undeclared():
+    """Test plan_templates with a field not declared by any plugin"""
+    from mdinfo.filetemplate import PM, plan_templates
+
+    undeclared = _FieldsPlugin({"foo": "FOO"}, declare=False)
+    PM.register(undeclared, "test_undeclared")
+    try:
+        plan = plan_templates(["{foo}"])
+        assert plan.unknown_fields == ["foo"]
+        assert "test_undeclared" in plan.plugins
+    finally:
+        PM.unregister(undeclared)
+
+
 @pytest.mark.parametrize("data", TEST_DATA)
 def test_template_render(data, setlocale):
     """Test template rendering"""
@@ -254,3 +378,382 @@ def test_template_var_error():
         template.render("{var:foo}", options=RenderOptions())
     with pytest.raises(SyntaxError):
         template.render("{%bar}", options=RenderOptions())
+
+
+def test_template_file_context_audio(monkeypatch):
+    """Test that audio file is only parsed once per FileTemplate"""
+    from tinytag.tinytag import TinyTag
+
+    calls = []
+    tinytag_get = TinyTag.get
+
+    def get(filepath, *args, **kwargs):
+        calls.append(filepath)
+        # embedded images should not be loaded
+        assert kwargs["image"] is False
+        return tinytag_get(filepath, *args, **kwargs)
+
+    monkeypatch.setattr(TinyTag, "get", get)
+    template = FileTemplate(AUDIO_FILE)
+    assert template.render("{audio:artist} - {audio:title}") == [
+        "Darkroom - Warm Lights (ft. Apoxode)"
+    ]
+    assert template.render("{audio:bitrate}") == ["320.0"]
+    assert len(calls) == 1
+
+
+def test_template_file_context_docx_pdf(monkeypatch):
+    """Test that docx and pdf files are only parsed once per FileTemplate"""
+    from mdinfo.plugins.templates import docx, pdf
+
+    calls = []
+    get_pdf_metadata_info = pdf.get_pdf_metadata_info
+
+    def get_info(filepath):
+        calls.append(filepath)
+        return get_pdf_metadata_info(filepath)
+
+    monkeypatch.setattr(pdf, "get_pdf_metadata_info", get_info)
+    template = FileTemplate(PDF_FILE_1)
+    assert template.render("{pdf:title}|{pdf:author}|{pdf:created.year}") == [
+        "Test Document|Rhet Turnbull|2021"
+    ]
+    assert len(calls) == 1
+
+    get_package = docx.get_package
+
+    def get_package_(filepath, context):
+        calls.append(filepath)
+        return get_package(filepath)
+
+    monkeypatch.setattr(docx, "get_package", get_package_)
+    template = FileTemplate(DOC_FILE_1)
+    assert template.render("{docx:title}") == ["Test Document"]
+    assert template.render("{docx:author}") == ["Rhet Turnbull"]
+    assert len(calls) == 2
+
+
+def test_template_close():
+    """Test that closing a FileTemplate closes files opened by plugins"""
+    with FileTemplate(DOC_FILE_1) as template:
+        assert template.render("{docx:title}") == ["Test Document"]
+        package = template.context.get("ooxml:package")
+        assert package._zip.fp is not None
+    assert package._zip.fp is None
+    # files are opened again if the template is used after it is closed
+    assert template.render("{docx:author}") == ["Rhet Turnbull"]
+    template.close()
+
+
+def test_template_cache(tmp_path):
+    """Test FileTemplate with MetadataCache"""
+    from mdinfo.cache import MetadataCache
+
+    cache = MetadataCache(str(tmp_path / "cache.db"))
+    assert FileTemplate(PDF_FILE_1, cache=cache).render("{pdf:title}") == [
+        "Test Document"
+    ]
+    assert cache.count() == 1
+
+    # value should be served from the cache without calling the plugin
+    stat = os.stat(PDF_FILE_1)
+    cache.set(stat, "pdf", "title", None, [], ["Cached Title"])
+    assert FileTemplate(PDF_FILE_1, cache=cache).render("{pdf:title}") == [
+        "Cached Title"
+    ]
+
+    # fields that don't depend only on the file contents are not cached
+    FileTemplate(PDF_FILE_1, cache=cache).render("{filepath.name}")
+    assert cache.count() == 1
+    cache.close()
+
+
+def test_template_cache_lazy_default(tmp_path, monkeypatch):
+    """Test that a default with template fields isn't rendered to look up the cache"""
+    from mdinfo.cache import MetadataCache
+    from mdinfo.filetemplate import PM
+
+    monkeypatch.setattr(
+        mdinfo.filetemplate, "CACHEABLE_FIELDS", frozenset({"first", "second"})
+    )
+    plugin = _FieldsPlugin({"first": "FIRST", "second": None})
+    PM.register(plugin, "test_cache_lazy")
+    cache = MetadataCache(str(tmp_path / "cache.db"))
+    try:
+        template = "{first,{second}}"
+        assert FileTemplate(PHOTO_FILE, cache=cache).render(template) == ["FIRST"]
+        assert plugin.calls == ["first"]
+
+        plugin.calls = []
+        assert FileTemplate(PHOTO_FILE, cache=cache).render(template) == ["FIRST"]
+        assert plugin.calls == []
+
+        # {second} has no value so the default is rendered
+        for calls in [["second", "first"], []]:
+            assert FileTemplate(PHOTO_FILE, cache=cache).render("{second,{first}}") == [
+                "FIRST"
+            ]
+            assert plugin.calls == calls
+            plugin.calls = []
+    finally:
+        PM.unregister(plugin)
+        cache.close()
+
+
+def test_template_lazy_plugin_imports():
+    """Test that plugin libraries are not imported until one of their fields is rendered"""
+    import subprocess
+
+    script = (
+        "import sys\n"
+        "from mdinfo.filetemplate import FileTemplate\n"
+        f"FileTemplate({PHOTO_FILE!r}).render('{{size}}{{comma}}')\n"
+        "print(' '.join(m for m in ('docx', 'pdfminer', 'tinytag') if m in sys.modules))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_template_entrypoint_plugins_loaded_on_demand(monkeypatch):
+    """Test that entry point plugins are only loaded when a field is not handled by the default plugins"""
+    from mdinfo import filetemplate
+
+    calls = []
+    monkeypatch.setattr(filetemplate, "_entrypoints_loaded", False)
+    monkeypatch.setattr(
+        filetemplate.PM,
+        "load_setuptools_entrypoints",
+        lambda group: calls.append(group) or 0,
+    )
+    template = FileTemplate(PHOTO_FILE)
+    template.render("{size}{comma}{strip, foo }")
+    assert not calls
+    with pytest.raises(mdinfo.mtlparser.UnknownFieldError):
+        template.render("{not_a_field}")
+    assert calls == ["mdinfo"]
+    with pytest.raises(mdinfo.mtlparser.UnknownFieldError):
+        template.render("{not_a_field}")
+    assert calls == ["mdinfo"]
+
+
+class _FieldsPlugin:
+    """Plugin used to test routing of template fields"""
+
+    def __init__(self, fields, declare=True):
+        self.fields = fields
+        self.calls = []
+        if declare:
+            self.get_template_fields = mdinfo.hookimpl(lambda: list(self.fields))
+
+    @mdinfo.hookimpl
+    def get_template_value(self, field, subfield, default):
+        self.calls.append(field)
+        return [self.fields[field]] if field in self.fields else None
+
+
+def test_template_entrypoint_plugins_dispatch_lock(monkeypatch):
+    """Test that the dispatch table is not built while entry point plugins are loaded"""
+    import threading
+
+    from mdinfo import filetemplate
+
+    plugin = _FieldsPlugin({"entrypoint": "EP"})
+    dispatches = []
+    getter = threading.Thread(
+        target=lambda: dispatches.append(filetemplate.get_field_dispatch())
+    )
+
+    def load_setuptools_entrypoints(group):
+        filetemplate.PM.register(plugin, "test_entrypoint")
+        # the default plugins are re-registered after this returns
+        getter.start()
+        getter.join(0.2)
+        assert getter.is_alive()
+        return 1
+
+    monkeypatch.setattr(filetemplate, "_entrypoints_loaded", False)
+    monkeypatch.setattr(
+        filetemplate.PM, "load_setuptools_entrypoints", load_setuptools_entrypoints
+    )
+    try:
+        assert filetemplate.load_entrypoint_plugins()
+        getter.join()
+        (dispatch,) = dispatches
+        assert {"entrypoint", "size", "pdf"} <= set(dispatch.fields)
+    finally:
+        filetemplate.PM.unregister(plugin)
+
+
+def test_template_field_dispatch_snapshot():
+    """Test that a FieldDispatch calls the plugins registered when it was built"""
+    from mdinfo.filetemplate import PM, get_field_dispatch
+
+    undeclared = _FieldsPlugin({"fallback": "FALLBACK"}, declare=False)
+    PM.register(undeclared, "test_snapshot")
+    dispatch = get_field_dispatch()
+    PM.unregister(undeclared)
+    kwargs = dict(filepath=PHOTO_FILE, subfield=None, field_arg=None, default=[])
+    assert dispatch.get_template_value(field="fallback", **kwargs) == ["FALLBACK"]
+    assert get_field_dispatch().get_template_value(field="fallback", **kwargs) is None
+
+
+def test_template_field_dispatch():
+    """Test that only the plugin that declares a field is called to get its value"""
+    from mdinfo.filetemplate import PM
+
+    declared = _FieldsPlugin({"routed": "ROUTED"})
+    undeclared = _FieldsPlugin({"fallback": "FALLBACK"}, declare=False)
+    PM.register(declared, "test_declared")
+    PM.register(undeclared, "test_undeclared")
+    try:
+        template = FileTemplate(PHOTO_FILE)
+        assert template.render("{routed}-{fallback}-{size}") == [
+            f"ROUTED-FALLBACK-{os.path.getsize(PHOTO_FILE)}"
+        ]
+        assert declared.calls == ["routed"]
+        assert undeclared.calls == ["fallback"]
+    finally:
+        PM.unregister(declared)
+        PM.unregister(undeclared)
+    with pytest.raises(mdinfo.mtlparser.UnknownFieldError):
+        FileTemplate(PHOTO_FILE).render("{routed}")
+
+
+def test_template_fallback_lazy():
+    """Test that fields in a default value are only looked up if the default is used"""
+    from mdinfo.filetemplate import PM
+
+    plugin = _FieldsPlugin({"first": "FIRST", "second": None, "third": "THIRD"})
+    PM.register(plugin, "test_lazy")
+    try:
+        template = FileTemplate(PHOTO_FILE)
+        template.prefetch(["{first,{second,{third}}}"])
+        assert template.render("{first,{second,{third}}}") == ["FIRST"]
+        assert plugin.calls == ["first"]
+
+        plugin.calls = []
+        assert template.render("{second,{first}}") == ["FIRST"]
+        assert plugin.calls == ["second", "first"]
+
+        plugin.calls = []
+        assert template.render("{first?{second},{third}}") == ["_"]
+        assert plugin.calls == ["first", "second"]
+    finally:
+        PM.unregister(plugin)
+
+    # default still passed to plugins which use it
+    assert FileTemplate(PHOTO_FILE).render("{created.strftime,{filepath.stem}}") == [
+        "pears"
+    ]
+
+
+def test_template_render_many():
+    """Test that render_many renders each template and looks up each field once"""
+    from mdinfo.filetemplate import PM
+
+    plugin = _FieldsPlugin({"first": "FIRST", "second": None, "third": "THIRD"})
+    PM.register(plugin, "test_render_many")
+    try:
+        templates = [
+            "{first}",
+            "{first|lower}-{third}",
+            "{second,{third}}",
+            "{second,{first}}",
+            "{first?yes} {filepath.stem}",
+        ]
+        template = FileTemplate(PHOTO_FILE)
+        assert template.render_many(templates) == [
+            ["FIRST"],
+            ["first-THIRD"],
+            ["THIRD"],
+            ["FIRST"],
+            ["yes pears"],
+        ]
+        assert plugin.calls == ["first", "third", "second"]
+        assert template.render_many(templates) == [
+            FileTemplate(PHOTO_FILE).render(t) for t in templates
+        ]
+    finally:
+        PM.unregister(plugin)
+
+    # values looked up with different defaults are not shared
+    template = FileTemplate(PHOTO_FILE)
+    assert template.render_many(
+        ["{created.strftime,%Y}", "{created.strftime,{filepath.stem}}"]
+    ) == [template.render("{created.strftime,%Y}"), ["pears"]]
+
+
+def test_template_field_conflict():
+    """Test that FieldConflictError raised if two plugins declare the same field"""
+    from mdinfo.filetemplate import PM, FieldConflictError
+
+    plugin = _FieldsPlugin({"size": "0"})
+    PM.register(plugin, "test_conflict")
+    try:
+        with pytest.raises(FieldConflictError, match="size"):
+            FileTemplate(PHOTO_FILE).render("{size}")
+    finally:
+        PM.unregister(plugin)
+    assert FileTemplate(PHOTO_FILE).render("{size}") == [
+        str(os.path.getsize(PHOTO_FILE))
+    ]
+
+
+class _BatchPlugin(_FieldsPlugin):
+    """Plugin used to test get_template_values"""
+
+    def __init__(self, fields):
+        super().__init__(fields)
+        self.batches = []
+
+    @mdinfo.hookimpl
+    def get_template_values(self, fields):
+        self.batches.append(fields)
+        return {
+            request: [self.fields[request.field]]
+            for request in fields
+            if request.field in self.fields
+        }
+
+
+def test_template_prefetch():
+    """Test that fields collected by prefetch are resolved with one get_template_values call"""
+    from mdinfo.filetemplate import PM
+    from mdinfo.hookspecs import FieldRequest
+
+    plugin = _BatchPlugin({"one": "1", "two": "2"})
+    PM.register(plugin, "test_batch")
+    try:
+        templates = ["{one}-{two,x}", "{size?{two},no}", "{one,{size}}"]
+        template = FileTemplate(PHOTO_FILE)
+        template.prefetch(templates)
+        assert [template.render(t) for t in templates] == [["1-2"], ["2"], ["1"]]
+        assert plugin.batches == [
+            [
+                FieldRequest("one", None, None, ()),
+                FieldRequest("two", None, None, ("x",)),
+                FieldRequest("two", None, None, ()),
+            ]
+        ]
+        # {one,{size}} has a dynamic default so is looked up when rendered
+        assert plugin.calls == ["one"]
+    finally:
+        PM.unregister(plugin)
+
+
+def test_template_prefetch_pdf():
+    """Test that prefetched pdf values are the same as values looked up one at a time"""
+    templates = [
+        "{pdf:title}",
+        "{pdf:author,Unknown}",
+        "{pdf:created.year}",
+        "{pdf:modified.strftime,%Y-%m-%d}",
+        "{pdf:keywords}",
+    ]
+    for filepath in (PDF_FILE_1, PDF_FILE_2, DOC_FILE_1):
+        expected = [FileTemplate(filepath).render(t) for t in templates]
+        template = FileTemplate(filepath)
+        template.prefetch(templates)
+        assert [template.render(t) for t in templates] == expected